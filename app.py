@@ -1,9 +1,11 @@
 import os
 import sys
 import ctypes
+import threading
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
-from ui.main_activity import MainWindow
+from ui.main_activity import MainWindow, warm_up
 
 def main():
     # Weird way to set icon in Windows
@@ -18,6 +20,8 @@ def main():
     window = MainWindow()
     window.setWindowIcon(QIcon(icon_path))
     window.show()
+    # once the first frame is painted, load OpenCV and the pipeline in the background
+    QTimer.singleShot(0, lambda: threading.Thread(target=warm_up, name="warm-up", daemon=True).start())
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""
+Compare the native G-code writer against the SVG + svg2gcode path on large images.
+
+    python benchmarks/bench_gcode_backends.py --sizes 2000 4000 8000
+
+The svg2gcode rows are skipped when the CLI is not on PATH.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.gcode_generator import GcodeGenerator  # noqa: E402
+from modules.raster_svg_converter import RasterSVGConverter  # noqa: E402
+from modules.setting_manager import SettingsManager  # noqa: E402
+
+
+def make_image(path, size, seed=0):
+    """
+    Blobby noise: many closed regions of varying size, roughly like a dithered photo.
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.random((size // 8, size // 8)).astype(np.float32)
+    noise = cv2.resize(noise, (size, size), interpolation=cv2.INTER_CUBIC)
+    cv2.imwrite(path, (noise * 255).clip(0, 255).astype(np.uint8))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(sizes, workdir):
+    settings = SettingsManager(os.path.join(workdir, "bench_config.yaml"))
+    settings.set("svg_mode", "threshold")
+    has_cli = shutil.which("svg2gcode") is not None
+
+    print(f"{'size':>6} {'paths':>8} {'trace':>8} {'native':>8} {'svg+cli':>8} {'gcode MB':>9}")
+    for size in sizes:
+        image_path = os.path.join(workdir, f"bench_{size}.png")
+        svg_path = os.path.join(workdir, f"bench_{size}.svg")
+        gcode_path = os.path.join(workdir, f"bench_{size}.gcode")
+        make_image(image_path, size)
+
+        converter = RasterSVGConverter(settings)
+        start = time.perf_counter()
+        toolpath = converter.trace(image_path)
+        trace_s = time.perf_counter() - start
+
+        settings.set("gcode_backend", "native")
+        native_s = timed(GcodeGenerator(settings).convert_to_gcode, svg_path, gcode_path, toolpath)
+        gcode_mb = os.path.getsize(gcode_path) / 1e6
+
+        cli = "n/a"
+        if has_cli:
+            settings.set("gcode_backend", "svg2gcode")
+            svg_s = timed(converter.write_svg, toolpath, svg_path)
+            svg_s += timed(GcodeGenerator(settings).convert_to_gcode, svg_path, gcode_path)
+            cli = f"{svg_s:8.3f}"
+
+        print(f"{size:>6} {len(toolpath):>8} {trace_s:8.3f} {native_s:8.3f} {cli:>8} {gcode_mb:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 4000, 8000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        run(args.sizes, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Time every pipeline stage on a synthetic corpus and gate against a baseline.
+
+    python benchmarks/bench_pipeline.py --sizes 1000 2000 --output bench_results.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json --threshold 0.2
+    python benchmarks/bench_pipeline.py --corpus scans/ --set svg_mode=canny
+
+The corpus is generated from fixed seeds (line art, photo-like noise, text
+and large flat regions at each size), so runs on one machine are comparable;
+images in --corpus are added as user cases. Each case runs in a fresh
+process so its peak RSS is its own. Stage times are the best of --repeat
+runs. With --baseline, the run exits 1 when any stage's time or a case's
+peak RSS grew by more than --threshold. Baselines only make sense on the
+machine that recorded them.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import parse_overrides  # noqa: E402
+from modules.batch_converter import collect_inputs  # noqa: E402
+from modules.gcode_generator import GcodeGenerator  # noqa: E402
+from modules.image_loader import ImageLoader  # noqa: E402
+from modules.path_optimizer import PathOrderer  # noqa: E402
+from modules.path_simplifier import PathSimplifier  # noqa: E402
+from modules.raster_svg_converter import RasterSVGConverter  # noqa: E402
+from modules.setting_manager import SettingsManager  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+KINDS = ("line_art", "noise", "text", "flat")
+STAGES = ("load", "decode", "blur", "mask", "contours", "simplify", "order", "svg", "gcode")
+
+# differences below these are timer and allocator noise, never regressions
+MIN_SECONDS = 0.02
+MIN_RSS_MB = 8.0
+
+
+# ── corpus ──
+def make_line_art(size, rng):
+    img = np.full((size, size), 255, dtype=np.uint8)
+    for _ in range(size // 20):
+        pts = np.cumsum(rng.integers(-size // 20, size // 20 + 1, size=(12, 2)), axis=0) + rng.integers(0, size, 2)
+        cv2.polylines(img, [pts.astype(np.int32)], False, 0, int(rng.integers(1, 4)), cv2.LINE_AA)
+    for _ in range(size // 50):
+        center = tuple(int(v) for v in rng.integers(0, size, 2))
+        cv2.circle(img, center, int(rng.integers(5, size // 10)), 0, 2, cv2.LINE_AA)
+    return img
+
+
+def make_noise(size, rng):
+    """
+    Blobby noise with fine grain on top: many closed regions, like a photo.
+    """
+    coarse = cv2.resize(rng.random((size // 8, size // 8)).astype(np.float32), (size, size),
+                        interpolation=cv2.INTER_CUBIC)
+    grain = rng.normal(0, 0.08, (size, size)).astype(np.float32)
+    return ((coarse + grain) * 255).clip(0, 255).astype(np.uint8)
+
+
+def make_text(size, rng):
+    img = np.full((size, size), 255, dtype=np.uint8)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 "))
+    scale = size / 1000
+    line_height = int(40 * scale) + 1
+    for y in range(line_height, size, line_height):
+        text = "".join(rng.choice(letters, size // int(18 * scale + 1)))
+        cv2.putText(img, text, (5, y), cv2.FONT_HERSHEY_SIMPLEX, scale, 0, max(1, int(2 * scale)), cv2.LINE_AA)
+    return img
+
+
+def make_flat(size, rng):
+    """
+    A few large filled polygons in flat colours over a light background.
+    """
+    img = np.full((size, size, 3), 235, dtype=np.uint8)
+    palette = [(40, 40, 40), (200, 60, 30), (30, 120, 200), (60, 170, 60), (150, 150, 150)]
+    for i in range(24):
+        pts = rng.integers(0, size, size=(int(rng.integers(3, 7)), 2)).astype(np.int32)
+        cv2.fillPoly(img, [cv2.convexHull(pts)], palette[i % len(palette)])
+    return img
+
+
+MAKERS = {"line_art": make_line_art, "noise": make_noise, "text": make_text, "flat": make_flat}
+
+
+def build_corpus(kinds, sizes, workdir, user_dirs=()):
+    """
+    Write the synthetic images and return {case name: image path}.
+    """
+    cases = {}
+    for kind in kinds:
+        for size in sizes:
+            path = os.path.join(workdir, f"{kind}_{size}.png")
+            # one seed per (kind, size): same images on every run
+            rng = np.random.default_rng([KINDS.index(kind), size])
+            cv2.imwrite(path, MAKERS[kind](size, rng))
+            cases[f"{kind}_{size}"] = path
+    for path in collect_inputs(user_dirs, recursive=True) if user_dirs else []:
+        cases[f"user/{os.path.relpath(path)}"] = path
+    return cases
+
+
+# ── one case, in its own process ──
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_case(image_path, overrides, repeat, workdir):
+    settings = SettingsManager(os.path.join(workdir, "bench_config.yaml"), persist=False)
+    settings.update({"cache_enabled": False, "tiled_mode": "off", **overrides})
+    converter = RasterSVGConverter(settings)
+    simplifier = PathSimplifier(settings)
+    orderer = PathOrderer(settings)
+    generator = GcodeGenerator(settings)
+    svg_path = os.path.join(workdir, f"{os.getpid()}.svg")
+    gcode_path = os.path.join(workdir, f"{os.getpid()}.gcode")
+    rss_start = _peak_rss_mb()
+
+    best = {}
+    for _ in range(repeat):
+        times = {}
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            times[stage] = now - start
+            start = now
+
+        image = ImageLoader.load_image(image_path)
+        lap("load")
+        image = converter.decode(image)
+        lap("decode")
+        image = converter.blur(image)
+        lap("blur")
+        image = converter.mask(image)
+        lap("mask")
+        toolpath = converter.contours(image)
+        del image
+        lap("contours")
+        toolpath, _ = simplifier.simplify(toolpath)
+        lap("simplify")
+        toolpath, _ = orderer.order(toolpath)
+        toolpath = simplifier.fit_arcs(toolpath)
+        lap("order")
+        converter.write_svg(toolpath, svg_path)
+        lap("svg")
+        generator.convert_to_gcode(svg_path, gcode_path, toolpath)
+        lap("gcode")
+        for stage, seconds in times.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+
+    result = {
+        "stages": {stage: round(best[stage], 4) for stage in STAGES},
+        "total": round(sum(best.values()), 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "start_rss_mb": rss_start,
+        "paths": len(toolpath),
+        "segments": toolpath.segment_count(),
+        "svg_bytes": os.path.getsize(svg_path),
+        "gcode_bytes": os.path.getsize(gcode_path),
+    }
+    os.remove(svg_path)
+    os.remove(gcode_path)
+    return result
+
+
+def run_all(cases, overrides, repeat, workdir):
+    results = {}
+    # spawn, one task per child: each case's peak RSS is measured from a clean process
+    ctx = multiprocessing.get_context("spawn")
+    for name, path in cases.items():
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            results[name] = pool.apply(run_case, (path, overrides, repeat, workdir))
+        row = results[name]
+        print(f"{name:>24} {row['total']:8.3f}s {row['peak_rss_mb'] or 0:8.1f} MB "
+              f"{row['segments']:>10,} seg {row['gcode_bytes'] / 1e6:8.2f} MB gcode", file=sys.stderr)
+    return results
+
+
+# ── baseline comparison ──
+def compare(results, baseline, threshold):
+    """
+    Return one message per regression: a stage or peak RSS more than
+    threshold (a fraction) above the baseline, beyond the noise floors.
+    """
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for stage, seconds in row["stages"].items():
+            before = base["stages"].get(stage)
+            if before is not None and seconds > before * (1 + threshold) and seconds - before > MIN_SECONDS:
+                regressions.append(f"{name} {stage}: {before:.4f}s -> {seconds:.4f}s (+{seconds / before - 1:.0%})")
+        rss, before = row.get("peak_rss_mb"), base.get("peak_rss_mb")
+        if rss and before and rss > before * (1 + threshold) and rss - before > MIN_RSS_MB:
+            regressions.append(f"{name} peak RSS: {before:.1f} MB -> {rss:.1f} MB (+{rss / before - 1:.0%})")
+        for key in ("segments", "gcode_bytes"):
+            if key in base and base[key] != row[key]:
+                print(f"note: {name} {key} changed {base[key]:,} -> {row[key]:,}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000])
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--corpus", nargs="*", default=[], help="directories or globs of extra images")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case; the best time per stage counts")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a setting, value parsed as YAML")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    overrides = parse_overrides(args.overrides)
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = build_corpus(args.kinds, args.sizes, workdir, args.corpus)
+        results = run_all(cases, overrides, max(1, args.repeat), workdir)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "overrides": overrides,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results in {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
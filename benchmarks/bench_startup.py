@@ -0,0 +1,154 @@
+"""
+Measure start-up import cost of each entry point and gate it against a budget.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget ui.main_activity=150 --repeat 10
+    python benchmarks/bench_startup.py --output startup.json --baseline startup_baseline.json
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+and the best cumulative time of --repeat runs counts. Besides the time budget
+every target has modules it must never load at import time: the GUI defers
+OpenCV and PIL until first use (warming them up in the background once the
+window is shown), the server front end leaves OpenCV to its workers, and
+nothing under modules/ may pull in Qt. The "window" case times a full start
+up to the first shown MainWindow (offscreen when there is no display).
+Exits 1 on any forbidden import or budget overrun, and with --baseline also
+when a target got slower by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLESS_MODULES = (
+    "modules.batch_converter", "modules.gcode_sender", "modules.job_server", "modules.live_preview",
+    "modules.pipeline", "modules.raster_engraver", "modules.toolpath_geometry",
+)
+
+# target -> (milliseconds allowed, modules it must not import)
+TARGETS = {
+    "ui.main_activity": (400, ("cv2", "PIL.Image")),
+    "cli": (600, ()),
+    "server": (400, ("cv2", "PIL.Image")),
+    "send": (150, ("cv2", "numpy")),
+    "modules": (800, ("PyQt5",)),
+}
+WINDOW_BUDGET_MS = 2000
+
+WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from ui.main_activity import MainWindow
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+print(round((time.perf_counter() - start) * 1000, 1))
+"""
+
+# differences below this are interpreter and disk cache noise, never regressions
+MIN_MS = 10.0
+
+
+def import_time(target):
+    """
+    One fresh import of target: (cumulative ms, set of modules loaded).
+    """
+    names = HEADLESS_MODULES if target == "modules" else (target,)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join(names)}"], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr[-2000:]}")
+    loaded, total_us = set(), 0
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # the column header
+        name = fields[2].strip()
+        loaded.add(name)
+        if fields[2] == f" {name}" and name in names:  # top level, so not counted twice
+            total_us += int(fields[1])
+    return total_us / 1000, loaded
+
+
+def window_time():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # fresh working directory so the window's SettingsManager never touches the repo's config.yaml
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, "-c", WINDOW_SCRIPT], cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"starting the window failed:\n{proc.stderr[-2000:]}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def parse_budgets(pairs):
+    budgets = {name: ms for name, (ms, _) in TARGETS.items()}
+    budgets["window"] = WINDOW_BUDGET_MS
+    for pair in pairs:
+        name, sep, ms = pair.partition("=")
+        if not sep or name not in budgets:
+            raise SystemExit(f"bad --budget {pair!r}, expected TARGET=MS with TARGET one of {', '.join(budgets)}")
+        budgets[name] = float(ms)
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS) + ["window"],
+                        default=list(TARGETS) + ["window"])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target; the best counts")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS", help="override a budget")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+    budgets = parse_budgets(args.budget)
+
+    results, failures = {}, []
+    for target in args.targets:
+        if target == "window":
+            try:
+                ms = min(window_time() for _ in range(max(1, args.repeat)))
+            except RuntimeError as exc:
+                print(f"skipping window: {exc}", file=sys.stderr)
+                continue
+            forbidden = []
+        else:
+            runs = [import_time(target) for _ in range(max(1, args.repeat))]
+            ms = min(t for t, _ in runs)
+            forbidden = sorted(set(TARGETS[target][1]) & runs[0][1])
+        results[target] = {"ms": round(ms, 1), "budget_ms": budgets[target]}
+        print(f"{target:>18} {ms:8.1f} ms  (budget {budgets[target]:.0f} ms)", file=sys.stderr)
+        for name in forbidden:
+            failures.append(f"{target} imports {name} at start-up")
+        if ms > budgets[target]:
+            failures.append(f"{target} took {ms:.1f} ms, budget {budgets[target]:.0f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                                "repeat": args.repeat}, "results": results}, f, indent=2)
+        print(f"results in {args.output}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+        for target, row in results.items():
+            before = baseline.get(target, {}).get("ms")
+            if before and row["ms"] > before * (1 + args.threshold) and row["ms"] - before > MIN_MS:
+                failures.append(f"{target} {before:.1f} -> {row['ms']:.1f} ms")
+
+    for line in failures:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Microbenchmark the SVG serializer against the original per-point generator.
+
+    python benchmarks/bench_svg_writer.py --counts 1000 10000 100000
+
+Also checks that the default output matches the original byte-for-byte on
+integer contours and that two runs produce identical files.
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.svg_writer import SvgWriter  # noqa: E402
+from modules.toolpath import Toolpath  # noqa: E402
+
+
+def legacy_write(toolpath, svg_path):
+    """
+    The serializer RasterSVGConverter used before SvgWriter.
+    """
+    with open(svg_path, 'w') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{toolpath.width}" height="{toolpath.height}">')
+        for pts, closed in toolpath:
+            d = 'M ' + ' L '.join(f'{x},{y}' for x, y in pts) + (' Z' if closed else '')
+            f.write(f'<path d="{d}" stroke="black" fill="none"/>')
+        f.write('</svg>')
+
+
+def make_toolpath(count, seed=0):
+    rng = np.random.default_rng(seed)
+    toolpath = Toolpath(4000, 4000)
+    for _ in range(count):
+        n = int(rng.integers(4, 40))
+        pts = np.cumsum(rng.integers(-3, 4, size=(n, 2)), axis=0) + rng.integers(0, 4000, size=2)
+        toolpath.add(pts.astype(np.int32))
+    return toolpath
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'paths':>8} {'legacy':>8} {'bulk':>8} {'compact':>8} {'speedup':>8} {'MB':>7} {'compact MB':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy_path = os.path.join(workdir, "legacy.svg")
+        bulk_path = os.path.join(workdir, "bulk.svg")
+        again_path = os.path.join(workdir, "again.svg")
+        compact_path = os.path.join(workdir, "compact.svg")
+        for count in args.counts:
+            toolpath = make_toolpath(count)
+            legacy_s = timed(legacy_write, toolpath, legacy_path)
+            bulk_s = timed(SvgWriter().write, toolpath, bulk_path)
+            compact_s = timed(SvgWriter(compact=True).write, toolpath, compact_path)
+
+            SvgWriter().write(toolpath, again_path)
+            assert filecmp.cmp(legacy_path, bulk_path, shallow=False), "default output differs from legacy"
+            assert filecmp.cmp(bulk_path, again_path, shallow=False), "output is not deterministic"
+
+            print(f"{count:>8} {legacy_s:8.3f} {bulk_s:8.3f} {compact_s:8.3f} {legacy_s / bulk_s:7.1f}x "
+                  f"{os.path.getsize(bulk_path) / 1e6:7.2f} {os.path.getsize(compact_path) / 1e6:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Headless batch conversion without Qt.
+
+    python -m cli images/ "scans/**/*.png" -o output -j 8 --set svg_mode=canny
+"""
+import argparse
+import os
+import sys
+
+import yaml
+
+from modules.batch_converter import BatchConverter, collect_inputs
+from modules.instrumentation import format_duration, prometheus_text
+
+
+def parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected key=value, got {pair!r}")
+        overrides[key] = yaml.safe_load(value)
+    return overrides
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Convert images to G-code headlessly.")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into directories and ** globs")
+    parser.add_argument("-c", "--config", default="config.yaml", help="settings file (read only)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a setting, value parsed as YAML")
+    parser.add_argument("--summary", help="JSON lines summary path (default: OUTPUT_DIR/summary.jsonl)")
+    parser.add_argument("--metrics", help="write stage seconds and item counters in Prometheus text format")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump per image into DIR")
+    parser.add_argument("--trace-memory", action="store_true", help="record each stage's Python heap peak")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        overrides = parse_overrides(args.overrides)
+    except argparse.ArgumentTypeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    paths = collect_inputs(args.inputs, args.recursive)
+    if not paths:
+        print("error: no supported images found", file=sys.stderr)
+        return 2
+
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.jsonl")
+
+    def on_result(row, done, total):
+        detail = row.get("gcode") if row["status"] == "ok" else row.get("error")
+        print(f"[{done}/{total}] {row['status']:5} {row['input']} -> {detail}", file=sys.stderr)
+
+    batch = BatchConverter(args.output_dir, args.config, overrides, args.workers, args.profile, args.trace_memory)
+    rows = batch.run(paths, summary_path, on_result)
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            f.write(prometheus_text(rows))
+    failed = sum(row["status"] != "ok" for row in rows)
+    print(f"{len(rows) - failed} converted, {failed} failed, summary in {summary_path}", file=sys.stderr)
+    machine = sum(row.get("machine_time_s", 0.0) for row in rows)
+    if machine:
+        print(f"machine time: {format_duration(machine)}", file=sys.stderr)
+    hits = sum(row.get("cache_hits", 0) for row in rows)
+    misses = sum(row.get("cache_misses", 0) for row in rows)
+    if hits or misses:
+        print(f"cache: {hits} hits, {misses} misses", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
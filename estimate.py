@@ -0,0 +1,57 @@
+"""
+Estimate how long G-code files take on the machine.
+
+    python -m estimate output/*.gcode --profile default
+"""
+import argparse
+import json
+import sys
+
+from modules.instrumentation import format_duration
+from modules.setting_manager import SettingsManager
+from modules.time_estimator import TimeEstimator
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m estimate", description="Estimate machine time of G-code files.")
+    parser.add_argument("gcode", nargs="+", help="G-code files")
+    parser.add_argument("-c", "--config", default="config.yaml", help="settings file with machine_profiles (read only)")
+    parser.add_argument("--profile", help="machine profile (default: machine_profile from the settings)")
+    parser.add_argument("--json", action="store_true", help="print one JSON line per file instead of a table")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = SettingsManager(args.config, persist=False)
+    if args.profile:
+        settings.update({"machine_profile": args.profile})
+    try:
+        estimator = TimeEstimator(settings)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    failed, total = 0, 0.0
+    for path in args.gcode:
+        try:
+            report = estimator.estimate_gcode(path)
+        except OSError as exc:
+            print(f"error: {path}: {exc}", file=sys.stderr)
+            failed += 1
+            continue
+        total += report["machine_time_s"]
+        if args.json:
+            print(json.dumps({"gcode": path, **report}))
+            continue
+        print(f"{format_duration(report['machine_time_s']):>10}  cut {format_duration(report['machine_cut_time_s'])}"
+              f"  rapid {format_duration(report['machine_rapid_time_s'])}  {path}")
+        for layer, seconds in report.get("machine_layer_times_s", {}).items():
+            print(f"{'':>10}  layer {layer}: {format_duration(seconds)}")
+    if len(args.gcode) > 1 and not args.json:
+        print(f"{format_duration(total):>10}  total")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
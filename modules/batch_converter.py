@@ -0,0 +1,139 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .image_loader import ImageLoader
+from .instrumentation import Instrumentation
+from .setting_manager import SettingsManager
+from .stage_cache import StageCache
+
+_worker_caches = {}
+
+
+def collect_inputs(patterns, recursive=False):
+    """
+    Expand files, directories and glob patterns into a sorted, de-duplicated
+    list of supported image paths.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, files in walker:
+                found.update(os.path.join(root, f) for f in files)
+        else:
+            found.update(glob.glob(pattern, recursive=recursive))
+    return sorted(p for p in found if os.path.isfile(p) and ImageLoader.is_supported(p))
+
+
+def output_names(paths):
+    """
+    Map each input to a unique output stem, suffixing clashes like name_1.
+    """
+    names, used = {}, set()
+    for path in paths:
+        stem = base = os.path.splitext(os.path.basename(path))[0]
+        n = 1
+        while stem in used:
+            stem = f"{base}_{n}"
+            n += 1
+        used.add(stem)
+        names[path] = stem
+    return names
+
+
+def _init_worker():
+    # one process per core already; stop OpenCV spawning its own thread pool in each
+    import cv2
+    cv2.setNumThreads(1)
+    from . import pipeline  # noqa: F401  load the pipeline once per worker, ahead of its first job
+
+
+def _worker_cache(settings):
+    """
+    One StageCache per worker process, so the image-hash memo survives across files.
+    """
+    if not settings.get("cache_enabled"):
+        return None
+    ident = (settings.get("cache_dir"), settings.get("cache_max_mb"))
+    if ident not in _worker_caches:
+        _worker_caches[ident] = StageCache.from_settings(settings)
+    return _worker_caches[ident]
+
+
+def convert_one(image_path, output_dir, output_name, config_path, overrides, profile_dir=None, trace_memory=False):
+    """
+    Worker entry point. Never raises: failures are reported in the summary row.
+    With profile_dir, a cProfile dump is written there as OUTPUT_NAME.prof.
+    """
+    # deferred so that importing this module (e.g. the job server front end) does not load OpenCV
+    from .pipeline import ConversionPipeline
+
+    start = time.perf_counter()
+    row = {"input": image_path, "output_name": output_name}
+    instrumentation = Instrumentation(profile=bool(profile_dir), trace_memory=trace_memory)
+    try:
+        settings = SettingsManager(config_path, persist=False)
+        settings.update(overrides)
+        cache = _worker_cache(settings)
+        before = cache.stats() if cache else None
+        pipeline = ConversionPipeline(settings, cache, instrumentation)
+        row["gcode"] = pipeline.run(image_path, output_dir, output_name)
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            instrumentation.dump_profile(os.path.join(profile_dir, f"{output_name}.prof"))
+        row["status"] = "ok"
+        row.update(instrumentation.metrics())
+        row.update(pipeline.report)
+        if cache:
+            after = cache.stats()
+            row["cache_hits"] = after["cache_hits"] - before["cache_hits"]
+            row["cache_misses"] = after["cache_misses"] - before["cache_misses"]
+    except Exception as exc:
+        row["status"] = "error"
+        row["error"] = str(exc)
+    row["seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+class BatchConverter:
+    """
+    Converts many images across a process pool and appends one JSON line per
+    file to the summary as results arrive.
+    """
+    def __init__(self, output_dir, config_path="config.yaml", overrides=None, workers=None,
+                 profile_dir=None, trace_memory=False):
+        self.output_dir = output_dir
+        self.config_path = config_path
+        self.overrides = overrides or {}
+        self.workers = workers or os.cpu_count() or 1
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+
+    def run(self, paths, summary_path, on_result=None):
+        """
+        Convert every path and return the list of summary rows.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        names = output_names(paths)
+        rows = []
+        with open(summary_path, "w") as summary, \
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(convert_one, path, self.output_dir, names[path], self.config_path, self.overrides,
+                            self.profile_dir, self.trace_memory): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as exc:  # the worker process itself died
+                    row = {"input": futures[future], "status": "error", "error": f"worker crashed: {exc}"}
+                rows.append(row)
+                summary.write(json.dumps(row) + "\n")
+                summary.flush()
+                if on_result:
+                    on_result(row, len(rows), len(paths))
+        return rows
@@ -0,0 +1,95 @@
+import threading
+
+import cv2
+from PIL import Image
+
+# IMREAD_REDUCED_* flags by power-of-two factor, largest first; JPEGs are scaled inside the decoder
+REDUCED_COLOR = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+class DecodedImage:
+    """
+    One image file shared by validation, thumbnails, the live preview and
+    conversion, so each resolution is decoded at most once.
+
+    open() reads only the header. pixels is the full-resolution BGR array,
+    decoded on first use and then handed out as is: it is read-only, so
+    OpenCV and Qt (see ui.main_activity.qimage_view) can both work on the
+    same buffer without copies. thumbnail() decodes at reduced resolution
+    (IMREAD_REDUCED_*) unless the full image is already in memory.
+    """
+    def __init__(self, path: str, size):
+        self.path = path
+        self.size = size
+        self._pixels = None
+        self._thumbnails = {}
+        self._lock = threading.Lock()  # the preview and conversion threads may ask at the same time
+
+    @classmethod
+    def open(cls, path: str):
+        try:
+            with Image.open(path) as img:
+                size = img.size
+        except Exception as e:
+            raise ValueError(f"Failed to load image: {e}")
+        return cls(path, size)
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def decoded(self) -> bool:
+        return self._pixels is not None
+
+    @property
+    def pixels(self):
+        with self._lock:
+            if self._pixels is None:
+                img = cv2.imread(self.path, cv2.IMREAD_COLOR)
+                if img is None:
+                    raise ValueError(f"Failed to decode image: {self.path}")
+                img.flags.writeable = False
+                self._pixels = img
+            return self._pixels
+
+    def thumbnail(self, max_side: int):
+        """
+        BGR array fitting in max_side x max_side (never upscaled).
+        """
+        with self._lock:
+            if max_side in self._thumbnails:
+                return self._thumbnails[max_side]
+            img = self._pixels
+            if img is None:
+                img = self._reduced_decode(max_side)
+            h, w = img.shape[:2]
+            factor = min(1.0, max_side / max(h, w))
+            if factor < 1.0:
+                img = cv2.resize(img, (max(1, round(w * factor)), max(1, round(h * factor))),
+                                 interpolation=cv2.INTER_AREA)
+            img.flags.writeable = False
+            self._thumbnails[max_side] = img
+            return img
+
+    def _reduced_decode(self, max_side: int):
+        for factor, flag in REDUCED_COLOR:
+            if max(self.size) / factor >= max_side:
+                img = cv2.imread(self.path, flag)
+                if img is not None:
+                    return img
+        img = cv2.imread(self.path, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to decode image: {self.path}")
+        return img
+
+    def release(self):
+        """
+        Drop the full-resolution pixels; thumbnails stay.
+        """
+        with self._lock:
+            self._pixels = None
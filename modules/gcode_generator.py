@@ -1,14 +1,36 @@
 import subprocess
 import os
 
+from .gcode_writer import NativeGcodeWriter
+from .instrumentation import Instrumentation
+
 class GcodeGenerator:
     """
-    Generates G-code from an SVG using the Rust svg2gcode CLI.
+    Generates G-code from traced contours with the native writer, or from an SVG
+    using the Rust svg2gcode CLI.
     """
-    def __init__(self, settings_manager):
+    BACKENDS = ("native", "svg2gcode")
+
+    def __init__(self, settings_manager, instrumentation=None):
         self.settings = settings_manager
+        self.instrumentation = instrumentation or Instrumentation()
+
+    def convert_to_gcode(self, svg_path: str, gcode_path: str, toolpath=None):
+        """
+        Write G-code for the job. The native backend needs the traced toolpath;
+        without one the SVG is handed to svg2gcode instead.
+        """
+        with self.instrumentation.stage("gcode"):
+            if self.settings.get("gcode_backend") == "native" and toolpath is not None:
+                try:
+                    NativeGcodeWriter(self.settings, self.instrumentation).write(toolpath, gcode_path)
+                except Exception as err:
+                    raise RuntimeError(f"Native G-code generation failed:\n{err}")
+                return
+            self.run_svg2gcode(svg_path, gcode_path)
+            self.instrumentation.count("gcode_lines", _count_lines(gcode_path))
 
-    def convert_to_gcode(self, svg_path: str, gcode_path: str):
+    def run_svg2gcode(self, svg_path: str, gcode_path: str):
         out_dir = os.path.dirname(gcode_path)
         if out_dir and not os.path.exists(out_dir):
             os.makedirs(out_dir, exist_ok=True)
@@ -28,7 +50,7 @@ class GcodeGenerator:
             result = subprocess.run(cmd, capture_output=True, text=True)
         except FileNotFoundError:
             raise RuntimeError("svg2gcode CLI not found — make sure it's installed and on your PATH")
-        
+
         # the svg2gcode api doesnt include the feature of adding end command, we do it manually
         try:
             with open(gcode_path, "a") as gcode:
@@ -37,4 +59,9 @@ class GcodeGenerator:
             raise RuntimeError(f"Failed to append M2 command to G-code file:\n{err}")
 
         if result.returncode != 0:
-            raise RuntimeError(f"svg2gcode failed:\n{result.stderr.strip()}")
\ No newline at end of file
+            raise RuntimeError(f"svg2gcode failed:\n{result.stderr.strip()}")
+
+
+def _count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
@@ -0,0 +1,279 @@
+import os
+import re
+
+from .gcode_parser import NON_MOTION_G
+from .instrumentation import Instrumentation
+
+# a line made only of letter+number words (and blanks), after its comment is cut off
+_SIMPLE_LINE = re.compile(r"(?:\s*[A-Za-z]\s*[-+]?(?:\d+\.?\d*|\.\d+))*\s*")
+_WORD = re.compile(r"([A-Za-z])\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+_COMMENT = re.compile(r"[;(]")
+# the common case, a straight move or modal line written as G X Y Z F S in that order
+_NUMBER = r"([-+]?(?:\d+\.?\d*|\.\d+))"
+_MOVE = re.compile(rf"(?:G0*([01])(?![\d.]))?\s*(?:X{_NUMBER})?\s*(?:Y{_NUMBER})?\s*(?:Z{_NUMBER})?\s*"
+                   rf"(?:F{_NUMBER})?\s*(?:S{_NUMBER})?\s*$")
+
+# words a move line may carry and still be rewritten; anything else is copied through verbatim
+MOVE_LETTERS = frozenset("GXYZIJKRFS")
+AXES = ("X", "Y", "Z")
+ARC_WORDS = ("I", "J", "K", "R")
+
+# rounded numbers are memoized per source spelling up to this many entries
+NUMBER_CACHE_SIZE = 1 << 18
+
+
+class GcodeOptimizer:
+    """
+    Streaming clean-up of a finished G-code file, whatever backend wrote it.
+    One pass line by line in constant memory:
+
+    - numbers are rounded to gcode_precision decimals, trailing zeros dropped
+    - moves that go nowhere at that precision are dropped
+    - G0/G1/G2/G3, F and S are only written when they change, and unchanged
+      axes are left out of straight moves (arcs keep their end point)
+    - a tool-off command directly followed by the same tool's tool-on (only
+      dropped moves in between) is removed with it, as is a tool command
+      repeating the current tool state
+
+    Tool commands are the tool_on_cmd/tool_off_cmd lines and the
+    layer_tool_cmds pairs, matched as whole lines and copied as written.
+    Lines the optimizer does not understand (other G or M codes, comments,
+    line numbers, relative G91 moves) are copied verbatim and only update
+    the tracked modal state, forgetting the position where it can no longer
+    be known.
+    """
+    BUFFER_SIZE = 1 << 20
+    FLUSH_LINES = 8192
+
+    def __init__(self, settings_manager, instrumentation=None):
+        self.instrumentation = instrumentation or Instrumentation()
+        self.precision = max(0, int(settings_manager.get("gcode_precision")))
+        pairs = [tuple(pair) for pair in settings_manager.get("layer_tool_cmds") or []]
+        pairs.append((settings_manager.get("tool_on_cmd"), settings_manager.get("tool_off_cmd")))
+        self.tool_lines = {}
+        for index, (on, off) in enumerate(pairs):
+            if on and off and on.strip() != off.strip():
+                self.tool_lines.setdefault(on.strip(), (index, True))
+                self.tool_lines.setdefault(off.strip(), (index, False))
+        self.report = {}
+        self._numbers = {}
+
+    def optimize(self, src_path: str, dst_path: str = None) -> dict:
+        """
+        Optimize src_path into dst_path (default: in place, through a
+        temporary file). Returns and stores in self.report the byte and line
+        counts before and after.
+        """
+        dst_path = dst_path or src_path
+        tmp_path = dst_path + ".tmp"
+        total = os.path.getsize(src_path)
+        try:
+            with open(src_path, "r", newline="") as src, \
+                    open(tmp_path, "w", newline="", buffering=self.BUFFER_SIZE) as dst:
+                lines_in, lines_out, bytes_out = self._run(src, dst, total)
+            os.replace(tmp_path, dst_path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise RuntimeError(f"G-code optimization failed: {e}")
+        self.report = {
+            "gcode_bytes_raw": total,
+            "gcode_lines_raw": lines_in,
+            "gcode_bytes": bytes_out,
+            "gcode_lines": lines_out,
+        }
+        self.instrumentation.count("gcode_lines_dropped", lines_in - lines_out)
+        return self.report
+
+    def number(self, text: str) -> str:
+        """
+        A number rounded to the configured precision, as short as possible.
+        """
+        out = self._numbers.get(text)
+        if out is None:
+            out = repr(round(float(text), self.precision))
+            if "e" in out:  # repr switches to exponents below 1e-4
+                out = ("%.*f" % (self.precision, float(text))).rstrip("0")
+            if out.endswith(".0"):
+                out = out[:-2]
+            elif out.endswith("."):
+                out = out[:-1]
+            if out == "-0":
+                out = "0"
+            if len(self._numbers) < NUMBER_CACHE_SIZE:
+                self._numbers[text] = out
+        return out
+
+    def _run(self, src, dst, total):
+        number, numbers, tool_lines = self.number, self._numbers, self.tool_lines
+        # modal state as last written: motion "0".."3", feed and spindle as rounded
+        # strings, absolute position per axis (None when unknown), tool (pair, on);
+        # "motion" is the source's modal motion, which runs ahead of G when a line
+        # setting it is dropped
+        state = {"G": None, "motion": None, "F": None, "S": None, "X": None, "Y": None, "Z": None,
+                 "absolute": True, "tool": None}
+        pending = None  # a held tool-off line and the state before it
+        out, lines_in, lines_out, bytes_out, bytes_in = [], 0, 0, 0, 0
+
+        def emit(line):
+            nonlocal pending, lines_out, bytes_out
+            if pending is not None:  # whatever comes next, the held tool-off goes first
+                held, pending = pending[0], None
+                emit(held)
+            out.append(line)
+            lines_out += 1
+            bytes_out += len(line)
+
+        for raw in src:
+            lines_in += 1
+            bytes_in += len(raw)
+            if not lines_in % self.FLUSH_LINES:
+                dst.write("".join(out))
+                out.clear()
+                if not lines_in % (self.FLUSH_LINES * 8):
+                    self.instrumentation.progress(bytes_in / max(total, 1))
+            text = raw.strip()
+            if not text:
+                continue
+            line = text + "\n"
+
+            tool = tool_lines.get(text)
+            if tool is not None:
+                if pending is not None and tool[1] and pending[2] == tool[0]:
+                    # off then straight back on: neither reaches the machine, but the source's
+                    # motion mode still moved on (the tool lines or dropped moves may set it)
+                    self._apply(state, text)
+                    state = dict(pending[1], motion=state["motion"])
+                    pending = None
+                    continue
+                if state["tool"] == tool:
+                    continue
+                if not tool[1]:
+                    if pending is not None:
+                        held, pending = pending[0], None
+                        emit(held)
+                    snapshot = dict(state)
+                    self._apply(state, text)
+                    state["tool"] = tool
+                    pending = (line, snapshot, tool[0])
+                    continue
+                emit(line)
+                self._apply(state, text)
+                state["tool"] = tool
+                continue
+
+            move = _MOVE.match(text) if state["absolute"] else None
+            if move is not None:
+                g, x, y, z, f, spindle = move.groups()
+                if g is not None:
+                    state["motion"] = g
+                motion = state["motion"]
+                if motion in ("0", "1") or (x is None and y is None and z is None):
+                    parts = []
+                    for axis, value in (("X", x), ("Y", y), ("Z", z)):
+                        if value is not None:
+                            value = numbers.get(value) or number(value)
+                            if value != state[axis]:
+                                state[axis] = value
+                                parts.append(axis + value)
+                    if parts or (g is not None and x is None and y is None and z is None):
+                        if motion != state["G"]:
+                            state["G"] = motion
+                            parts.insert(0, "G" + motion)
+                    for word, value in (("F", f), ("S", spindle)):
+                        if value is not None:
+                            value = numbers.get(value) or number(value)
+                            if value != state[word]:
+                                state[word] = value
+                                parts.append(word + value)
+                    if parts:
+                        emit(" ".join(parts) + "\n")
+                    continue
+
+            cut = _COMMENT.search(text)
+            code = text[:cut.start()] if cut else text
+            words = _WORD.findall(code) if _SIMPLE_LINE.fullmatch(code) else None
+            if (not words or not state["absolute"] or cut
+                    or any(letter.upper() not in MOVE_LETTERS for letter, _ in words)):
+                emit(line)
+                self._apply(state, code)
+                continue
+
+            values = {letter.upper(): value for letter, value in words}
+            if len(values) != len(words):  # e.g. "G90 G1 X5": more than one word per letter
+                emit(line)
+                self._apply(state, code)
+                continue
+            g = values.pop("G", None)
+            if g is not None:
+                g = number(g)
+                if g not in ("0", "1", "2", "3"):
+                    emit(line)
+                    self._apply(state, code)
+                    continue
+                state["motion"] = g
+            parts = []
+            motion = state["motion"]
+            has_axes = any(a in values for a in AXES)
+            if has_axes or any(a in values for a in ARC_WORDS):
+                if motion is None:  # axis words with no motion mode yet: leave it to the controller
+                    emit(line)
+                    self._apply(state, code)
+                    continue
+                if motion in ("2", "3"):
+                    for axis in AXES:
+                        if axis in values:
+                            state[axis] = values[axis] = number(values[axis])
+                            parts.append(axis + values[axis])
+                    parts += [w + number(values[w]) for w in ARC_WORDS if w in values]
+                else:
+                    for axis in AXES:
+                        if axis in values:
+                            value = number(values[axis])
+                            if value != state[axis]:
+                                state[axis] = value
+                                parts.append(axis + value)
+                if parts and motion != state["G"]:
+                    state["G"] = motion
+                    parts.insert(0, "G" + motion)
+            elif g is not None and g != state["G"]:
+                # a bare motion word only sets the mode
+                state["G"] = motion
+                parts.append("G" + motion)
+            for word in ("F", "S"):
+                if word in values:
+                    value = number(values[word])
+                    if value != state[word]:
+                        state[word] = value
+                        parts.append(word + value)
+            if parts:
+                emit(" ".join(parts) + "\n")
+
+        if pending is not None:
+            held, pending = pending[0], None
+            emit(held)
+        dst.write("".join(out))
+        return lines_in, lines_out, bytes_out
+
+    def _apply(self, state, code):
+        """
+        Update the modal state from a line copied through as written.
+        """
+        words = [(letter.upper(), value) for letter, value in _WORD.findall(code)]
+        codes = [float(value) for letter, value in words if letter == "G"]
+        lost = any(c in NON_MOTION_G or c in (20, 21) for c in codes)
+        for c in codes:
+            if c in (0, 1, 2, 3):
+                state["G"] = state["motion"] = str(int(c))
+            elif c == 90:
+                state["absolute"] = True
+            elif c == 91:
+                state["absolute"] = False
+        for letter, value in words:
+            if letter in ("F", "S"):
+                state[letter] = self.number(value)
+            elif letter in AXES:
+                state[letter] = self.number(value) if state["absolute"] and not lost else None
+        if lost or not state["absolute"]:
+            for axis in AXES:
+                state[axis] = None
@@ -0,0 +1,194 @@
+import numpy as np
+
+from .gcode_writer import MM_PER_INCH
+
+MOTION_RAPID, MOTION_LINEAR, MOTION_CW, MOTION_CCW = 0, 1, 2, 3
+
+# G words that take axis words without moving there
+NON_MOTION_G = (4, 10, 28, 30, 53, 92)
+
+_NEWLINE, _SEMICOLON, _OPEN, _CLOSE = ord("\n"), ord(";"), ord("("), ord(")")
+
+# digit place values, looked up rather than raised to a power per character; int64 holds 19 digits
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+class GcodeProgram:
+    """
+    Every move of a G-code program as flat arrays, one row per move, in file
+    order. Coordinates are absolute millimetres whatever G20/G21 and G90/G91
+    the file used; arc centres are absolute too (NaN for straight moves).
+    """
+    def __init__(self, start, end, motion, center, feed, spindle, line, line_count):
+        self.start = start        # (N, 3) x, y, z before the move
+        self.end = end            # (N, 3) x, y, z after the move
+        self.motion = motion      # (N,) MOTION_* code
+        self.center = center      # (N, 2)
+        self.feed = feed          # (N,) modal F, mm/min
+        self.spindle = spindle    # (N,) modal S
+        self.line = line          # (N,) 0-based source line
+        self.line_count = line_count
+
+    def __len__(self):
+        return len(self.motion)
+
+    @property
+    def cutting(self):
+        return self.motion != MOTION_RAPID
+
+    def bounds(self):
+        """
+        (xmin, ymin, xmax, ymax) over every move endpoint, or None if empty.
+        """
+        if not len(self):
+            return None
+        pts = np.vstack([self.start[:, :2], self.end[:, :2]])
+        return (*pts.min(axis=0), *pts.max(axis=0))
+
+
+def parse_gcode(source) -> GcodeProgram:
+    """
+    Parse G-code from a path or bytes without a per-line Python loop: words
+    are found and their numbers decoded with array operations over the raw
+    bytes, then modal state (motion, units, distance mode, F, S) is carried
+    forward per line with running-maximum fills.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(source, dtype=np.uint8)
+    else:
+        data = np.fromfile(source, dtype=np.uint8)
+    if not len(data) or data[-1] != _NEWLINE:
+        data = np.append(data, np.uint8(_NEWLINE))
+
+    letters, values, lines = _words(data)
+    line_count = int(np.count_nonzero(data == _NEWLINE))
+    return _moves(letters, values, lines, line_count)
+
+
+def _words(data):
+    """
+    (letter, value, line) for every word outside comments.
+    """
+    upper = np.where((data >= ord("a")) & (data <= ord("z")), data - 32, data).astype(np.uint8)
+
+    is_digit = (upper >= ord("0")) & (upper <= ord("9"))
+    is_num = is_digit | (upper == ord(".")) | (upper == ord("-")) | (upper == ord("+"))
+
+    # a word is a letter immediately followed by a run of number characters
+    edges = np.diff(is_num.view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    run_start = np.flatnonzero(edges == 1)
+    run_end = np.flatnonzero(edges == -1)
+    keep = run_start > 0
+    head = upper[run_start[keep] - 1]
+    keep[keep] = (head >= ord("A")) & (head <= ord("Z"))
+    run_start, run_end = run_start[keep], run_end[keep]
+    at = run_start - 1
+
+    # comments are rare, so test each word against them rather than masking every byte:
+    # ';' runs to the end of the line, '(' to the next ')'
+    newlines = np.flatnonzero(upper == _NEWLINE)
+    lines = np.searchsorted(newlines, at)
+    line_start = np.concatenate([[-1], newlines])[lines]
+    inside = np.zeros(len(at), dtype=bool)
+    semis = np.flatnonzero(upper == _SEMICOLON)
+    if len(semis):
+        last = np.searchsorted(semis, at) - 1
+        inside |= (last >= 0) & (semis[np.maximum(last, 0)] > line_start)
+    opens = np.flatnonzero(upper == _OPEN)
+    if len(opens):
+        closes = np.concatenate([[-1], np.flatnonzero(upper == _CLOSE)])
+        open_pos = np.concatenate([[-1], opens])[np.searchsorted(opens, at)]
+        close_pos = closes[np.searchsorted(closes, at) - 1]
+        inside |= open_pos > close_pos
+
+    keep = ~inside
+    run_start, run_end = run_start[keep], run_end[keep]
+    return upper[at[keep]], _parse_numbers(upper, is_digit, run_start, run_end), lines[keep]
+
+
+def _parse_numbers(chars, is_digit, run_start, run_end):
+    """
+    Decode every [sign]digits[.digits] run at once: an exact integer mantissa
+    from the digits, divided by 10 ** (digits after the point).
+    """
+    if not len(run_start):
+        return np.zeros(0)
+    lengths = run_end - run_start
+    first = np.cumsum(lengths) - lengths  # offset of each run in the flattened characters
+    pos = np.arange(lengths.sum()) + np.repeat(run_start - first, lengths)
+    c = chars[pos]
+    digit = is_digit[pos]
+
+    # runs are contiguous in pos, so per-run sums and minimums are reduceat calls
+    big = np.iinfo(np.int64).max
+    dot_pos = np.minimum(np.minimum.reduceat(np.where(c == ord("."), pos, big), first), run_end)
+    digits_per_run = np.add.reduceat(digit.astype(np.int32), first)
+    digit_rank = np.cumsum(digit, dtype=np.int32) - np.repeat(np.cumsum(digits_per_run) - digits_per_run, lengths)
+    power = np.where(digit, np.repeat(digits_per_run, lengths) - digit_rank, 0)  # digits after this one
+    contribution = np.where(digit, (c.astype(np.int64) - ord("0")) * _POW10[np.minimum(power, 18)], 0)
+    mantissa = np.add.reduceat(contribution, first)
+
+    frac_digits = np.add.reduceat((digit & (pos > np.repeat(dot_pos, lengths))).astype(np.int64), first)
+    values = mantissa / 10.0 ** frac_digits
+    negative = chars[run_start] == ord("-")
+    return np.where(negative, -values, values)
+
+
+def _fill(values, initial):
+    """
+    Carry the last non-NaN value forward; lines before the first get initial.
+    """
+    idx = np.where(np.isnan(values), -1, np.arange(len(values)))
+    idx = np.maximum.accumulate(idx)
+    out = values[np.maximum(idx, 0)]
+    out[idx < 0] = initial
+    return out
+
+
+def _per_line(letters, values, lines, letter, line_count, mask=None):
+    out = np.full(line_count, np.nan)
+    sel = letters == ord(letter)
+    if mask is not None:
+        sel &= mask
+    out[lines[sel]] = values[sel]
+    return out
+
+
+def _moves(letters, values, lines, line_count):
+    is_g = letters == ord("G")
+    motion = _fill(_per_line(letters, values, lines, "G", line_count, is_g & np.isin(values, (0, 1, 2, 3))), 0)
+    units = _fill(_per_line(letters, values, lines, "G", line_count, is_g & np.isin(values, (20, 21))), 21)
+    relative = _fill(_per_line(letters, values, lines, "G", line_count, is_g & np.isin(values, (90, 91))), 90) == 91
+    scale = np.where(units == 20, MM_PER_INCH, 1.0)
+
+    non_motion = np.zeros(line_count, dtype=bool)
+    non_motion[lines[is_g & np.isin(values, NON_MOTION_G)]] = True
+
+    moved = np.zeros(line_count, dtype=bool)
+    position = []
+    for axis in "XYZ":
+        words = _per_line(letters, values, lines, axis, line_count) * scale
+        words[non_motion] = np.nan
+        present = ~np.isnan(words)
+        moved |= present
+        # relative words accumulate; an absolute word resets the base so that
+        # base + running delta equals the word on its own line
+        delta = np.cumsum(np.where(present & relative, words, 0.0))
+        base = np.where(present & ~relative, words - delta, np.nan)
+        position.append(_fill(base, 0.0) + delta)
+    position = np.stack(position, axis=1)
+
+    rows = np.flatnonzero(moved)
+    previous = np.vstack([np.zeros((1, 3)), position])[rows]  # position before each moving line
+    end = position[rows]
+    move_motion = motion[rows].astype(np.int8)
+
+    offsets = np.stack([
+        _per_line(letters, values, lines, axis, line_count)[rows] * scale[rows] for axis in "IJ"
+    ], axis=1)
+    arc = move_motion >= MOTION_CW
+    center = np.where(arc[:, None], previous[:, :2] + np.nan_to_num(offsets), np.nan)
+
+    feed = _fill(_per_line(letters, values, lines, "F", line_count) * scale, 0.0)[rows]
+    spindle = _fill(_per_line(letters, values, lines, "S", line_count), 0.0)[rows]
+    return GcodeProgram(previous, end, move_motion, center, feed, spindle, rows, line_count)
@@ -0,0 +1,393 @@
+import os
+import re
+import select
+import socket
+import threading
+import time
+from collections import deque
+
+try:
+    import serial  # pyserial, optional: without it serial ports are driven through termios
+except ImportError:
+    serial = None
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = tty = None
+
+# GRBL's serial receive buffer; the sender never has more unacknowledged characters in flight
+GRBL_RX_BUFFER = 128
+
+# real-time commands: acted on as soon as they arrive, never queued or acknowledged
+FEED_HOLD = b"!"
+CYCLE_START = b"~"
+STATUS_QUERY = b"?"
+SOFT_RESET = b"\x18"
+
+_COMMENT = re.compile(r"\([^)]*\)|;.*")
+_WORD = re.compile(r"^(?:[A-Z][-+]?(?:\d+\.?\d*|\.\d+))+$")
+_AXIS = re.compile(r"[XYZ]")
+
+
+def clean_line(line: str) -> str:
+    """
+    Strip comments and whitespace: every character sent takes room in the
+    controller's receive buffer.
+    """
+    return _COMMENT.sub("", line).replace(" ", "").replace("\t", "").strip().upper()
+
+
+class SerialTransport:
+    """
+    A serial port through pyserial when installed, otherwise through a raw
+    termios file descriptor (POSIX only; also works on a pty).
+    """
+    def __init__(self, port: str, baudrate: int = 115200):
+        self.port = port
+        self.device = None
+        self.fd = None
+        if serial is not None:
+            self.device = serial.Serial(port, baudrate, timeout=0)
+            return
+        if termios is None:
+            raise RuntimeError("Serial ports need pyserial on this platform: pip install pyserial")
+        speed = getattr(termios, f"B{baudrate}", None)
+        if speed is None:
+            raise RuntimeError(f"Unsupported baud rate: {baudrate}")
+        self.fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.fd)
+        attrs = termios.tcgetattr(self.fd)
+        attrs[4] = attrs[5] = speed  # ispeed, ospeed
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+
+    def write(self, data: bytes):
+        if self.device is not None:
+            self.device.write(data)
+            return
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view):]
+            except BlockingIOError:
+                select.select([], [self.fd], [], 1.0)
+
+    def read(self, timeout: float) -> bytes:
+        if self.device is not None:
+            self.device.timeout = timeout
+            return self.device.read(max(1, self.device.in_waiting))
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return b""
+        try:
+            return os.read(self.fd, 4096)
+        except BlockingIOError:
+            return b""
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+        elif self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class TcpTransport:
+    """
+    A controller behind a TCP bridge (ESP3D, ser2net, a WiFi GRBL board).
+    """
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(True)
+
+    def write(self, data: bytes):
+        self.sock.sendall(data)
+
+    def read(self, timeout: float) -> bytes:
+        if not select.select([self.sock], [], [], timeout)[0]:
+            return b""
+        data = self.sock.recv(4096)
+        if not data:
+            raise RuntimeError("Controller closed the connection")
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+def open_transport(target: str, baudrate: int = 115200):
+    """
+    "host:port" opens TCP, anything else is a serial port path.
+    """
+    host, sep, port = target.rpartition(":")
+    if sep and port.isdigit() and not target.startswith("/"):
+        return TcpTransport(host, int(port))
+    return SerialTransport(target, baudrate)
+
+
+class GcodeSender:
+    """
+    Streams G-code with character-counting flow control: lines are sent for
+    as long as the characters of every unacknowledged line fit in the
+    controller's receive buffer, and each "ok" or "error" frees the oldest.
+    The controller's planner stays full even on runs of tiny segments,
+    where send-one-wait-for-ok leaves it idle for a round trip per line.
+
+    pause(), resume() and abort() may be called from another thread while
+    stream() runs; they send GRBL's real-time commands straight away.
+    """
+    def __init__(self, transport, rx_buffer: int = GRBL_RX_BUFFER, stop_on_error: bool = False):
+        self.transport = transport
+        self.rx_buffer = rx_buffer
+        self.stop_on_error = stop_on_error
+        self.paused = False
+        self.aborted = False
+        self.errors = []
+        self.messages = []
+        self.stats = {}
+        self._write_lock = threading.Lock()
+
+    def _write(self, data: bytes):
+        with self._write_lock:
+            self.transport.write(data)
+
+    def pause(self):
+        self.paused = True
+        self._write(FEED_HOLD)
+
+    def resume(self):
+        self.paused = False
+        self._write(CYCLE_START)
+
+    def abort(self):
+        """
+        Soft-reset the controller: motion stops and its buffers are cleared.
+        """
+        self.aborted = True
+        self._write(SOFT_RESET)
+
+    def wait_ready(self, timeout: float = 2.0):
+        """
+        Let the controller finish starting up: most boards reset when the
+        port opens and print a banner a moment later. Returns once the banner
+        has arrived, or after timeout, with everything received discarded.
+        """
+        deadline = time.perf_counter() + timeout
+        received = b""
+        while time.perf_counter() < deadline:
+            received += self.transport.read(0.05)
+            if b"Grbl" in received and received.endswith(b"\n"):
+                return True
+        return False
+
+    def stream(self, lines, on_progress=None, progress_interval: float = 0.5) -> dict:
+        """
+        Send every line of an iterable of G-code lines and wait until the
+        controller has acknowledged them all. Returns the stats dict; errors
+        reported by the controller are collected in self.errors as
+        (line number, line, message).
+        """
+        source = ((n, clean_line(line)) for n, line in enumerate(lines, 1))
+        source = ((n, line) for n, line in source if line)
+        in_flight = deque()  # (line number, line, characters) awaiting a response
+        used = 0
+        sent = acked = sent_bytes = 0
+        pending = next(source, None)
+        received = b""
+        start = last_report = time.perf_counter()
+
+        while not self.aborted and (pending or in_flight):
+            while pending and not self.paused and not self.aborted:
+                n, line = pending
+                data = (line + "\n").encode("ascii")
+                if len(data) > self.rx_buffer:
+                    raise RuntimeError(f"Line {n} is longer than the controller's receive buffer: {line}")
+                if used + len(data) > self.rx_buffer:
+                    break
+                self._write(data)
+                in_flight.append((n, line, len(data)))
+                used += len(data)
+                sent += 1
+                sent_bytes += len(data)
+                pending = next(source, None)
+
+            received += self.transport.read(0.05)
+            *replies, received = received.split(b"\n")
+            for reply in replies:
+                reply = reply.strip().decode("ascii", "replace")
+                if reply == "ok" or reply.startswith("error"):
+                    if not in_flight:
+                        continue  # answer to something sent before streaming began
+                    n, line, size = in_flight.popleft()
+                    used -= size
+                    acked += 1
+                    if reply != "ok":
+                        self.errors.append((n, line, reply))
+                        if self.stop_on_error:
+                            self.abort()
+                elif reply.startswith("Grbl") and in_flight and not self.aborted:
+                    self.errors.append((None, None, "controller reset while streaming"))
+                    self.aborted = True
+                elif reply.startswith("ALARM"):
+                    self.errors.append((None, None, reply))
+                    self.aborted = True  # the controller has locked up; nothing more will be acknowledged
+                elif reply:
+                    self.messages.append(reply)
+
+            now = time.perf_counter()
+            if on_progress and now - last_report >= progress_interval:
+                last_report = now
+                on_progress(self._stats(sent, acked, sent_bytes, used, now - start))
+
+        self.stats = self._stats(sent, acked, sent_bytes, used, time.perf_counter() - start)
+        if on_progress:
+            on_progress(self.stats)
+        return self.stats
+
+    def _stats(self, sent, acked, sent_bytes, used, seconds):
+        return {
+            "lines_sent": sent,
+            "lines_acked": acked,
+            "bytes_sent": sent_bytes,
+            "buffer_used": used,
+            "errors": len(self.errors),
+            "seconds": round(seconds, 3),
+            "lines_per_second": round(acked / seconds, 1) if seconds > 0 else 0.0,
+            "aborted": self.aborted,
+        }
+
+
+class SimulatedGrbl:
+    """
+    A GRBL-like controller on a local pseudo-terminal, for trying senders
+    without a machine. Like the firmware it has a fixed receive buffer (bytes
+    that arrive when it is full are dropped and counted as overflows), a
+    planner of planner_size blocks, and answers "ok" once a line has moved
+    from the receive buffer into the planner. Each motion block takes
+    block_time seconds to execute and every reply is delayed by latency
+    seconds, standing in for USB-serial round trips. Honours "!", "~", "?"
+    and soft reset.
+
+    stats counts overflows, errors, and starvations: times the planner ran
+    dry while the sender still had lines to come.
+    """
+    BANNER = b"\r\nGrbl 1.1h ['$' for help]\r\n"
+
+    def __init__(self, rx_size: int = GRBL_RX_BUFFER, planner_size: int = 15, block_time: float = 0.001,
+                 latency: float = 0.0):
+        if termios is None:
+            raise RuntimeError("The simulated controller needs a POSIX pseudo-terminal")
+        self.rx_size = rx_size
+        self.planner_size = planner_size
+        self.block_time = block_time
+        self.latency = latency
+        self.outbox = deque()  # (due time, bytes)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.rx = bytearray()
+        self.planner = deque()
+        self.held = False
+        self.lines_received = 0
+        self._starving = False
+        self.stats = {"overflows": 0, "errors": 0, "starvations": 0, "max_rx_used": 0}
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._send(self.BANNER)
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send(self, data: bytes):
+        self.outbox.append((time.perf_counter() + self.latency, data))
+
+    def _reply(self, text: str):
+        self._send((text + "\r\n").encode("ascii"))
+
+    def _run(self):
+        block_due = None  # when the head block of the planner finishes
+        while self._running:
+            now = time.perf_counter()
+            if self.held or not self.planner:
+                block_due = None
+            else:
+                if block_due is None:
+                    block_due = now + self.block_time
+                while self.planner and now >= block_due:
+                    self.planner.popleft()
+                    block_due += self.block_time
+                if not self.planner:
+                    block_due = None
+                    self._starving = not self.rx
+
+            while self.outbox and self.outbox[0][0] <= now:
+                os.write(self.master, self.outbox.popleft()[1])
+
+            due = [t for t in (block_due, self.outbox[0][0] if self.outbox else None) if t is not None]
+            timeout = min([0.01] + [max(0.0, t - now) for t in due])
+            if select.select([self.master], [], [], timeout)[0]:
+                self._receive(os.read(self.master, 1024))
+            self._plan()
+
+    def _receive(self, data: bytes):
+        for byte in data:
+            char = bytes((byte,))
+            if char == FEED_HOLD:
+                self.held = True
+            elif char == CYCLE_START:
+                self.held = False
+            elif char == STATUS_QUERY:
+                state = "Hold:0" if self.held else ("Run" if self.planner else "Idle")
+                self._reply(f"<{state}|Bf:{self.planner_size - len(self.planner)},{self.rx_size - len(self.rx)}>")
+            elif char == SOFT_RESET:
+                self.rx.clear()
+                self.planner.clear()
+                self.outbox.clear()
+                self.held = False
+                self._send(self.BANNER)
+            elif len(self.rx) >= self.rx_size:
+                self.stats["overflows"] += 1  # the firmware drops it; the line arrives corrupted
+            else:
+                self.rx.append(byte)
+        self.stats["max_rx_used"] = max(self.stats["max_rx_used"], len(self.rx))
+
+    def _plan(self):
+        """
+        Move complete lines from the receive buffer into the planner while it has room.
+        """
+        while len(self.planner) < self.planner_size:
+            end = self.rx.find(b"\n")
+            if end < 0:
+                return
+            line = self.rx[:end].decode("ascii", "replace").strip().upper()
+            del self.rx[:end + 1]
+            if not line:
+                continue
+            self.lines_received += 1
+            if line.startswith("$") or _WORD.match(line):
+                if self._starving:
+                    self.stats["starvations"] += 1
+                    self._starving = False
+                if _AXIS.search(line):  # only moves take planner time
+                    self.planner.append(line)
+                self._reply("ok")
+            else:
+                self.stats["errors"] += 1
+                self._reply("error:1")
@@ -0,0 +1,140 @@
+import os
+import numpy as np
+
+MM_PER_INCH = 25.4
+
+
+class NativeGcodeWriter:
+    """
+    Emits G-code straight from a traced Toolpath in a single buffered pass.
+    Coordinates are converted from pixels to millimetres at the configured DPI
+    with the origin moved to the bottom-left corner, matching svg2gcode.
+
+    Colour layers become consecutive blocks, each opened by a "; layer" comment
+    and cut with that layer's own tool commands from layer_tool_cmds (a list of
+    [on, off] pairs, darkest layer first), falling back to the global ones.
+    """
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, settings_manager, instrumentation=None):
+        self.instrumentation = instrumentation
+        self.tool_on  = settings_manager.get("tool_on_cmd")
+        self.tool_off = settings_manager.get("tool_off_cmd")
+        self.feedrate = settings_manager.get("feedrate")
+        self.dpi      = settings_manager.get("dpi")
+        self.layer_tools = settings_manager.get("layer_tool_cmds") or []
+
+    def layer_commands(self, layer: int):
+        """
+        (tool on, tool off) for a colour layer.
+        """
+        if layer < len(self.layer_tools):
+            return tuple(self.layer_tools[layer])
+        return self.tool_on, self.tool_off
+
+    def to_machine(self, pts, height):
+        """
+        Convert (N, 2) pixel coordinates to machine millimetres.
+        """
+        scale = MM_PER_INCH / self.dpi
+        xy = np.empty((len(pts), 2), dtype=np.float64)
+        xy[:, 0] = pts[:, 0] * scale
+        xy[:, 1] = (height - pts[:, 1]) * scale
+        return xy
+
+    def write(self, toolpath, gcode_path: str) -> int:
+        """
+        Write the program and return its size in bytes. With instrumentation,
+        progress is reported as paths are written and the lines and paths
+        written are counted.
+        """
+        out_dir = os.path.dirname(gcode_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+
+        arcs = toolpath.arcs or [None] * len(toolpath)
+        with open(gcode_path, "w", buffering=self.BUFFER_SIZE) as f:
+            f.write(f"G21\nG90\n{self.tool_off}\n")
+            tools, current = (self.tool_on, self.tool_off), None
+            instr, lines, written = self.instrumentation, 4, 0
+            for i, ((pts, closed), path_arcs, layer) in enumerate(zip(toolpath, arcs, toolpath.layers)):
+                if instr and not i % 1024:
+                    instr.progress(i / len(toolpath))
+                if len(pts) < 2:
+                    continue
+                if toolpath.layer_colors and layer != current:
+                    current, tools = layer, self.layer_commands(layer)
+                    f.write(f"; layer {layer + 1} {toolpath.layer_colors[layer]}\n")
+                    lines += 1
+                block = self.format_path(self.to_machine(pts, toolpath.height), closed,
+                                         self._machine_arcs(path_arcs, toolpath.height), *tools)
+                f.write(block)
+                lines += block.count("\n")
+                written += 1
+            f.write("M2; End\n")
+        if instr:
+            instr.count("gcode_paths", written)
+            instr.count("gcode_lines", lines)
+        return os.path.getsize(gcode_path)
+
+    def _machine_arcs(self, arcs, height):
+        if arcs is None:
+            return None
+        arcs = np.array(arcs, dtype=np.float64)
+        arcs[:, 2:4] = self.to_machine(arcs[:, 2:4], height)
+        return arcs
+
+    def format_path(self, xy, closed: bool, arcs=None, tool_on=None, tool_off=None) -> str:
+        """
+        Format one polyline: rapid to the start, tool on, feed moves, tool off.
+        All coordinates are formatted in one C-level pass over the flattened array.
+        Arc rows (start, end, cx, cy, cross) in machine coordinates replace the
+        vertices they span with a single G2/G3.
+        """
+        tool_on = self.tool_on if tool_on is None else tool_on
+        tool_off = self.tool_off if tool_off is None else tool_off
+        if closed:
+            xy = np.vstack([xy, xy[:1]])
+        head = f"G0 X{xy[0, 0]:.3f} Y{xy[0, 1]:.3f}\n{tool_on}\nF{self.feedrate}\n"
+        if arcs is None:
+            moves = ("G1 X%.3f Y%.3f\n" * (len(xy) - 1)) % tuple(xy[1:].ravel().tolist())
+            return f"{head}{moves}{tool_off}\n"
+
+        # 0 = line, 1 = inside an arc (skipped), 2 = G2, 3 = G3
+        kind = np.zeros(len(xy), dtype=np.int8)
+        values = np.zeros((len(xy), 4))
+        values[:, :2] = xy
+        for start, end, cx, cy, cross in arcs:
+            start, end = int(start), int(end)
+            kind[start + 1:end] = 1
+            # y is flipped on the way to machine space, so pixel-space turns reverse
+            kind[end] = 3 if cross < 0 else 2
+            values[end, 2:] = (cx - xy[start, 0], cy - xy[start, 1])
+        rows = np.flatnonzero(kind[1:] != 1) + 1
+        templates = np.array(["G1 X%.3f Y%.3f\n", "", "G2 X%.3f Y%.3f I%.3f J%.3f\n", "G3 X%.3f Y%.3f I%.3f J%.3f\n"])
+        columns = np.array([[1, 1, 0, 0], [0, 0, 0, 0], [1, 1, 1, 1], [1, 1, 1, 1]], dtype=bool)
+        moves = "".join(templates[kind[rows]]) % tuple(values[rows][columns[kind[rows]]].tolist())
+        return f"{head}{moves}{tool_off}\n"
+
+    def estimate_size(self, toolpath) -> int:
+        """
+        Byte size the toolpath would take as straight G1 moves, computed from
+        the digit counts of every formatted coordinate without writing anything.
+        """
+        header = len(f"G21\nG90\n{self.tool_off}\n") + len("M2; End\n")
+        per_path = len(f"{self.tool_on}\nF{self.feedrate}\n{self.tool_off}\n")
+        coords, count = [], 0
+        for pts, closed in toolpath:
+            if len(pts) < 2:
+                continue
+            xy = self.to_machine(pts, toolpath.height)
+            coords.append(np.vstack([xy, xy[:1]]) if closed else xy)
+            count += 1
+        if not coords:
+            return header
+        values = np.round(np.concatenate(coords).ravel(), 3)
+        magnitude = np.abs(values)
+        digits = np.where(magnitude >= 1, np.floor(np.log10(np.maximum(magnitude, 1))) + 1, 1)
+        chars = digits + 4 + np.signbit(values)
+        # every vertex is one "Gx X.. Y..\n" line: 7 fixed characters plus both numbers
+        return int(header + count * per_path + chars.sum() + 7 * (len(values) // 2))
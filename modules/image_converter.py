@@ -1,12 +1,116 @@
+from .gcode_writer import MM_PER_INCH, NativeGcodeWriter
+from .instrumentation import Instrumentation
+from .path_optimizer import PathOrderer
+from .path_simplifier import PathSimplifier
 from .raster_svg_converter import RasterSVGConverter
+from .tiled_tracer import TiledTracer
+
+RASTER_STAGES = ("decode", "blur", "mask")
 
 class ImageConverter:
-    def __init__(self, settings_manager):
+    def __init__(self, settings_manager, cache=None, instrumentation=None):
         self.settings = settings_manager
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
         self.converter = RasterSVGConverter(self.settings)
+        self.simplifier = PathSimplifier(self.settings)
+        self.orderer = PathOrderer(self.settings)
+        self.report = {}
+
+    @property
+    def timings(self) -> dict:
+        return self.instrumentation.timings
 
-    def convert_to_svg(self, image_path: str, svg_path: str):
+    def convert_to_svg(self, image_path: str, svg_path: str, keys=None, decoded=None):
+        """
+        Trace the image, simplify and order the paths, fit arcs, write the SVG
+        and return the resulting Toolpath. Per-stage figures land in self.report;
+        stage events, timings and counters go through self.instrumentation.
+        With a cache and its stage keys, work resumes from the deepest stage
+        already on disk. A DecodedImage of image_path, if given, supplies the
+        pixels instead of a fresh decode.
+        """
         try:
-            self.converter.convert_to_svg(image_path, svg_path)
+            toolpath = self.build_toolpath(image_path, keys, decoded)
+            with self.instrumentation.stage("svg"):
+                self.converter.write_svg(toolpath, svg_path)
+            if self.cache:
+                self.cache.put_file("svg", keys["svg"], svg_path)
+            return toolpath
         except Exception as e:
-            raise RuntimeError(f"Image to SVG conversion failed: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Image to SVG conversion failed: {e}")
+
+    def build_toolpath(self, image_path: str, keys=None, decoded=None):
+        cache = self.cache if keys else None
+        if cache:
+            cached = cache.get_toolpath(keys["toolpath"])
+            if cached:
+                toolpath, report = cached
+                self.report.update(report)
+                return toolpath
+
+        instr = self.instrumentation
+        self.converter.artifacts_removed = 0
+        self.converter.outline_length = self.converter.stroke_length = 0.0
+        tiled = self.use_tiles(image_path)
+        if tiled:
+            # raster intermediates are never materialised at full size, so nothing to cache
+            with instr.stage("trace"):
+                toolpath = TiledTracer(self.settings, self.converter).trace(image_path, instr.progress)
+        else:
+            toolpath = self.trace_full_frame(decoded if decoded is not None else image_path, keys)
+        instr.count("contours_traced", len(toolpath))
+
+        report = {"tiled": True} if tiled else {}
+        if toolpath.layer_colors:
+            report["layers"] = len(toolpath.layer_colors)
+        if self.converter.max_artifact_size:
+            report["artifacts_removed"] = self.converter.artifacts_removed
+        if self.converter.traces_strokes() and not tiled:
+            scale = MM_PER_INCH / self.settings.get("dpi")
+            report["cut_length_outlines_mm"] = round(self.converter.outline_length * scale, 1)
+            report["cut_length_mm"] = round(self.converter.stroke_length * scale, 1)
+        with instr.stage("simplify"):
+            simplified, simplify_report = self.simplifier.simplify(toolpath)
+            if simplified is not toolpath:
+                simplify_report["gcode_bytes_unsimplified"] = NativeGcodeWriter(self.settings).estimate_size(toolpath)
+        report.update(simplify_report)
+        with instr.stage("order"):
+            toolpath, order_report = self.orderer.order(simplified)
+            toolpath = self.simplifier.fit_arcs(toolpath)
+        report.update(order_report)
+
+        self.report.update(report)
+        if cache:
+            cache.put_toolpath(keys["toolpath"], toolpath, report)
+        return toolpath
+
+    def use_tiles(self, image_path: str) -> bool:
+        if self.settings.get("svg_mode") in ("color", "fill"):
+            return False  # colour layers need the whole palette, hatch lines the whole scanline
+        mode = self.settings.get("tiled_mode")
+        if mode == "auto":
+            return not TiledTracer.fits_in_memory(image_path, self.settings.get("tile_memory_mb"))
+        return mode == "on"
+
+    def trace_full_frame(self, image_path: str, keys=None):
+        """
+        Decode, blur, mask and trace in memory, resuming from the deepest
+        raster stage found in the cache.
+        """
+        cache = self.cache if keys else None
+        image, resume = image_path, 0
+        if cache:
+            for i in reversed(range(len(RASTER_STAGES))):
+                found = cache.get_array(RASTER_STAGES[i], keys[RASTER_STAGES[i]])
+                if found is not None:
+                    image, resume = found, i + 1
+                    break
+        steps = (self.converter.decode, self.converter.blur, self.converter.mask)
+        for stage, step in zip(RASTER_STAGES[resume:], steps[resume:]):
+            with self.instrumentation.stage(stage):
+                image = step(image)
+            if cache:
+                cache.put_array(keys[stage], image)
+        with self.instrumentation.stage("contours"):
+            return self.converter.contours(image)
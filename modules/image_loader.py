@@ -1,5 +1,4 @@
 import os
-from PIL import Image
 
 class ImageLoader:
     """
@@ -18,17 +17,12 @@ class ImageLoader:
     @staticmethod
     def load_image(file_path):
         """
-        Validate and open an image file using PIL.
+        Validate an image file and return it as a DecodedImage. Only the
+        header is read here; pixels are decoded when first needed.
         """
+        from .decoded_image import DecodedImage  # deferred: checking extensions should not load OpenCV
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Image file not found: {file_path}")
         if not ImageLoader.is_supported(file_path):
             raise ValueError(f"Unsupported file type: {file_path}")
-        try:
-            img = Image.open(file_path)
-            img.verify()  # Verify that it's an image
-        except Exception as e:
-            raise ValueError(f"Failed to load image: {e}")
-        # Re-open after verify because verify() might close the file
-        img = Image.open(file_path)
-        return img
\ No newline at end of file
+        return DecodedImage.open(file_path)
@@ -0,0 +1,180 @@
+import cProfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Pipeline stages in run order with rough relative cost, for overall progress.
+# A tiled run replaces decode..contours with a single "trace" stage.
+PIPELINE_STAGES = (
+    ("decode", 5), ("blur", 2), ("mask", 3), ("contours", 15),
+    ("simplify", 20), ("order", 25), ("svg", 10), ("gcode", 20), ("optimize", 10), ("estimate", 5),
+)
+STAGE_SPANS = {"trace": ("decode", "contours")}
+
+
+class Instrumentation:
+    """
+    Stage timings and item counters for one job, forwarded as events to an
+    optional listener(event) where event is a dict:
+
+        {"type": "start", "stage": name}
+        {"type": "progress", "stage": name, "fraction": 0..1}
+        {"type": "end", "stage": name, "seconds": s}
+        {"type": "count", "counter": name, "value": total}
+
+    With profile or trace_memory, session() also runs cProfile and records
+    the Python heap peak of every stage with tracemalloc. Both slow the job
+    down and are off by default.
+    """
+    def __init__(self, listener=None, profile: bool = False, trace_memory: bool = False):
+        self.listener = listener
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.timings = {}
+        self.counters = {}
+        self.memory_peaks = {}
+        self.profiler = None
+        self.current = None
+        self._lock = threading.Lock()  # counters may be bumped from worker threads
+
+    def _emit(self, event: dict):
+        if self.listener:
+            self.listener(event)
+
+    @contextmanager
+    def session(self):
+        """
+        Wrap a whole job: starts and stops the optional profilers.
+        """
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        try:
+            yield self
+        finally:
+            if self.profiler:
+                self.profiler.disable()
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str):
+        self.current = name
+        self._emit({"type": "start", "stage": name})
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings[name] = round(self.timings.get(name, 0.0) + seconds, 4)
+            if self.trace_memory and tracemalloc.is_tracing():
+                self.memory_peaks[name] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+            self.current = None
+            self._emit({"type": "end", "stage": name, "seconds": seconds})
+
+    def progress(self, fraction: float):
+        """
+        Report how far the current stage has got.
+        """
+        if self.current:
+            self._emit({"type": "progress", "stage": self.current, "fraction": min(max(fraction, 0.0), 1.0)})
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            value = self.counters[name] = self.counters.get(name, 0) + n
+        self._emit({"type": "count", "counter": name, "value": value})
+
+    def metrics(self) -> dict:
+        out = {"timings": dict(self.timings), "counters": dict(self.counters)}
+        if self.memory_peaks:
+            out["heap_peak_mb"] = dict(self.memory_peaks)
+        return out
+
+    def dump_profile(self, path: str):
+        if self.profiler:
+            self.profiler.dump_stats(path)
+
+
+class ProgressTracker:
+    """
+    Turns stage events into one overall fraction using stage weights. A stage
+    starting marks every earlier stage done, so stages skipped thanks to the
+    cache simply jump the bar forward.
+    """
+    def __init__(self, stages=PIPELINE_STAGES, spans=STAGE_SPANS):
+        self.names = [name for name, _ in stages]
+        weights = [weight for _, weight in stages]
+        total = float(sum(weights))
+        self.before = {name: sum(weights[:i]) / total for i, name in enumerate(self.names)}
+        self.share = {name: w / total for name, w in zip(self.names, weights)}
+        for span, (first, last) in spans.items():
+            self.before[span] = self.before[first]
+            self.share[span] = self.before[last] + self.share[last] - self.before[first]
+        self.fraction = 0.0
+
+    def update(self, event: dict) -> float:
+        stage = event.get("stage")
+        if stage in self.before:
+            if event["type"] == "start":
+                done = self.before[stage]
+            elif event["type"] == "progress":
+                done = self.before[stage] + self.share[stage] * event["fraction"]
+            elif event["type"] == "end":
+                done = self.before[stage] + self.share[stage]
+            else:
+                done = self.fraction
+            self.fraction = max(self.fraction, done)
+        return self.fraction
+
+
+def prometheus_text(rows, prefix: str = "image2gcode") -> str:
+    """
+    Aggregate batch summary rows into Prometheus text exposition format,
+    e.g. for node_exporter's textfile collector.
+    """
+    stage_seconds, counters, files = {}, {}, {}
+    machine = {"cut": 0.0, "rapid": 0.0}
+    for row in rows:
+        files[row["status"]] = files.get(row["status"], 0) + 1
+        machine["cut"] += row.get("machine_cut_time_s", 0.0)
+        machine["rapid"] += row.get("machine_rapid_time_s", 0.0)
+        for stage, seconds in row.get("timings", {}).items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+        for name, value in row.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+
+    lines = [
+        f"# HELP {prefix}_files_total Images processed, by outcome.",
+        f"# TYPE {prefix}_files_total counter",
+    ]
+    lines += [f'{prefix}_files_total{{status="{k}"}} {v}' for k, v in sorted(files.items())]
+    lines += [
+        f"# HELP {prefix}_stage_seconds_total Wall-clock seconds spent per pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds_total counter",
+    ]
+    lines += [f'{prefix}_stage_seconds_total{{stage="{k}"}} {v:.4f}' for k, v in sorted(stage_seconds.items())]
+    lines += [
+        f"# HELP {prefix}_items_total Items produced per counter (contours traced, G-code lines written, ...).",
+        f"# TYPE {prefix}_items_total counter",
+    ]
+    lines += [f'{prefix}_items_total{{counter="{k}"}} {v}' for k, v in sorted(counters.items())]
+    lines += [
+        f"# HELP {prefix}_machine_seconds_total Estimated machine time of the programs written, cutting and rapids.",
+        f"# TYPE {prefix}_machine_seconds_total counter",
+    ]
+    lines += [f'{prefix}_machine_seconds_total{{motion="{k}"}} {v:.1f}' for k, v in sorted(machine.items())]
+    return "\n".join(lines) + "\n"
+
+
+def format_duration(seconds: float) -> str:
+    """
+    H:MM:SS, rounded to the second.
+    """
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
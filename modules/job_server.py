@@ -0,0 +1,352 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qsl, urlsplit
+
+import yaml
+
+from .batch_converter import _init_worker, convert_one
+from .image_loader import ImageLoader
+from .setting_manager import SettingsManager
+
+CHUNK_SIZE = 64 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+RESULT_TYPES = {"gcode": "text/x-gcode", "svg": "image/svg+xml"}
+FINISHED = ("done", "error", "cancelled")
+
+# settings a job may override: conversion settings only, nothing naming files or directories
+# (cache_dir, output_filename) or sizing the server's own resources (cache, tiles, workers)
+JOB_SETTINGS = frozenset({
+    "svg_mode", "threshold", "blur_ksize", "canny_low", "canny_high", "edge_dedup", "centerline",
+    "color_tolerance", "max_colors", "group_by_color", "layer_tool_cmds",
+    "remove_background", "background_tolerance", "max_artifact_size",
+    "hatch_spacing", "hatch_angle", "hatch_merge_gap",
+    "raster_min_power", "raster_max_power", "raster_levels", "raster_white_cutoff", "raster_bidirectional",
+    "potrace_turdsize", "potrace_alphamax", "svg_compact",
+    "tool_on_cmd", "tool_off_cmd", "gcode_backend", "gcode_optimize", "gcode_precision",
+    "estimate_time", "machine_profile", "feedrate", "dpi", "optimize_order", "two_opt_time",
+    "simplify_method", "simplify_tolerance", "simplify_units", "arc_fitting", "arc_tolerance",
+})
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Job:
+    def __init__(self, job_id, image_path, output_dir, overrides):
+        self.id = job_id
+        self.image_path = image_path
+        self.output_dir = output_dir
+        self.overrides = overrides
+        self.status = "queued"
+        self.row = {}
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_dict(self, position=None) -> dict:
+        out = {"id": self.id, "status": self.status, "overrides": self.overrides, "submitted": self.submitted}
+        if position is not None:
+            out["queue_position"] = position
+        if self.started:
+            out["started"] = self.started
+        if self.finished:
+            out["finished"] = self.finished
+            out["seconds"] = round(self.finished - (self.started or self.finished), 4)
+        for key, value in self.row.items():
+            if key not in ("input", "output_name", "gcode", "status"):
+                out[key] = value
+        return out
+
+
+class JobServer:
+    """
+    Local HTTP front end to the conversion pipeline. Uploaded images are
+    queued (at most max_queue waiting) and converted on a pool of worker
+    processes, each job with its own settings overrides on top of the
+    config file. A full queue answers 503 with Retry-After instead of
+    buffering without bound.
+
+        POST   /jobs?svg_mode=canny&name=logo.png   body: image bytes  -> 202 job
+        GET    /jobs                                                   -> every job
+        GET    /jobs/ID[?wait=SECONDS]                                 -> status, report
+        GET    /jobs/ID/result[?format=svg]                            -> streamed G-code or SVG
+        DELETE /jobs/ID                                                -> cancel
+        GET    /health                                                 -> queue and worker load
+
+    A queued job is cancelled outright. A running one cannot be interrupted
+    inside its worker process, so it is marked cancelled and its outputs are
+    discarded when the worker returns.
+    """
+    def __init__(self, work_dir="jobs", config_path="config.yaml", workers=None, max_queue=16,
+                 max_connections=64, max_upload_mb=64, keep_jobs=100):
+        self.work_dir = work_dir
+        self.config_path = config_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_connections = max_connections
+        self.max_upload = int(max_upload_mb * (1 << 20))
+        self.keep_jobs = keep_jobs
+        self.known_settings = set(SettingsManager(config_path, persist=False).defaults)
+        self.job_settings = JOB_SETTINGS & self.known_settings
+        self.jobs = OrderedDict()
+        self.queue = None
+        self.pool = None
+        self.server = None
+        self.dispatchers = []
+        self.connections = None
+        self.retry_after = 5
+
+    # ── lifecycle ──
+    async def start(self, host="127.0.0.1", port=8765):
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.queue = asyncio.Queue()
+        self.connections = asyncio.Semaphore(self.max_connections)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # fork the workers now, before any socket exists for them to inherit and hold open
+        for _ in range(self.workers):
+            self.pool.submit(os.getpid)
+        self.dispatchers = [asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.pool.shutdown(wait=True)
+
+    # ── job queue ──
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status != "queued":  # cancelled while waiting
+                    continue
+                job.status = "running"
+                job.started = time.time()
+                try:
+                    job.row = await loop.run_in_executor(
+                        self.pool, convert_one, job.image_path, job.output_dir, "result",
+                        self.config_path, job.overrides,
+                    )
+                except BrokenProcessPool as exc:  # a worker process died; the pool is unusable now
+                    job.row = {"status": "error", "error": f"worker crashed: {exc}"}
+                    self._restart_pool()
+                job.finished = time.time()
+                if job.status == "cancelled":
+                    self._remove_outputs(job)
+                else:
+                    job.status = "done" if job.row.get("status") == "ok" else "error"
+                job.done.set()
+            finally:
+                self.queue.task_done()
+
+    def _restart_pool(self):
+        broken, self.pool = self.pool, ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        broken.shutdown(wait=False)
+
+    @property
+    def queued(self) -> int:
+        return sum(job.status == "queued" for job in self.jobs.values())
+
+    def _check_room(self):
+        # cancelled jobs still sit in the asyncio queue until a dispatcher skips them, so count them out
+        if self.queued >= self.max_queue:
+            raise HttpError(503, "queue full, retry later", {"Retry-After": str(self.retry_after)})
+
+    def submit(self, body: bytes, name: str, overrides: dict) -> Job:
+        unknown = sorted(set(overrides) - self.known_settings)
+        if unknown:
+            raise HttpError(400, f"unknown settings: {', '.join(unknown)}")
+        refused = sorted(set(overrides) - self.job_settings)
+        if refused:
+            raise HttpError(400, f"settings not allowed per job: {', '.join(refused)}")
+        if not ImageLoader.is_supported(name):
+            raise HttpError(400, f"unsupported image type: {name!r}")
+        self._check_room()
+
+        job_id = uuid.uuid4().hex[:12]
+        output_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(output_dir)
+        image_path = os.path.join(output_dir, "input" + os.path.splitext(name)[1].lower())
+        with open(image_path, "wb") as f:
+            f.write(body)
+        job = Job(job_id, image_path, output_dir, overrides)
+        self.queue.put_nowait(job)
+        self.jobs[job_id] = job
+        self._evict()
+        return job
+
+    def cancel(self, job: Job):
+        if job.status in FINISHED:
+            raise HttpError(409, f"job already {job.status}")
+        was_queued = job.status == "queued"
+        job.status = "cancelled"
+        if was_queued:
+            job.finished = time.time()
+            self._remove_outputs(job)
+            job.done.set()
+
+    def position(self, job: Job):
+        if job.status != "queued":
+            return None
+        waiting = [j for j in self.jobs.values() if j.status == "queued"]
+        return waiting.index(job)
+
+    def _remove_outputs(self, job: Job):
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+
+    def _evict(self):
+        """
+        Forget the oldest finished jobs, and their files, beyond keep_jobs.
+        """
+        finished = [j for j in self.jobs.values() if j.status in FINISHED]
+        for job in finished[:max(0, len(finished) - self.keep_jobs)]:
+            self._remove_outputs(job)
+            del self.jobs[job.id]
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "max_queue": self.max_queue, "queued": self.queued, "jobs": counts}
+
+    # ── HTTP ──
+    async def _handle(self, reader, writer):
+        async with self.connections:
+            try:
+                method, target, headers = await self._read_head(reader)
+                await self._route(method, target, headers, reader, writer)
+            except HttpError as exc:
+                await self._send_json(writer, exc.status, {"error": str(exc)}, exc.headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as exc:
+                await self._send_json(writer, 500, {"error": f"internal error: {exc}"})
+            finally:
+                writer.close()
+
+    async def _read_head(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, "request head too large")
+        if len(head) > MAX_HEADER_BYTES:
+            raise HttpError(400, "request head too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, f"malformed request line: {lines[0]!r}")
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(":")
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _read_body(self, reader, headers) -> bytes:
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length required")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HttpError(400, "Content-Length must be an integer")
+        if length < 0:
+            raise HttpError(400, "Content-Length must not be negative")
+        if length > self.max_upload:
+            raise HttpError(413, f"upload larger than {self.max_upload >> 20} MB")
+        return await reader.readexactly(length)
+
+    async def _route(self, method, target, headers, reader, writer):
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts == ["health"] and method == "GET":
+            return await self._send_json(writer, 200, self.stats())
+        if parts == ["jobs"]:
+            if method == "GET":
+                return await self._send_json(writer, 200, [j.to_dict(self.position(j)) for j in self.jobs.values()])
+            if method == "POST":
+                # refuse before reading the upload when there is no room for it
+                self._check_room()
+                body = await self._read_body(reader, headers)
+                name = query.pop("name", "upload.png")
+                try:
+                    overrides = {key: yaml.safe_load(value) for key, value in query.items()}
+                except yaml.YAMLError as exc:
+                    raise HttpError(400, f"bad setting value: {exc}")
+                job = self.submit(body, name, overrides)
+                return await self._send_json(writer, 202, job.to_dict(self.position(job)),
+                                             {"Location": f"/jobs/{job.id}"})
+            raise HttpError(405, f"{method} not allowed on /jobs")
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise HttpError(404, f"no job {parts[1]}")
+            if len(parts) == 2 and method == "GET":
+                if "wait" in query and job.status not in FINISHED:
+                    try:
+                        wait = float(query["wait"])
+                    except ValueError:
+                        raise HttpError(400, "wait must be a number of seconds")
+                    try:
+                        await asyncio.wait_for(job.done.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                return await self._send_json(writer, 200, job.to_dict(self.position(job)))
+            if len(parts) == 2 and method == "DELETE":
+                self.cancel(job)
+                return await self._send_json(writer, 200, job.to_dict())
+            if parts[2] == "result" and method == "GET":
+                return await self._send_result(writer, job, query.get("format", "gcode"))
+        raise HttpError(404, f"no route for {method} {url.path}")
+
+    async def _send_result(self, writer, job, fmt):
+        if fmt not in RESULT_TYPES:
+            raise HttpError(400, f"format must be one of {', '.join(RESULT_TYPES)}")
+        if job.status != "done":
+            raise HttpError(409, f"job is {job.status}")
+        path = os.path.join(job.output_dir, f"result.{fmt}")
+        size = os.path.getsize(path)
+        await self._send_head(writer, 200, RESULT_TYPES[fmt], size,
+                              {"Content-Disposition": f'attachment; filename="{job.id}.{fmt}"'})
+        # drain after every chunk: a slow client holds back the reads instead of filling memory
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                writer.write(chunk)
+                await writer.drain()
+
+    async def _send_head(self, writer, status, content_type, length, headers=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                 f"Content-Length: {length}", "Connection: close"]
+        lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        await self._send_head(writer, status, "application/json", len(body), headers)
+        writer.write(body)
+        await writer.drain()
@@ -0,0 +1,141 @@
+import bisect
+import mmap
+import os
+
+import numpy as np
+
+
+class LineIndex:
+    """
+    Random access to the lines of a large text file through a read-only
+    memory map.
+
+    Instead of one offset per line, only the start of every CHECKPOINT-th line
+    is recorded, so the index stays a few hundred KB even for multi-GB files.
+    A line's offset is found from the nearest checkpoint by scanning at most
+    CHECKPOINT - 1 newlines. build() records checkpoints a chunk at a time and
+    can run on a background thread while lines already indexed are read.
+    """
+    CHECKPOINT = 1024
+    CHUNK_BYTES = 8 << 20
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.checkpoints = [0]
+        self.newlines = 0
+        self.scanned = 0
+        self.cancelled = False
+
+    @property
+    def complete(self) -> bool:
+        return self.scanned >= self.size
+
+    @property
+    def line_count(self) -> int:
+        """
+        Lines indexed so far; final once complete.
+        """
+        partial = self.complete and self.size and self.data[self.size - 1:self.size] != b"\n"
+        return self.newlines + (1 if partial else 0)
+
+    def build(self, on_progress=None):
+        """
+        Scan the whole file, a chunk at a time. on_progress(fraction) is called
+        after every chunk. Stops early if cancel() is called.
+        """
+        step = self.CHECKPOINT
+        while not self.complete and not self.cancelled:
+            end = min(self.scanned + self.CHUNK_BYTES, self.size)
+            chunk = np.frombuffer(self.data, dtype=np.uint8, count=end - self.scanned, offset=self.scanned)
+            starts = np.flatnonzero(chunk == 10) + (self.scanned + 1)
+            # line numbers of those starts are newlines + 1, newlines + 2, ...
+            first = (-(self.newlines + 1)) % step
+            self.checkpoints.extend(starts[first::step].tolist())
+            self.newlines += len(starts)
+            del chunk
+            if hasattr(mmap, "MADV_DONTNEED"):
+                # the pages are clean file pages; let them go so a full scan leaves RSS flat
+                self.data.madvise(mmap.MADV_DONTNEED, self.scanned, end - self.scanned)
+            self.scanned = end
+            if on_progress:
+                on_progress(self.scanned / self.size)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def offset(self, line: int) -> int:
+        """
+        Byte offset of the start of a line that has already been indexed.
+        """
+        line = max(0, min(line, max(self.line_count - 1, 0)))
+        pos = self.checkpoints[line // self.CHECKPOINT]
+        for _ in range(line % self.CHECKPOINT):
+            pos = self.data.find(b"\n", pos) + 1
+        return pos
+
+    def lines(self, start: int, count: int):
+        """
+        Up to count decoded lines beginning at line start.
+        """
+        count = min(count, self.line_count - start)
+        if count <= 0:
+            return []
+        pos = self.offset(start)
+        out = []
+        for _ in range(count):
+            end = self.data.find(b"\n", pos)
+            end = self.size if end < 0 else end
+            out.append(self.data[pos:end].decode("utf-8", errors="replace").rstrip("\r"))
+            pos = end + 1
+        return out
+
+    def line_at(self, offset: int) -> int:
+        """
+        Line number containing a byte offset within the indexed part.
+        """
+        i = bisect.bisect_right(self.checkpoints, offset) - 1
+        return i * self.CHECKPOINT + self.data[self.checkpoints[i]:offset].count(b"\n")
+
+    def search(self, text: str, start_line: int = 0, forward: bool = True, case_sensitive: bool = False):
+        """
+        Line number of the next (or previous) line containing text, wrapping
+        around the indexed part of the file, or None if there is none.
+
+        Uses mmap's memchr-based find/rfind, which is an order of magnitude
+        faster than a regex over the map. Without case_sensitive, the text is
+        matched as typed, upper case and lower case, which covers G-code.
+        """
+        if not text or not self.line_count:
+            return None
+        needles = {text} if case_sensitive else {text, text.upper(), text.lower()}
+        needles = [n.encode("utf-8") for n in needles]
+        limit = self.scanned
+        if forward:
+            pos = self.offset(start_line + 1) if start_line + 1 < self.line_count else limit
+            hit = self._find(needles, pos, limit)
+            hit = self._find(needles, 0, limit) if hit is None else hit
+        else:
+            pos = self.offset(start_line)
+            hit = self._rfind(needles, 0, pos)
+            hit = self._rfind(needles, pos, limit) if hit is None else hit
+        return None if hit is None else self.line_at(hit)
+
+    def _find(self, needles, lo: int, hi: int):
+        hits = [h for h in (self.data.find(n, lo, hi) for n in needles) if h >= 0]
+        return min(hits) if hits else None
+
+    def _rfind(self, needles, lo: int, hi: int):
+        # matches may start before hi and run past it, as with find
+        hits = [h for h in (self.data.rfind(n, lo, min(hi + len(n) - 1, self.scanned)) for n in needles)
+                if 0 <= h < hi]
+        return max(hits) if hits else None
+
+    def close(self):
+        self.cancel()
+        if self.size:
+            self.data.close()
+        self._file.close()
@@ -0,0 +1,169 @@
+import copy
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .decoded_image import DecodedImage
+from .stage_cache import stage_params
+from .tiled_tracer import TiledTracer
+
+# longest side of the quick first pass; the full-resolution pass follows it
+PREVIEW_MAX_SIDE = 800
+
+
+class PreviewCancelled(Exception):
+    """
+    Raised between stages when a newer preview request has superseded this one.
+    """
+
+
+class PreviewSession:
+    """
+    Keeps the raster stages of one image in memory between preview requests,
+    at a downscaled level and at full resolution.
+
+    Each stage result is stored with the settings it was computed from
+    (stage_params), so a request only recomputes from the first stage whose
+    settings changed: moving a Canny threshold reuses the decoded and blurred
+    image, moving the blur kernel reuses only the decode.
+    """
+    def __init__(self, image, settings_manager):
+        # a DecodedImage, shared with the window and the conversion so each resolution is decoded once
+        self.image = DecodedImage.open(image) if isinstance(image, str) else image
+        # images that would be tiled for conversion are previewed from a reduced decode only
+        self.full_allowed = TiledTracer.fits_in_memory(self.image.path, settings_manager.get("tile_memory_mb"))
+        self.levels = {}
+        self.lock = threading.Lock()
+
+    def render(self, converter, simplifier, full: bool, size, is_cancelled=lambda: False):
+        """
+        Trace and simplify at the requested level and draw the result into an
+        RGB array fitting size (w, h). Returns (rgb, info); raises
+        PreviewCancelled as soon as is_cancelled() turns true between stages.
+        """
+        with self.lock:
+            start = time.perf_counter()
+            level = self._level("full" if full and self.full_allowed else "quick")
+            scale = level["scale"]
+            converter, simplifier = _scaled(converter, simplifier, scale)
+
+            values = converter_settings(converter)
+            params = (("blur", stage_params("blur", values)), ("mask", stage_params("mask", values)))
+            raster = converter.mode == "raster"
+            if raster:  # engraved as shades of grey: the blurred image is the preview
+                params = params[:1]
+            image = level["decode"]
+            steps = {"blur": converter.blur, "mask": converter.mask}
+            stale = False
+            for stage, stage_settings in params:
+                if is_cancelled():
+                    raise PreviewCancelled()
+                cached = level.get(stage)
+                if stale or cached is None or cached[0] != stage_settings:
+                    level[stage] = (stage_settings, steps[stage](image))
+                    stale = True
+                image = level[stage][1]
+
+            if is_cancelled():
+                raise PreviewCancelled()
+            if raster:
+                info = {"scale": round(scale, 4), "full": scale == 1.0, "paths": 0, "segments": 0,
+                        "ms": round((time.perf_counter() - start) * 1000)}
+                return draw_shading(image, size), info
+            toolpath, report = simplifier.simplify(converter.contours(image))
+            if is_cancelled():
+                raise PreviewCancelled()
+
+            info = {
+                "scale": round(scale, 4),
+                "full": scale == 1.0,
+                "paths": len(toolpath),
+                "segments": report["segments_after"],
+                "ms": round((time.perf_counter() - start) * 1000),
+            }
+            return draw_toolpath(toolpath, size), info
+
+    def _level(self, name: str) -> dict:
+        if name not in self.levels:
+            self.levels[name] = self._decode(name)
+        return self.levels[name]
+
+    def _decode(self, name: str) -> dict:
+        if name == "full":
+            return {"decode": self.image.pixels, "scale": 1.0}
+        img = self.image.thumbnail(PREVIEW_MAX_SIDE)
+        return {"decode": img, "scale": img.shape[1] / self.image.width}
+
+
+def converter_settings(converter):
+    """
+    The converter's own values, shaped like a SettingsManager for stage_params.
+    """
+    return {
+        "svg_mode": converter.mode,
+        "threshold": converter.thresh,
+        "blur_ksize": converter.blur_ksize,
+        "canny_low": converter.canny_low,
+        "canny_high": converter.canny_high,
+        "color_tolerance": converter.color_tolerance,
+        "max_colors": converter.max_colors,
+        "remove_background": converter.remove_background,
+        "background_tolerance": converter.background_tolerance,
+    }
+
+
+def _scaled(converter, simplifier, scale):
+    """
+    Copies of the converter and simplifier with pixel-sized parameters scaled
+    to a downscaled level, so the preview keeps the look of the full run.
+    """
+    if scale == 1.0:
+        return converter, simplifier
+    converter, simplifier = copy.copy(converter), copy.copy(simplifier)
+    converter.blur_ksize = max(1, int(round(converter.blur_ksize * scale)) | 1)
+    simplifier.tolerance = simplifier.tolerance * scale
+    converter.hatch_spacing = converter.hatch_spacing * scale
+    converter.hatch_merge_gap = converter.hatch_merge_gap * scale
+    return converter, simplifier
+
+
+def draw_toolpath(toolpath, size):
+    """
+    Rasterize a toolpath as anti-aliased lines on white, fitted into size (w, h):
+    dark purple, or each colour layer in its own colour.
+    """
+    w, h = size
+    factor = min(w / max(toolpath.width, 1), h / max(toolpath.height, 1))
+    out_w, out_h = max(1, int(toolpath.width * factor)), max(1, int(toolpath.height * factor))
+    canvas = np.full((out_h, out_w, 3), 255, dtype=np.uint8)
+    if toolpath.layer_colors:
+        parts = zip(toolpath.split_layers(), [_rgb(c) for c in toolpath.layer_colors])
+    else:
+        parts = [(toolpath, (74, 20, 140))]
+    for part, color in parts:
+        if not len(part):
+            continue
+        # 4 fractional bits keep sub-pixel positions when the factor is small
+        polys = [np.round(np.asarray(p, dtype=np.float64) * factor * 16).astype(np.int32) for p in part.paths]
+        closed = np.asarray(part.closed, dtype=bool)
+        if closed.any():
+            cv2.polylines(canvas, [p for p, c in zip(polys, closed) if c], True, color, 1, cv2.LINE_AA, 4)
+        if not closed.all():
+            cv2.polylines(canvas, [p for p, c in zip(polys, closed) if not c], False, color, 1, cv2.LINE_AA, 4)
+    return canvas
+
+
+def draw_shading(gray, size):
+    """
+    A greyscale image as RGB, fitted into size (w, h).
+    """
+    w, h = size
+    factor = min(w / gray.shape[1], h / gray.shape[0])
+    out_w, out_h = max(1, int(gray.shape[1] * factor)), max(1, int(gray.shape[0] * factor))
+    return cv2.cvtColor(cv2.resize(gray, (out_w, out_h), interpolation=cv2.INTER_AREA), cv2.COLOR_GRAY2RGB)
+
+
+def _rgb(hex_color: str):
+    return tuple(int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
@@ -0,0 +1,219 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .decoded_image import DecodedImage
+from .gcode_writer import NativeGcodeWriter
+from .live_preview import draw_toolpath
+from .path_simplifier import PathSimplifier
+from .raster_svg_converter import RasterSVGConverter
+
+# settings a sweep can vary and the modes whose output each one changes
+SWEEP_KEYS = {
+    "threshold": ("contour", "threshold", "fill"),
+    "blur_ksize": ("contour", "threshold", "canny", "fill"),
+    "canny_low": ("canny",),
+    "canny_high": ("canny",),
+}
+SWEEP_MODES = ("contour", "threshold", "canny", "fill")
+# short names in contact sheet captions
+SWEEP_LABELS = {"threshold": "thr", "blur_ksize": "blur", "canny_low": "lo", "canny_high": "hi"}
+
+# contact sheet cells: thumbnail side, margin around it and caption strip under it, in pixels
+THUMB_SIDE = 240
+CELL_MARGIN = 6
+CAPTION_HEIGHT = 32
+
+_attached = {}  # shared blocks this worker process has mapped, by name
+
+
+def parse_range(text: str) -> list:
+    """
+    Integer values of a sweep range: "96,128,160", or "start:stop[:step]"
+    with stop included ("96:160:32").
+    """
+    try:
+        if ":" in text:
+            parts = [int(v) for v in text.split(":")]
+            if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+                raise ValueError(text)
+            start, stop, step = parts if len(parts) == 3 else (*parts, 1)
+            return list(range(start, stop + 1, step))
+        return [int(v) for v in text.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(f"Bad sweep range {text!r}: expected a,b,c or start:stop:step")
+
+
+class ParameterSweep:
+    """
+    Traces one image with every combination of ranges of threshold,
+    blur_ksize and canny_low/canny_high across a process pool, for a
+    contact sheet to pick settings from.
+
+    The image is decoded and turned grey once, into shared memory. Each
+    blur size is computed once, by a worker, into a shared block of its
+    own, and every combination with that blur size masks and traces
+    straight from it: workers map the blocks, so only parameters go out
+    and only counts and thumbnails come back.
+    """
+    def __init__(self, settings_manager, workers=None, thumb_side=THUMB_SIDE):
+        self.settings = dict(settings_manager.settings)
+        self.mode = self.settings["svg_mode"]
+        if self.mode not in SWEEP_MODES:
+            raise ValueError(f"Parameter sweeps need svg_mode {', '.join(SWEEP_MODES)}, not {self.mode}")
+        self.workers = workers or os.cpu_count() or 1
+        self.thumb_side = thumb_side
+
+    def combinations(self, ranges: dict) -> list:
+        """
+        Every combination of ranges (setting -> values) as a dict of the
+        settings that change the output in the current mode; those without
+        a range keep their current value. Canny pairs with low above high
+        are left out.
+        """
+        for key in ranges:
+            if key not in SWEEP_KEYS:
+                raise ValueError(f"Cannot sweep {key}; sweepable settings are {', '.join(SWEEP_KEYS)}")
+        keys = [key for key, modes in SWEEP_KEYS.items() if self.mode in modes]
+        values = [sorted(set(ranges.get(key) or [self.settings[key]])) for key in keys]
+        if any(k < 1 or k % 2 == 0 for k in values[keys.index("blur_ksize")]):
+            raise ValueError("Blur sizes must be odd and positive")
+        combos = [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+        return [c for c in combos if c.get("canny_low", 0) <= c.get("canny_high", 0)]
+
+    def run(self, image, ranges: dict, on_result=None, is_cancelled=lambda: False) -> list:
+        """
+        Trace every combination of an image (path or DecodedImage) and return
+        a result per combination, in combination order: index, params,
+        paths, segments (after simplification), gcode_bytes (as estimated by
+        NativeGcodeWriter), seconds and an RGB thumbnail. on_result(result,
+        done, total) is called as each arrives. Once is_cancelled() turns
+        true, returns what has finished so far.
+        """
+        combos = self.combinations(ranges)
+        if not combos:
+            raise ValueError("No combinations to sweep")
+        image = DecodedImage.open(image) if isinstance(image, str) else image
+        pixels = image.pixels
+        shape = pixels.shape[:2]
+        by_blur = {}
+        for index, params in enumerate(combos):
+            by_blur.setdefault(params["blur_ksize"], []).append(index)
+
+        results, done, blocks = [None] * len(combos), 0, []
+        try:
+            source = _create(shape, blocks)
+            gray = np.ndarray(shape, dtype=np.uint8, buffer=source.buf)
+            cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY, dst=gray)
+            del gray  # a live view would keep the block from closing
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(combos)), initializer=_init_worker) as pool:
+                pending = {}
+                for ksize in by_blur:
+                    target = _create(shape, blocks)
+                    pending[pool.submit(_blur, source.name, target.name, shape, ksize)] = (ksize, target.name)
+                while pending:
+                    finished, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                    if is_cancelled():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+                    for future in finished:
+                        job, value = pending.pop(future), future.result()
+                        if isinstance(job, tuple):  # a blur size is ready: trace its combinations
+                            ksize, name = job
+                            for index in by_blur[ksize]:
+                                future = pool.submit(_trace, name, shape, self.settings, combos[index], self.thumb_side)
+                                pending[future] = index
+                            continue
+                        value["index"] = job
+                        results[job] = value
+                        done += 1
+                        if on_result:
+                            on_result(value, done, len(combos))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return [r for r in results if r is not None]
+
+
+def caption(result) -> tuple:
+    """
+    The two caption lines of a sweep result: its number and settings, then
+    its path and segment counts and estimated G-code size.
+    """
+    params = " ".join(f"{SWEEP_LABELS[k]} {v}" for k, v in result["params"].items())
+    return (f"#{result['index'] + 1}  {params}",
+            f"{result['paths']} paths  {result['segments']} seg  ~{result['gcode_bytes'] / 1024:.0f} KB")
+
+
+def contact_sheet(results, columns: int = 0):
+    """
+    The thumbnails of a sweep on one RGB image, captioned, in a grid of
+    columns (default: about square).
+    """
+    if not results:
+        raise ValueError("No sweep results to draw")
+    columns = columns or math.ceil(math.sqrt(len(results)))
+    side = max(max(r["thumbnail"].shape[:2]) for r in results)
+    cell_w, cell_h = side + 2 * CELL_MARGIN, side + CELL_MARGIN + CAPTION_HEIGHT
+    rows = math.ceil(len(results) / columns)
+    sheet = np.full((rows * cell_h, columns * cell_w, 3), 224, dtype=np.uint8)
+    for n, result in enumerate(results):
+        x, y = (n % columns) * cell_w + CELL_MARGIN, (n // columns) * cell_h + CELL_MARGIN
+        thumb = result["thumbnail"]
+        h, w = thumb.shape[:2]
+        top, left = y + (side - h) // 2, x + (side - w) // 2
+        sheet[top:top + h, left:left + w] = thumb
+        for line, text in enumerate(caption(result)):
+            cv2.putText(sheet, text, (x, y + side + 12 + 12 * line), cv2.FONT_HERSHEY_SIMPLEX, 0.36,
+                        (40, 40, 40), 1, cv2.LINE_AA)
+    return sheet
+
+
+def _create(shape, blocks):
+    block = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1])
+    blocks.append(block)
+    return block
+
+
+def _init_worker():
+    # one process per core already; stop OpenCV spawning its own thread pool in each
+    cv2.setNumThreads(1)
+
+
+def _shared(name, shape):
+    """
+    This worker's view of a shared image block, mapped once per process.
+    """
+    block = _attached.get(name)
+    if block is None:
+        block = _attached[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+
+
+def _blur(source, target, shape, ksize):
+    # the same kernel RasterSVGConverter.blur applies to the grey image
+    cv2.GaussianBlur(_shared(source, shape), (ksize, ksize), 0, dst=_shared(target, shape))
+
+
+def _trace(blurred, shape, settings, params, thumb_side):
+    start = time.perf_counter()
+    settings = {**settings, **params}
+    blur = _shared(blurred, shape)
+    blur.flags.writeable = False  # shared with every other combination of this blur size
+    converter = RasterSVGConverter(settings)
+    toolpath, report = PathSimplifier(settings).simplify(converter.contours(converter.mask(blur)))
+    return {
+        "params": params,
+        "paths": len(toolpath),
+        "segments": report["segments_after"],
+        "gcode_bytes": NativeGcodeWriter(settings).estimate_size(toolpath),
+        "seconds": round(time.perf_counter() - start, 3),
+        "thumbnail": draw_toolpath(toolpath, (thumb_side, thumb_side)),
+    }
@@ -0,0 +1,242 @@
+import time
+import numpy as np
+
+from .gcode_writer import MM_PER_INCH
+from .toolpath import Toolpath
+
+
+class PathOrderer:
+    """
+    Reorders toolpath polylines to cut down rapid travel between them.
+
+    Greedy nearest-neighbour over a uniform grid of candidate entry points
+    (every vertex of a closed path, both ends of an open one), followed by an
+    optional windowed 2-opt pass that runs until no move helps or the time
+    budget is spent. Closed paths are rotated to start at the chosen vertex,
+    open paths are reversed when entered from their far end.
+    """
+    TWO_OPT_WINDOW = 64
+
+    def __init__(self, settings_manager):
+        self.enabled     = settings_manager.get("optimize_order")
+        self.time_budget = settings_manager.get("two_opt_time")
+        self.dpi         = settings_manager.get("dpi")
+
+    def order(self, toolpath: Toolpath):
+        """
+        Return (ordered Toolpath, report) where the report holds rapid travel
+        in millimetres before and after ordering. Colour layers are ordered
+        independently and keep their sequence, sharing the 2-opt budget.
+        """
+        if toolpath.layer_colors:
+            return self._order_layers(toolpath)
+        origin = np.array([0.0, toolpath.height])
+        before = travel_distance(toolpath, origin)
+        if not self.enabled or len(toolpath) < 2:
+            return toolpath, self._report(before, before)
+
+        ordered = self.nearest_neighbour(toolpath, origin)
+        if self.time_budget and self.time_budget > 0:
+            ordered = self.two_opt(ordered, origin, self.time_budget)
+        return ordered, self._report(before, travel_distance(ordered, origin))
+
+    def _order_layers(self, toolpath: Toolpath):
+        parts, before, after = [], 0.0, 0.0
+        budget = self.time_budget
+        self.time_budget = budget / len(toolpath.layer_colors) if budget else budget
+        try:
+            for part in toolpath.split_layers():
+                ordered, report = self.order(part)
+                parts.append(ordered)
+                before += report["travel_before_mm"]
+                after += report["travel_after_mm"]
+        finally:
+            self.time_budget = budget
+        merged = Toolpath.merge_layers(parts, toolpath.layer_colors)
+        return merged, {"travel_before_mm": round(before, 1), "travel_after_mm": round(after, 1)}
+
+    def _report(self, before, after):
+        scale = MM_PER_INCH / self.dpi
+        return {"travel_before_mm": round(before * scale, 1), "travel_after_mm": round(after * scale, 1)}
+
+    def nearest_neighbour(self, toolpath: Toolpath, origin) -> Toolpath:
+        n = len(toolpath)
+        # candidate entry points: all vertices of closed paths, both ends of open ones
+        lengths = np.array([len(p) for p in toolpath.paths])
+        first = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        all_pts = np.concatenate(toolpath.paths).astype(np.float64)
+        all_owner = np.repeat(np.arange(n), lengths)
+        all_vertex = np.arange(len(all_pts)) - np.repeat(first, lengths)
+        keep = np.repeat(np.array(toolpath.closed, dtype=bool), lengths)
+        keep[first] = True
+        keep[first + lengths - 1] = True
+        cand_pts, owner, vertex = all_pts[keep], all_owner[keep], all_vertex[keep]
+
+        grid = _PointGrid(cand_pts, owner, toolpath.width, toolpath.height)
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=n))]).tolist()
+        vertex = vertex.tolist()
+
+        result = Toolpath(toolpath.width, toolpath.height)
+        px, py = float(origin[0]), float(origin[1])
+        for _ in range(n):
+            c = grid.nearest(px, py)
+            i, v = grid.owner_list[c], vertex[c]
+            grid.remove(i, np.arange(bounds[i], bounds[i + 1]))
+            pts, closed = toolpath.paths[i], toolpath.closed[i]
+            if closed:
+                if v:
+                    pts = np.concatenate((pts[v:], pts[:v]))
+                end = pts[0]
+            else:
+                if v:
+                    pts = pts[::-1]
+                end = pts[-1]
+            result.add(pts, closed)
+            px, py = float(end[0]), float(end[1])
+        return result
+
+    def two_opt(self, toolpath: Toolpath, origin, budget: float) -> Toolpath:
+        """
+        Windowed 2-opt on the path sequence. For each offset k all moves
+        reversing paths i+1..i+k are scored at once; non-overlapping
+        improving moves are applied together.
+        """
+        deadline = time.perf_counter() + budget
+        paths, closed = list(toolpath.paths), list(toolpath.closed)
+        n = len(paths)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            # node 0 is the origin; entry/exit of node m is path m-1
+            entry = np.vstack([origin] + [p[0] for p in paths]).astype(np.float64)
+            exit_ = np.vstack([origin] + [p[-1] if not c else p[0] for p, c in zip(paths, closed)]).astype(np.float64)
+            for k in range(1, min(self.TWO_OPT_WINDOW, n + 1)):
+                if time.perf_counter() >= deadline:
+                    break
+                # reverse nodes i+1..j: edges (i, i+1) and (j, j+1) become (i, j) and (i+1, j+1)
+                i = np.arange(0, n - k + 1)
+                j = i + k
+                tail = j < n
+                nxt = entry[np.minimum(j + 1, n)]
+                old = _dist(exit_[i], entry[i + 1]) + np.where(tail, _dist(exit_[j], nxt), 0.0)
+                new = _dist(exit_[i], exit_[j]) + np.where(tail, _dist(entry[i + 1], nxt), 0.0)
+                gain = old - new
+                cand = np.flatnonzero(gain > 1e-9)
+                if not len(cand):
+                    continue
+                taken = np.zeros(n + 2, dtype=bool)
+                for s in cand[np.argsort(-gain[cand])]:
+                    if taken[s:s + k + 2].any():
+                        continue
+                    taken[s:s + k + 2] = True
+                    # nodes s+1..s+k are paths s..s+k-1
+                    paths[s:s + k] = [p if c else p[::-1] for p, c in zip(paths[s:s + k][::-1], closed[s:s + k][::-1])]
+                    closed[s:s + k] = closed[s:s + k][::-1]
+                improved = True
+                break
+        return Toolpath(toolpath.width, toolpath.height, paths, closed)
+
+
+class _PointGrid:
+    """
+    Uniform grid over candidate points. The 3x3 neighbourhood of a query is
+    scanned with plain Python lists, which beats NumPy call overhead for the
+    handful of points involved; wider searches fall back to a NumPy query on
+    per-cell live counts so large empty areas are skipped in one call.
+    """
+    def __init__(self, pts, owner, width, height, per_cell=4):
+        self.pts = pts
+        self.owner = owner
+        self.xs, self.ys, self.owner_list = pts[:, 0].tolist(), pts[:, 1].tolist(), owner.tolist()
+        self.dead = bytearray(int(owner.max()) + 1 if len(owner) else 0)
+        cells = max(1, len(pts) // per_cell)
+        self.cell = max(1.0, float(np.sqrt(max(width, 1) * max(height, 1) / cells)))
+        self.gw = int(max(width, 1) // self.cell) + 1
+        self.gh = int(max(height, 1) // self.cell) + 1
+        cx = np.clip((pts[:, 0] // self.cell).astype(np.int64), 0, self.gw - 1)
+        cy = np.clip((pts[:, 1] // self.cell).astype(np.int64), 0, self.gh - 1)
+        self.cell_of = cy * self.gw + cx
+        self.order = np.argsort(self.cell_of, kind="stable")
+        counts = np.bincount(self.cell_of, minlength=self.gw * self.gh)
+        self.start = np.concatenate([[0], np.cumsum(counts)])
+        self.buckets = [b.tolist() for b in np.split(self.order, self.start[1:-1])]
+        self.live = counts.reshape(self.gh, self.gw).copy()
+
+    def remove(self, owner_id, idx):
+        """
+        Retire all candidates of one path; idx are their candidate indices.
+        """
+        self.dead[owner_id] = 1
+        np.subtract.at(self.live.reshape(-1), self.cell_of[idx], 1)
+
+    def nearest(self, px, py):
+        cx = min(max(int(px // self.cell), 0), self.gw - 1)
+        cy = min(max(int(py // self.cell), 0), self.gh - 1)
+        xs, ys, owner, dead = self.xs, self.ys, self.owner_list, self.dead
+        best, best_d2 = -1, float("inf")
+        for gy in range(max(0, cy - 1), min(self.gh, cy + 2)):
+            row = gy * self.gw
+            for gx in range(max(0, cx - 1), min(self.gw, cx + 2)):
+                bucket = self.buckets[row + gx]
+                if not bucket:
+                    continue
+                stale = False
+                for c in bucket:
+                    if dead[owner[c]]:
+                        stale = True
+                        continue
+                    d2 = (xs[c] - px) ** 2 + (ys[c] - py) ** 2
+                    if d2 < best_d2:
+                        best, best_d2 = c, d2
+                if stale:
+                    self.buckets[row + gx] = [c for c in bucket if not dead[owner[c]]]
+        # the 3x3 block covers everything within one cell width of the query
+        if best >= 0 and best_d2 <= self.cell ** 2:
+            return best
+
+        pos = (px, py)
+        r = 2
+        while True:
+            hit = self._search(pos, cx, cy, r)
+            covers_all = r >= max(self.gw, self.gh)
+            if hit is not None:
+                idx, dist = hit
+                if dist <= r * self.cell or covers_all:
+                    return idx
+                # the hit could still be beaten just outside the window
+                return self._search(pos, cx, cy, int(np.ceil(dist / self.cell)) + 1)[0]
+            if covers_all:
+                raise ValueError("no candidate points left")
+            r *= 2
+
+    def _search(self, pos, cx, cy, r):
+        y0, y1 = max(0, cy - r), min(self.gh, cy + r + 1)
+        x0, x1 = max(0, cx - r), min(self.gw, cx + r + 1)
+        ys, xs = np.nonzero(self.live[y0:y1, x0:x1])
+        if not len(ys):
+            return None
+        cells = (ys + y0) * self.gw + (xs + x0)
+        starts, ends = self.start[cells], self.start[cells + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        idx = self.order[offsets]
+        idx = idx[np.frombuffer(self.dead, dtype=np.uint8)[self.owner[idx]] == 0]
+        d = np.hypot(self.pts[idx, 0] - pos[0], self.pts[idx, 1] - pos[1])
+        k = int(np.argmin(d))
+        return int(idx[k]), d[k]
+
+
+def _dist(a, b):
+    return np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+
+
+def travel_distance(toolpath: Toolpath, origin) -> float:
+    """
+    Total rapid travel in pixels from the origin through every path in order.
+    """
+    if not len(toolpath):
+        return 0.0
+    starts = np.array([p[0] for p in toolpath.paths], dtype=np.float64)
+    ends = np.array([p[0] if c else p[-1] for p, c in toolpath], dtype=np.float64)
+    prev = np.vstack([np.asarray(origin, dtype=np.float64)[None], ends[:-1]])
+    return float(_dist(prev, starts).sum())
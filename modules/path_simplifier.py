@@ -0,0 +1,194 @@
+import numpy as np
+
+from .gcode_writer import MM_PER_INCH
+from .toolpath import Toolpath
+
+
+class PathSimplifier:
+    """
+    Reduces polyline vertex counts and, optionally, fits circular arcs so the
+    native backend can emit G2/G3. All work is done on the concatenated vertex
+    array of every path at once; no per-point Python loops.
+    """
+    METHODS = ("none", "douglas-peucker", "visvalingam")
+    UNITS = ("px", "mm")
+
+    def __init__(self, settings_manager):
+        self.method = settings_manager.get("simplify_method")
+        scale = settings_manager.get("dpi") / MM_PER_INCH if settings_manager.get("simplify_units") == "mm" else 1.0
+        self.tolerance = settings_manager.get("simplify_tolerance") * scale
+        self.arc_fitting = settings_manager.get("arc_fitting")
+        self.arc_tolerance = settings_manager.get("arc_tolerance") * scale
+
+    def simplify(self, toolpath: Toolpath):
+        """
+        Return (simplified Toolpath, report) with segment counts before and after.
+        """
+        before = toolpath.segment_count()
+        if self.method == "none" or self.tolerance <= 0 or not len(toolpath):
+            return toolpath, {"segments_before": before, "segments_after": before}
+
+        pts, starts, lengths = _flatten(toolpath)
+        if self.method == "visvalingam":
+            keep = visvalingam_keep(pts, starts, lengths, self.tolerance ** 2)
+        else:
+            keep = douglas_peucker_keep(pts, starts, lengths, self.tolerance)
+
+        result = Toolpath(toolpath.width, toolpath.height)
+        result.layer_colors = toolpath.layer_colors
+        kept = np.add.reduceat(keep.astype(np.int64), starts)
+        pieces = np.split(pts[keep], np.cumsum(kept)[:-1])
+        for piece, closed, layer in zip(pieces, toolpath.closed, toolpath.layers):
+            if closed:
+                piece = piece[:-1]  # drop the duplicated closing vertex
+                if len(piece) < 3:
+                    continue
+            result.add(piece, closed, layer)
+        return result, {"segments_before": before, "segments_after": result.segment_count()}
+
+    def fit_arcs(self, toolpath: Toolpath) -> Toolpath:
+        """
+        Annotate runs of vertices lying on a common circle. Must run after any
+        stage that reorders vertices, since arcs are stored by vertex index.
+        """
+        if not self.arc_fitting or not len(toolpath):
+            return toolpath
+        toolpath.arcs = [find_arcs(_closed_copy(p, c), self.arc_tolerance) for p, c in toolpath]
+        return toolpath
+
+
+def _closed_copy(pts, closed):
+    pts = np.asarray(pts, dtype=np.float64)
+    return np.vstack([pts, pts[:1]]) if closed else pts
+
+
+def _flatten(toolpath):
+    """
+    Concatenate every path into one float array; closed paths repeat their
+    first vertex at the end so both methods treat them as polylines.
+    """
+    parts = [_closed_copy(p, c) for p, c in toolpath]
+    lengths = np.array([len(p) for p in parts])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.concatenate(parts), starts, lengths
+
+
+def _segment_distance(p, a, b):
+    """
+    Distance from points p to segments a-b, all (N, 2), rows paired.
+    """
+    ab = b - a
+    ap = p - a
+    denom = (ab ** 2).sum(axis=1)
+    t = np.clip(np.divide((ap * ab).sum(axis=1), denom, out=np.zeros(len(p)), where=denom > 0), 0.0, 1.0)
+    return np.hypot(*(ap - ab * t[:, None]).T)
+
+
+def douglas_peucker_keep(pts, starts, lengths, tolerance):
+    """
+    Douglas-Peucker run breadth-first: every pending interval of every path is
+    split in the same NumPy pass, so the loop runs once per recursion level.
+    """
+    keep = np.zeros(len(pts), dtype=bool)
+    ends = starts + lengths - 1
+    keep[starts] = True
+    keep[ends] = True
+    s, e = starts.copy(), ends.copy()
+    while True:
+        inner = e - s - 1
+        open_ = inner > 0
+        s, e, inner = s[open_], e[open_], inner[open_]
+        if not len(s):
+            return keep
+        seg = np.repeat(np.arange(len(s)), inner)
+        idx = np.repeat(s + 1 - np.cumsum(inner) + inner, inner) + np.arange(inner.sum())
+        d = _segment_distance(pts[idx], pts[s[seg]], pts[e[seg]])
+        # first index of the maximum within each interval
+        order = np.lexsort((-d, seg))
+        first = np.concatenate([[0], np.cumsum(inner)[:-1]])
+        best = order[first]
+        split = d[best] > tolerance
+        mid = idx[best][split]
+        keep[mid] = True
+        s, e = np.concatenate([s[split], mid]), np.concatenate([mid, e[split]])
+
+
+def visvalingam_keep(pts, starts, lengths, min_area):
+    """
+    Parallel Visvalingam-Whyatt: each round drops every vertex whose effective
+    triangle area is below min_area and smaller than both neighbours', which
+    never removes two adjacent vertices at once.
+    """
+    n = len(pts)
+    keep = np.ones(n, dtype=bool)
+    path_of = np.repeat(np.arange(len(starts)), lengths)
+    endpoint = np.zeros(n, dtype=bool)
+    endpoint[starts] = True
+    endpoint[starts + lengths - 1] = True
+    # closed paths need at least three distinct vertices plus the repeat
+    min_keep = np.where(np.all(pts[starts] == pts[starts + lengths - 1], axis=1), 4, 2)
+    while True:
+        alive = np.flatnonzero(keep)
+        prev, nxt = np.roll(alive, 1), np.roll(alive, -1)
+        a, b, c = pts[prev], pts[alive], pts[nxt]
+        area = 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+        area[endpoint[alive]] = np.inf
+        left, right = np.roll(area, 1), np.roll(area, -1)
+        drop = (area < min_area) & (area <= left) & (area < right)
+        # respect the per-path minimum vertex count
+        counts = np.bincount(path_of[alive], minlength=len(starts))
+        dropped = np.bincount(path_of[alive[drop]], minlength=len(starts))
+        drop &= (counts - dropped >= min_keep)[path_of[alive]]
+        if not drop.any():
+            return keep
+        keep[alive[drop]] = False
+
+
+def find_arcs(pts, tolerance, min_points=4):
+    """
+    Find runs of consecutive vertices on a common circle. Returns an (K, 5)
+    array of (start, end, cx, cy, cross) rows, where cross is the turn sign in
+    pixel coordinates, or None when nothing fits.
+    """
+    if len(pts) < min_points:
+        return None
+    a, b, c = pts[:-2], pts[1:-1], pts[2:]
+    # circumcentre of every consecutive triple
+    d = 2 * (a[:, 0] * (b[:, 1] - c[:, 1]) + b[:, 0] * (c[:, 1] - a[:, 1]) + c[:, 0] * (a[:, 1] - b[:, 1]))
+    valid = np.abs(d) > 1e-9
+    d = np.where(valid, d, 1.0)
+    sa, sb, sc = (a ** 2).sum(1), (b ** 2).sum(1), (c ** 2).sum(1)
+    cx = (sa * (b[:, 1] - c[:, 1]) + sb * (c[:, 1] - a[:, 1]) + sc * (a[:, 1] - b[:, 1])) / d
+    cy = (sa * (c[:, 0] - b[:, 0]) + sb * (a[:, 0] - c[:, 0]) + sc * (b[:, 0] - a[:, 0])) / d
+    r = np.hypot(a[:, 0] - cx, a[:, 1] - cy)
+    cross = np.sign((b[:, 0] - a[:, 0]) * (c[:, 1] - b[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - b[:, 0]))
+    # reject near-straight triples whose circles are huge
+    valid &= r < 1e4
+
+    # neighbouring triples belong to one arc when their circles agree
+    same = (
+        valid[:-1] & valid[1:] & (cross[:-1] == cross[1:])
+        & (np.hypot(cx[:-1] - cx[1:], cy[:-1] - cy[1:]) + np.abs(r[:-1] - r[1:]) < tolerance)
+    )
+    breaks = np.flatnonzero(~same) + 1
+    run_starts = np.concatenate([[0], breaks])
+    run_ends = np.concatenate([breaks, [len(valid)]])
+    rows, last_end = [], 0
+    for t0, t1 in zip(run_starts, run_ends):
+        if t1 - t0 < min_points - 2 or not valid[t0]:
+            continue
+        # a run of triples t0..t1-1 spans vertices t0..t1+1; arcs may share an endpoint only
+        start, end = max(int(t0), last_end), int(t1) + 1
+        if end - start < min_points - 1:
+            continue
+        centre_x, centre_y = np.median(cx[t0:t1]), np.median(cy[t0:t1])
+        span = pts[start:end + 1]
+        radius = np.hypot(span[:, 0] - centre_x, span[:, 1] - centre_y)
+        # all vertices must sit on the circle and the sweep must stay below a full turn
+        chord = np.hypot(*np.diff(span, axis=0).T)
+        sweep = np.sum(2 * np.arcsin(np.clip(chord / (2 * radius.mean()), 0, 1)))
+        if np.ptp(radius) > tolerance or sweep >= 2 * np.pi - 1e-6:
+            continue
+        rows.append((start, end, centre_x, centre_y, cross[t0]))
+        last_end = end
+    return np.array(rows) if rows else None
@@ -0,0 +1,94 @@
+import os
+
+from .gcode_generator import GcodeGenerator
+from .gcode_optimizer import GcodeOptimizer
+from .image_converter import ImageConverter
+from .instrumentation import Instrumentation
+from .raster_engraver import RasterEngraver
+from .svg_path_converter import SVGPathConverter
+from .time_estimator import TimeEstimator
+
+
+class ConversionPipeline:
+    """
+    Image -> SVG -> G-code for one file. Has no Qt dependency so the GUI
+    worker thread and the headless CLI share the same code path. An optional
+    StageCache lets reruns skip every stage whose inputs are unchanged.
+    Stage events, timings and counters go through the Instrumentation.
+    """
+    def __init__(self, settings_manager, cache=None, instrumentation=None):
+        self.settings = settings_manager
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
+        self.report = {}
+        self.toolpath = None
+
+    @property
+    def timings(self) -> dict:
+        return self.instrumentation.timings
+
+    def run(self, image_path: str, output_dir: str, output_name: str, decoded=None) -> str:
+        """
+        Convert one image and return the G-code path. Figures from every stage
+        are collected in self.report, stage durations in self.timings. The
+        traced Toolpath is kept in self.toolpath unless outputs came straight
+        from the cache or the image was engraved as a raster. With
+        estimate_time, the report includes the machine time of the finished
+        program (see TimeEstimator). decoded, a
+        DecodedImage of image_path, shares pixels already decoded elsewhere
+        (e.g. by the live preview).
+        """
+        svg_path = os.path.join(output_dir, f"{output_name}.svg")
+        gcode_path = os.path.join(output_dir, f"{output_name}.gcode")
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        with self.instrumentation.session():
+            image_converter = ImageConverter(self.settings, self.cache, self.instrumentation)
+            tiled = self.settings.get("svg_mode") != "raster" and image_converter.use_tiles(image_path)
+            keys = self.cache.stage_keys(image_path, self.settings, tiled) if self.cache else None
+            if keys and self._restore(keys, svg_path, gcode_path):
+                return gcode_path
+
+            if self.settings.get("svg_mode") == "raster":
+                engraver = RasterEngraver(self.settings, self.instrumentation)
+                engraver.engrave(decoded if decoded is not None else image_path, gcode_path, svg_path)
+                self.report.update(engraver.report)
+                if keys:
+                    self.cache.put_file("svg", keys["svg"], svg_path)
+            else:
+                svg_converter = SVGPathConverter()
+                gcode_generator = GcodeGenerator(self.settings, self.instrumentation)
+
+                toolpath = self.toolpath = image_converter.convert_to_svg(image_path, svg_path, keys, decoded)
+                self.report.update(image_converter.report)
+
+                svg_path = svg_converter.process_svg(svg_path)
+                gcode_generator.convert_to_gcode(svg_path, gcode_path, toolpath)
+                if self.settings.get("gcode_optimize"):
+                    with self.instrumentation.stage("optimize"):
+                        self.report.update(GcodeOptimizer(self.settings, self.instrumentation).optimize(gcode_path))
+
+            if self.settings.get("estimate_time"):
+                with self.instrumentation.stage("estimate"):
+                    self.report.update(TimeEstimator(self.settings).estimate_gcode(gcode_path))
+
+        self.report["svg_bytes"] = os.path.getsize(svg_path)
+        self.report["gcode_bytes"] = os.path.getsize(gcode_path)
+        if keys:
+            self.cache.put_file("gcode", keys["gcode"], gcode_path)
+            self.cache.put_report(keys["gcode"], self.report)
+        return gcode_path
+
+    def _restore(self, keys, svg_path, gcode_path) -> bool:
+        """
+        Copy finished outputs straight from the cache when nothing changed.
+        """
+        report = self.cache.get_report(keys["gcode"])
+        if report is None:
+            return False
+        if not (self.cache.get_file("gcode", keys["gcode"], gcode_path)
+                and self.cache.get_file("svg", keys["svg"], svg_path)):
+            return False
+        self.report.update(report)
+        return True
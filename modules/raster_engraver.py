@@ -0,0 +1,218 @@
+import base64
+import os
+
+import cv2
+import numpy as np
+
+from .gcode_writer import MM_PER_INCH
+from .instrumentation import Instrumentation
+from .raster_svg_converter import RasterSVGConverter
+
+# blank stretches inside a row at least this many pixels long are crossed with G0, shorter ones at S0
+RAPID_MIN_BLANK = 8
+
+# line layouts by (motion word, Y word, S word); motion 0 = modal (omitted), 1 = G0, 2 = G1
+_TEMPLATES = [
+    f"{motion}X%.3f{' Y%.3f' if y else ''}{' S%d' if s else ''}\n"
+    for motion in ("", "G0 ", "G1 ") for y in (0, 1) for s in (0, 1)
+]
+_COLUMNS = np.array([[True, bool(y), bool(s)] for _ in range(3) for y in (0, 1) for s in (0, 1)])
+
+
+class RasterEngraver:
+    """
+    Grayscale photo engraving: every pixel row of the blurred image becomes
+    a scanline whose laser power (S) follows the darkness of each pixel.
+
+    Power is quantized to raster_levels steps between raster_min_power (the
+    lightest engraved grey) and raster_max_power (black); pixels at or above
+    raster_white_cutoff are blank. Runs of equal power become one move, G1 and
+    S are only written when they change, blank margins are trimmed from each
+    row and fully blank rows skipped, and rows alternate direction when
+    raster_bidirectional is on. Rows are formatted and written in blocks, so
+    memory stays bounded however long the program gets.
+
+    Lasers run in GRBL's dynamic power mode (M4), which also keeps the beam
+    off during G0.
+    """
+    CHUNK_ROWS = 256
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, settings_manager, instrumentation=None):
+        self.settings = settings_manager
+        self.instrumentation = instrumentation or Instrumentation()
+        self.max_power = settings_manager.get("raster_max_power")
+        self.min_power = settings_manager.get("raster_min_power")
+        self.levels = max(2, int(settings_manager.get("raster_levels")))
+        self.white_cutoff = settings_manager.get("raster_white_cutoff")
+        self.bidirectional = settings_manager.get("raster_bidirectional")
+        self.feedrate = settings_manager.get("feedrate")
+        self.dpi = settings_manager.get("dpi")
+        self.report = {}
+
+    def engrave(self, image_path, gcode_path: str, svg_path: str = None):
+        """
+        Decode and blur the image (a path or a DecodedImage), write the
+        G-code and, with svg_path, an SVG preview of the power map. Byte and
+        line counts, with those of naive one-line-per-pixel output for
+        comparison, land in self.report.
+        """
+        converter = RasterSVGConverter(self.settings)
+        instr = self.instrumentation
+        try:
+            with instr.stage("decode"):
+                image = converter.decode(image_path)
+            with instr.stage("blur"):
+                gray = converter.blur(image)
+            with instr.stage("mask"):
+                power = self.power(gray)
+            if svg_path:
+                with instr.stage("svg"):
+                    self.write_preview_svg(power, svg_path)
+            with instr.stage("gcode"):
+                self.write(power, gcode_path)
+        except Exception as e:
+            raise RuntimeError(f"Raster engraving failed: {e}")
+
+    def power(self, gray):
+        """
+        S value per pixel, 0 where blank.
+        """
+        cutoff = float(max(self.white_cutoff, 1))
+        darkness = (cutoff - gray.astype(np.float32)) / cutoff
+        step = np.clip(np.ceil(darkness * (self.levels - 1)), 1, self.levels - 1)
+        span = self.max_power - self.min_power
+        power = np.round(self.min_power + step * (span / (self.levels - 1))).astype(np.int32)
+        power[gray >= self.white_cutoff] = 0
+        return power
+
+    def write(self, power, gcode_path: str) -> int:
+        """
+        Write the program for a power map and return its size in bytes.
+        """
+        out_dir = os.path.dirname(gcode_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        h = power.shape[0]
+        state = {"motion": 0, "s": -1, "rows": 0}
+        lines = 5
+        with open(gcode_path, "w", buffering=self.BUFFER_SIZE) as f:
+            f.write(f"G21\nG90\nM4 S0\nF{self.feedrate}\n")
+            for top in range(0, h, self.CHUNK_ROWS):
+                self.instrumentation.progress(top / h)
+                block, count = self._format_rows(power[top:top + self.CHUNK_ROWS], top, h, state)
+                f.write(block)
+                lines += count
+            f.write("M5\nM2; End\n")
+            lines += 1
+        size = os.path.getsize(gcode_path)
+        naive_bytes, naive_lines = self.naive_size(power)
+        self.report.update({
+            "gcode_lines": lines,
+            "gcode_bytes_naive": naive_bytes,
+            "gcode_lines_naive": naive_lines,
+            "raster_rows": state["rows"],
+        })
+        self.instrumentation.count("gcode_lines", lines)
+        return size
+
+    def _format_rows(self, power, top, height, state):
+        """
+        G-code for a block of rows. state carries the modal motion, the last
+        S written and the count of engraved rows (for direction) between
+        blocks.
+        """
+        k, w = power.shape
+        starts = np.ones((k, w), dtype=bool)
+        starts[:, 1:] = power[:, 1:] != power[:, :-1]
+        first = np.flatnonzero(starts)
+        row, s = np.divmod(first, w)
+        e = np.append(first[1:], k * w) - row * w  # the next run, or the next row, ends this one
+        value = power.ravel()[first]
+
+        margin = (value == 0) & ((s == 0) | (e == w))
+        row, s, e, value = row[~margin], s[~margin], e[~margin], value[~margin]
+        if not len(row):
+            return "", 0
+
+        # rows left after trimming, numbered across blocks so the zigzag carries on
+        heads = np.r_[True, row[1:] != row[:-1]]
+        number = np.cumsum(heads) - 1 + state["rows"]
+        state["rows"] += int(heads.sum())
+        flip = (number % 2 == 1) if self.bidirectional else np.zeros(len(row), dtype=bool)
+        order = np.lexsort((np.where(flip, -s, s), row))
+        row, s, e, value, flip = row[order], s[order], e[order], value[order], flip[order]
+        heads = np.r_[True, row[1:] != row[:-1]]
+
+        # one rapid line to the start of each row, then one line per run
+        n = len(row) + int(heads.sum())
+        is_run = np.ones(n, dtype=bool)
+        is_run[np.flatnonzero(heads) + np.arange(heads.sum())] = False
+        scale = MM_PER_INCH / self.dpi
+        x = np.empty(n)
+        x[~is_run] = np.where(flip, e, s)[heads] * scale
+        x[is_run] = np.where(flip, s, e) * scale
+        y = np.zeros(n)
+        y[~is_run] = (height - (top + row[heads]) - 0.5) * scale
+        power_s = np.zeros(n, dtype=np.int64)
+        power_s[is_run] = value
+
+        rapid = ~is_run.copy()
+        rapid[is_run] = (value == 0) & (e - s >= RAPID_MIN_BLANK)
+        motion = np.where(rapid, 1, 2)
+        cutting = motion == 2
+        prev_motion = np.r_[state["motion"], motion[:-1]]
+        show_motion = motion != prev_motion
+
+        # S is modal across G0 too: compare each cut with the previous cut
+        cut_s = power_s[cutting]
+        show_s = np.zeros(n, dtype=bool)
+        show_s[cutting] = cut_s != np.r_[state["s"], cut_s[:-1]]
+        state["motion"] = int(motion[-1])
+        if len(cut_s):
+            state["s"] = int(cut_s[-1])
+
+        code = np.where(show_motion, motion, 0) * 4 + (~is_run) * 2 + show_s
+        values = np.stack([x, y, power_s], axis=1)
+        text = "".join(np.array(_TEMPLATES)[code]) % tuple(values[_COLUMNS[code]].tolist())
+        return text, n
+
+    def naive_size(self, power):
+        """
+        Bytes and lines of the straightforward encoding: a rapid to the start
+        of every row, then one "G1 X Y S" line per pixel, blank or not.
+        """
+        h, w = power.shape
+        scale = MM_PER_INCH / self.dpi
+        x_len = _number_length(np.arange(1, w + 1) * scale)
+        y_len = _number_length((h - np.arange(h) - 0.5) * scale)
+        s_len = h * w + sum(int(np.count_nonzero(power >= 10 ** k)) for k in range(1, 6))
+        pixels = h * w * len("G1 X Y S\n") + h * int(x_len.sum()) + w * int(y_len.sum()) + s_len
+        rapids = h * len("G0 X0.000 Y\n") + int(y_len.sum())
+        wrapper = len(f"G21\nG90\nM4 S0\nF{self.feedrate}\nM5\nM2; End\n")
+        return pixels + rapids + wrapper, h * w + h + 6
+
+    def write_preview_svg(self, power, svg_path: str):
+        """
+        An SVG holding the power map as an embedded greyscale PNG, darker where the laser burns harder.
+        """
+        h, w = power.shape
+        shade = 255 - np.round(power * (255.0 / max(self.max_power, 1))).clip(0, 255).astype(np.uint8)
+        ok, png = cv2.imencode(".png", shade)
+        if not ok:
+            raise RuntimeError("Failed to encode the raster preview")
+        data = base64.b64encode(png.tobytes()).decode("ascii")
+        out_dir = os.path.dirname(svg_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        with open(svg_path, "w") as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}">'
+                    f'<image width="{w}" height="{h}" href="data:image/png;base64,{data}"/></svg>')
+
+
+def _number_length(values):
+    """
+    Characters %.3f prints for each non-negative value.
+    """
+    integer = np.floor(np.round(values, 3))
+    return np.floor(np.log10(np.maximum(integer, 1))).astype(np.int64) + 5
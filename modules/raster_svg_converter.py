@@ -1,5 +1,28 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
+import numpy as np
+
+from .decoded_image import DecodedImage
+from .svg_writer import SvgWriter
+from .toolpath import Toolpath
+
+# contours enclosing less than this many square pixels are dropped as noise
+MIN_CONTOUR_AREA = 5
+
+# colour quantization histograms 5 bits per channel: 32768 bins, 8 levels wide
+QUANT_SHIFT = 3
+# palette entries covering less of the image than this are merged into their neighbours,
+# as are entries under BLEND_SHARE that sit between two larger ones (anti-aliased edges)
+MIN_LAYER_SHARE = 0.002
+BLEND_SHARE = 0.05
+
+# rotated hatching samples this many scanlines per remap call, bounding the map arrays
+HATCH_CHUNK_LINES = 256
+
+# thinning neighbourhood codes by filter2D (correlation): N, NE, E, SE, S, SW, W, NW are bits 0..7
+THIN_WEIGHTS = np.array([[128, 1, 2], [64, 0, 4], [32, 16, 8]], dtype=np.float32)
 
 class RasterSVGConverter:
     def __init__(self, settings_manager):
@@ -8,31 +31,550 @@ class RasterSVGConverter:
         self.blur_ksize = settings_manager.get("blur_ksize")
         self.canny_low  = settings_manager.get("canny_low")
         self.canny_high = settings_manager.get("canny_high")
+        self.compact_svg = settings_manager.get("svg_compact")
+        self.color_tolerance = settings_manager.get("color_tolerance")
+        self.max_colors = settings_manager.get("max_colors")
+        self.group_by_color = settings_manager.get("group_by_color")
+        self.workers = settings_manager.get("tile_workers") or os.cpu_count() or 1
+        self.remove_background = settings_manager.get("remove_background")
+        self.background_tolerance = settings_manager.get("background_tolerance")
+        self.max_artifact_size = settings_manager.get("max_artifact_size")
+        self.hatch_spacing = settings_manager.get("hatch_spacing")
+        self.hatch_angle = settings_manager.get("hatch_angle")
+        self.hatch_merge_gap = settings_manager.get("hatch_merge_gap")
+        self.edge_dedup = settings_manager.get("edge_dedup")
+        self.centerline = settings_manager.get("centerline")
+        self.background = None       # estimated per image unless set beforehand
+        self.artifacts_removed = 0
+        self.outline_length = 0.0    # pixels of outline trace_strokes was given...
+        self.stroke_length = 0.0     # ...and of strokes it traced instead
+
+    def trace(self, image_path: str) -> Toolpath:
+        return self.contours(self.mask(self.blur(self.decode(image_path))))
 
-    def convert_to_svg(self, image_path: str, svg_path: str):
-        out_dir = os.path.dirname(svg_path)
-        if out_dir and not os.path.exists(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
+    def decode(self, image_path: str):
+        if isinstance(image_path, DecodedImage):
+            return image_path.pixels  # already decoded for the preview, or decoded once here for both
+        img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to decode image: {image_path}")
+        return img
 
-        img  = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    def blur(self, img):
+        if self.mode == 'color':
+            return cv2.GaussianBlur(img, (self.blur_ksize, self.blur_ksize), 0)
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (self.blur_ksize, self.blur_ksize), 0)
+        return cv2.GaussianBlur(gray, (self.blur_ksize, self.blur_ksize), 0)
 
-        if self.mode == 'canny':
+    def mask(self, blur):
+        if self.mode == 'color':
+            mask = quantize(blur, self.color_tolerance, self.max_colors)
+        elif self.mode == 'canny':
             mask = cv2.Canny(blur, self.canny_low, self.canny_high)
         else:
             _, bin_img = cv2.threshold(blur, self.thresh, 255, cv2.THRESH_BINARY)
             mask = bin_img if self.mode == 'threshold' else cv2.bitwise_not(bin_img)
+        if self.remove_background:
+            self.clear_background(mask, blur)
+        return mask
+
+    def estimate_background(self, blur, border=None):
+        """
+        Background level (grey) or BGR colour: the median of the image border
+        when most of the border lies within background_tolerance of it,
+        otherwise the most common value of the whole image. The tiled tracer
+        passes the border pixels it read and blur=None.
+        """
+        if border is None:
+            border = _border(blur)
+        border = border.reshape(len(border), -1).astype(np.float64)
+        level = np.median(border, axis=0)
+        agree = (np.abs(border - level).max(axis=1) <= self.background_tolerance).mean()
+        if agree >= 0.5 or blur is None:
+            return level
+        return _dominant(blur)
 
-        contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    def clear_background(self, mask, blur):
+        """
+        Remove background pixels from a mask in place: cleared from a binary
+        mask, painted white (the paper, skipped when tracing) in a quantized
+        colour image. Canny edges are only cleared well inside the
+        background, so edges along its boundary survive.
+        """
+        level = self.background if self.background is not None else self.estimate_background(blur)
+        level = np.atleast_1d(level)
+        lo = np.clip(level - self.background_tolerance, 0, 255)
+        hi = np.clip(level + self.background_tolerance, 0, 255)
+        near = cv2.inRange(blur, lo, hi)
+        if self.mode == 'canny':
+            near = cv2.erode(near, np.ones((3, 3), np.uint8))
+        mask[near > 0] = 255 if mask.ndim == 3 else 0
+
+    def filter_artifacts(self, mask):
+        """
+        Drop connected components whose bounding box is smaller than
+        max_artifact_size (a fraction of the mask's area) from a binary
+        mask, and fill holes that small, except in Canny edge maps. The
+        bounding box rather than the pixel count measures size, so thin
+        strokes and edges are not mistaken for specks. Returns (mask,
+        number removed). TiledTracer applies the same rule across tiles.
+        """
+        min_pixels = self.min_artifact_pixels(mask.shape[0] * mask.shape[1])
+        if min_pixels < 1:
+            return mask, 0
+        removed, copied = 0, False
+        for holes in self.artifact_passes():
+            target = cv2.bitwise_not(mask) if holes else mask
+            _, labels, stats, _ = cv2.connectedComponentsWithStats(target, connectivity=8)
+            small = stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT] < min_pixels
+            small[0] = False  # label 0 is everything outside the target
+            if small.any():
+                if not copied:
+                    mask, copied = mask.copy(), True  # the input may be a cached stage result
+                mask[small[labels]] = 255 if holes else 0
+                removed += int(small.sum())
+        return mask, removed
+
+    def min_artifact_pixels(self, area: int) -> float:
+        """
+        Bounding-box area below which a component is a speck, for an image of area pixels.
+        """
+        return self.max_artifact_size * area if self.max_artifact_size else 0
+
+    def artifact_passes(self):
+        """
+        Speck filter passes: components (False), then holes (True) except in Canny edge maps.
+        """
+        return (False,) if self.mode == 'canny' else (False, True)
+
+    def contours(self, mask) -> Toolpath:
+        if mask.ndim == 3:
+            return self.trace_layers(mask)
         h, w = mask.shape
+        mask, removed = self.filter_artifacts(mask)
+        self.artifacts_removed += removed
+        toolpath = Toolpath(w, h)
+        if self.mode == 'fill':
+            for seg in hatch_mask(mask, self.hatch_spacing, self.hatch_angle, self.hatch_merge_gap):
+                toolpath.add(seg, False)
+            return toolpath
+        if self.traces_strokes():
+            return self.trace_strokes(mask, toolpath)
+        for pts in trace_mask(mask):
+            toolpath.add(pts)
+        return toolpath
+
+    def traces_strokes(self) -> bool:
+        return (self.mode == 'canny' and self.edge_dedup) or (self.centerline and self.mode in ('contour', 'threshold'))
+
+    def trace_strokes(self, mask, toolpath: Toolpath) -> Toolpath:
+        """
+        Cut each line once. findContours walks around a one-pixel-wide edge
+        out and back, so outlining a Canny map cuts every edge twice; here
+        the mask is thinned to a skeleton (the centreline of strokes in
+        threshold modes, just the staircase corners of an edge map) and
+        traced with every pixel step kept only the first time it is walked.
+        """
+        self.outline_length += chain_length(mask)
+        for pts, closed in trace_edges(thin(mask, thick=self.mode != 'canny')):
+            toolpath.add(pts, closed)
+        self.stroke_length += toolpath.cut_length()
+        return toolpath
+
+    def trace_layers(self, quantized) -> Toolpath:
+        """
+        Trace each colour of a quantized image as its own layer, darkest
+        first. The lightest colour is taken to be the paper and skipped.
+        Layers are traced on a thread pool: the per-colour mask comparison and
+        findContours both release the GIL.
+        """
+        h, w = quantized.shape[:2]
+        packed = _pack(quantized)
+        inks = palette_of(packed)[:-1]
+
+        def trace(color):
+            mask, removed = self.filter_artifacts((packed == color).view(np.uint8) * np.uint8(255))
+            return trace_mask(mask), removed
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(inks)))) as pool:
+            layers = list(pool.map(trace, inks))
+        self.artifacts_removed += sum(removed for _, removed in layers)
+
+        toolpath = Toolpath(w, h)
+        toolpath.layer_colors = [f"#{int(c) >> 16:02x}{int(c) >> 8 & 255:02x}{int(c) & 255:02x}" for c in inks]
+        for layer, (contours, _) in enumerate(layers):
+            for pts in contours:
+                toolpath.add(pts, True, layer)
+        return toolpath
+
+    def write_svg(self, toolpath: Toolpath, svg_path: str):
+        SvgWriter(self.compact_svg, self.group_by_color).write(toolpath, svg_path)
+
+    def convert_to_svg(self, image_path: str, svg_path: str) -> Toolpath:
+        toolpath = self.trace(image_path)
+        self.write_svg(toolpath, svg_path)
+        return toolpath
+
+
+def trace_mask(mask, min_area: float = MIN_CONTOUR_AREA):
+    """
+    Outline every region of a binary mask as (N, 2) int32 point arrays,
+    dropping contours below min_area. Areas come from one shoelace sum over
+    all contours at once rather than a contourArea call per contour.
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return []
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+    pts = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    starts = np.cumsum(lengths) - lengths
+    nxt = np.arange(1, len(pts) + 1)
+    nxt[starts + lengths - 1] = starts  # each contour wraps to its first point
+    cross = pts[:, 0] * pts[nxt, 1] - pts[nxt, 0] * pts[:, 1]
+    area = np.abs(np.add.reduceat(cross, starts)) / 2
+    return [c.reshape(-1, 2) for c, keep in zip(contours, area >= min_area) if keep]
+
+
+def thin(mask, thick: bool = True):
+    """
+    Thin a binary mask to a skeleton one pixel wide (255 on 0): Zhang-Suen,
+    then the corners of 4-connected staircases are removed, so every line
+    is a single 8-connected chain of pixels. Masks already about one pixel
+    wide (Canny edges) can skip Zhang-Suen with thick=False. Each pass is
+    one filter2D giving every pixel's neighbourhood code and one LUT
+    deciding which pixels go.
+    """
+    img = (mask > 0).view(np.uint8)
+    if thick:
+        img = _thin_passes(img, _THIN_TABLES)
+    # corners are dropped one parity subfield at a time: no two neighbours go at once
+    img = _thin_passes(img, (_CORNER_TABLE,) * 4, ((0, 0), (0, 1), (1, 0), (1, 1)))
+    return img * np.uint8(255)
+
+
+def _thin_passes(img, tables, subfields=None):
+    """
+    Apply the removal tables in turn, each as one parallel step over the
+    whole image, until a round removes nothing.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for i, table in enumerate(tables):
+            code = cv2.filter2D(img, -1, THIN_WEIGHTS, borderType=cv2.BORDER_CONSTANT)
+            drop = cv2.bitwise_and(cv2.LUT(code, table), img)
+            if subfields:
+                y, x = subfields[i]
+                field = np.zeros_like(drop)
+                field[y::2, x::2] = drop[y::2, x::2]
+                drop = field
+            if cv2.countNonZero(drop):
+                img = cv2.subtract(img, drop)
+                changed = True
+    return img
+
+
+def _thin_tables():
+    """
+    Per neighbourhood code, whether each Zhang-Suen sub-iteration removes the pixel.
+    """
+    bits = _NEIGHBOURS
+    count = bits.sum(axis=1)
+    transitions = ((bits == 0) & (np.roll(bits, -1, axis=1) == 1)).sum(axis=1)
+    n, e, s, w = bits[:, 0], bits[:, 2], bits[:, 4], bits[:, 6]
+    base = (count >= 2) & (count <= 6) & (transitions == 1)
+    first = base & (n * e * s == 0) & (e * s * w == 0)
+    second = base & (n * e * w == 0) & (n * s * w == 0)
+    return first.astype(np.uint8), second.astype(np.uint8)
+
+
+def _corner_table():
+    """
+    Per neighbourhood code, whether the pixel is the corner of a staircase
+    (two of its 4-neighbours touch each other diagonally) that can go
+    without changing the topology: a simple point with one 8-connected
+    component of set neighbours and one 4-connected component of clear
+    ones, and not the end of a line.
+    """
+    table = np.zeros(256, dtype=np.uint8)
+    for code, bits in enumerate(_NEIGHBOURS.tolist()):
+        if sum(bits) < 2 or not any(bits[i] and bits[(i + 2) % 8] for i in (0, 2, 4, 6)):
+            continue
+        ring = [(i, (i + 1) % 8) for i in range(8)]
+        set_links = ring + [(i, (i + 2) % 8) for i in (0, 2, 4, 6)]
+        fg = _components([i for i in range(8) if bits[i]], set_links)
+        bg = _components([i for i in range(8) if not bits[i]], ring)
+        if len(fg) == 1 and sum(1 for c in bg if c & {0, 2, 4, 6}) == 1:
+            table[code] = 1
+    return table
+
+
+def _components(nodes, links):
+    groups = [{node} for node in nodes]
+    for a, b in links:
+        ga = next((g for g in groups if a in g), None)
+        gb = next((g for g in groups if b in g), None)
+        if ga is not None and gb is not None and ga is not gb:
+            ga |= gb
+            groups.remove(gb)
+    return groups
+
+
+_NEIGHBOURS = (np.arange(256)[:, None] >> np.arange(8)) & 1  # N, NE, E, SE, S, SW, W, NW per code
+_THIN_TABLES = _thin_tables()
+_CORNER_TABLE = _corner_table()
+
+
+def trace_edges(mask):
+    """
+    Trace a mask of one-pixel-wide lines (an edge map or a skeleton) as
+    [(pts, closed)], each line once. Every pixel step of every contour is
+    keyed by its two pixels regardless of direction; only the first walk
+    over a step is kept. Runs of kept steps become open polylines, and a
+    contour kept whole (a ring walked one way only) stays closed.
+    """
+    pts, lengths, starts = _find_chains(mask)
+    if not len(pts):
+        return []
+    h, w = mask.shape
+    total = len(pts)
+    first = np.repeat(starts, lengths)
+    size = np.repeat(lengths, lengths)
+    local = np.arange(total) - first
+    nxt = first + (local + 1) % size
+    ids = pts[:, 1].astype(np.int64) * w + pts[:, 0]
+    a, b = ids, ids[nxt]
+    _, seen = np.unique(np.minimum(a, b) * (h * w) + np.maximum(a, b), return_index=True)
+    kept = np.zeros(total, dtype=bool)
+    kept[seen] = True
+
+    # rotate each contour to start on a repeated step, so no run wraps past its end
+    first_repeat = np.minimum.reduceat(np.where(kept, total, local), starts)
+    whole = first_repeat == total
+    rotation = np.repeat(np.where(whole, 0, first_repeat), lengths)
+    order = first + (local + rotation) % size
+    kept = kept[order]
+    head = local == 0
+    run_start = np.flatnonzero(kept & (head | ~np.r_[False, kept[:-1]]))
+    run_end = np.flatnonzero(kept & (np.r_[head[1:], True] | ~np.r_[kept[1:], False]))
+    steps = run_end - run_start + 1
+    closed = whole[np.repeat(np.arange(len(lengths)), lengths)[run_start]]
+
+    body = pts[order[kept]]
+    lines = np.insert(body, np.cumsum(steps), pts[nxt[order[run_end]]], axis=0)  # each run plus its last point
+    bounds = np.r_[0, np.cumsum(steps + 1)].tolist()
+    return [(lines[a:b - c], c) for a, b, c in zip(bounds, bounds[1:], closed.tolist())]
+
+
+def _find_chains(mask):
+    """
+    Every contour of a mask, pixel by pixel, concatenated: (points, lengths,
+    start offsets). Single-pixel contours are left out.
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)
+    contours = [c for c in contours if len(c) > 1]
+    if not contours:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros((0, 2), dtype=np.int32), empty, empty
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+    return np.concatenate(contours).reshape(-1, 2), lengths, np.cumsum(lengths) - lengths
+
+
+def chain_length(mask) -> float:
+    """
+    Total length in pixels of every contour of a mask walked all the way
+    round: what outlining it would cut.
+    """
+    pts, lengths, starts = _find_chains(mask)
+    nxt = np.arange(1, len(pts) + 1)
+    nxt[starts + lengths - 1] = starts
+    return float(np.hypot(*(pts[nxt] - pts).T.astype(np.float64)).sum())
+
+
+def hatch_mask(mask, spacing: float = 1.0, angle: float = 0.0, merge_gap: float = 0.0):
+    """
+    Fill a binary mask with parallel hatch lines spacing pixels apart at
+    angle degrees (0 runs along x, counter-clockwise on screen). Returns an
+    (N, 2, 2) array of line segments in drawing order: each scanline's runs
+    of set pixels, alternating direction line by line so the tool zigzags
+    instead of rapiding back. Runs on one line separated by at most
+    merge_gap clear pixels are joined into one.
+
+    Scanlines are resampled from the mask with one warpAffine per block of
+    lines (rows are sliced directly at 0 degrees), and runs are found with
+    one comparison over each block flattened, with no per-pixel or per-run
+    Python loop.
+    """
+    h, w = mask.shape
+    theta = np.radians(angle % 180.0)
+    d = np.array([np.cos(theta), -np.sin(theta)])  # along the lines; y points down
+    n = np.array([np.sin(theta), np.cos(theta)])   # across the lines
+    corners = np.array([[0, 0], [w - 1, 0], [0, h - 1], [w - 1, h - 1]], dtype=np.float64)
+    u_min, u_max = np.floor((corners @ d).min()), np.ceil((corners @ d).max())
+    v_min, v_max = (corners @ n).min(), (corners @ n).max()
+    spacing = max(float(spacing), 1e-3)
+    count = int(np.floor((v_max - v_min) / spacing)) + 1
+    width = int(u_max - u_min) + 1
+
+    rows, starts, ends = [], [], []
+    for first in range(0, count, HATCH_CHUNK_LINES):
+        lines = min(HATCH_CHUNK_LINES, count - first)
+        v0 = v_min + first * spacing
+        if angle % 180.0 == 0.0 and spacing.is_integer():
+            samples = mask[int(v0):int(v0) + lines * int(spacing):int(spacing)]
+        else:
+            # sample (j, k) of the block is mask point (u_min + j) * d + (v0 + k * spacing) * n
+            m = np.array([[d[0], n[0] * spacing, d[0] * u_min + n[0] * v0],
+                          [d[1], n[1] * spacing, d[1] * u_min + n[1] * v0]])
+            samples = cv2.warpAffine(mask, m, (width, lines), flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+                                     borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        r, s, e = _runs(samples)
+        rows.append(r + first)
+        starts.append(s)
+        ends.append(e)
+    if not rows:
+        return np.zeros((0, 2, 2))
+    row, start, end = np.concatenate(rows), np.concatenate(starts), np.concatenate(ends)
+
+    if merge_gap > 0 and len(row) > 1:
+        join = (row[1:] == row[:-1]) & (start[1:] - end[:-1] <= merge_gap)
+        row, start, end = row[np.r_[True, ~join]], start[np.r_[True, ~join]], end[np.r_[~join, True]]
+
+    # runs are [start, end) samples; lines go from the first set pixel to the last
+    flip = row % 2 == 1
+    order = np.lexsort((np.where(flip, -start, start), row))
+    row, start, end, flip = row[order], start[order], end[order], flip[order]
+    a = u_min + np.where(flip, end - 1, start)
+    b = u_min + np.where(flip, start, end - 1)
+    v = v_min + row * spacing
+    p0 = a[:, None] * d + v[:, None] * n
+    p1 = b[:, None] * d + v[:, None] * n
+    return np.round(np.stack([p0, p1], axis=1), 3) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+
+def _runs(samples):
+    """
+    (row, start, end) of every run of nonzero samples in a 2-D array, end
+    exclusive, in row-major order. A zero column in front of every row keeps
+    runs from joining across rows, so one pass over the flattened block
+    finds every edge and edges alternate start, end, start, ...
+    """
+    k, w = samples.shape
+    on = np.zeros(k * (w + 1) + 1, dtype=bool)
+    np.not_equal(samples, 0, out=on[:-1].reshape(k, w + 1)[:, 1:])
+    edges = np.flatnonzero(on[1:] != on[:-1]) + 1
+    row, start = np.divmod(edges[0::2], w + 1)
+    return row, start - 1, edges[1::2] - row * (w + 1) - 1
+
+
+def quantize(img, tolerance: float, max_colors: int):
+    """
+    Reduce a BGR image to at most max_colors flat colours.
+
+    Pixels are histogrammed into 5-bit-per-channel bins. Palette entries are
+    grown greedily from the most populous bin still unclaimed, each claiming
+    every bin within tolerance (Euclidean RGB distance). Entries too small to
+    be an ink of their own, or that look like the edge blend of two larger
+    ones, are dropped; then every bin moves to its nearest entry and entries
+    settle on their members' mean. Only the histogram and the final lookup
+    touch every pixel.
+    """
+    bins = _bins(img)
+    counts = np.bincount(bins.ravel(), minlength=1 << 15)
+    occupied = np.flatnonzero(counts)
+    weights = counts[occupied].astype(np.float64)
+    half = 1 << (QUANT_SHIFT - 1)
+    centers = np.stack([occupied >> 10, occupied >> 5 & 31, occupied & 31], axis=1) * (1 << QUANT_SHIFT) + half
+
+    label = np.full(len(occupied), -1)
+    by_weight = np.argsort(-weights, kind="stable")
+    leaders = 0
+    while leaders < max(1, max_colors):
+        free = by_weight[label[by_weight] < 0]
+        if not len(free):
+            break
+        near = (label < 0) & (((centers - centers[free[0]]) ** 2).sum(axis=1) <= tolerance ** 2)
+        label[near] = leaders
+        leaders += 1
+
+    share = np.bincount(label[label >= 0], weights[label >= 0], minlength=leaders) / weights.sum()
+    palette = _means(centers, weights, np.maximum(label, 0), leaders)
+    keep = (share >= MIN_LAYER_SHARE) & ~((share < BLEND_SHARE) & _blends(palette, share, tolerance))
+    keep[share.argmax()] = True
+    palette = palette[keep]
+    leaders = len(palette)
+    dist = ((centers[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+    label = dist.argmin(axis=1)
+    palette = _means(centers, weights, label, leaders)
+
+    lut = np.zeros(1 << 15, dtype=np.int32)
+    lut[occupied] = label
+    return np.round(palette).astype(np.uint8)[lut[bins]]
+
+
+def _blends(palette, share, tolerance):
+    """
+    Entries lying within tolerance of the segment between two entries that
+    both cover more pixels than they do.
+    """
+    a, b, p = palette[:, None, None, :], palette[None, :, None, :], palette[None, None, :, :]
+    ab = b - a
+    t = ((p - a) * ab).sum(axis=3) / np.maximum((ab ** 2).sum(axis=3), 1e-9)
+    dist = np.sqrt((((a + ab * np.clip(t, 0, 1)[..., None]) - p) ** 2).sum(axis=3))
+    larger = (share[:, None, None] > share[None, None, :]) & (share[None, :, None] > share[None, None, :])
+    inside = (t > 0.05) & (t < 0.95)
+    return (larger & inside & (dist <= tolerance)).any(axis=(0, 1))
+
+
+def _bins(img):
+    """
+    5-bit-per-channel histogram bin of every BGR pixel.
+    """
+    return ((img[..., 0] >> QUANT_SHIFT).astype(np.int32) << 10
+            | (img[..., 1] >> QUANT_SHIFT).astype(np.int32) << 5
+            | (img[..., 2] >> QUANT_SHIFT))
+
+
+def _border(img):
+    """
+    The outermost row and column pixels, one per row: (N, channels).
+    """
+    px = img.reshape(img.shape[0], img.shape[1], -1)
+    return np.concatenate([px[0], px[-1], px[1:-1, 0], px[1:-1, -1]])
+
+
+def _dominant(img):
+    """
+    Most common grey level, or the centre of the most common 5-bit colour bin.
+    """
+    if img.ndim == 2:
+        return np.array([float(np.bincount(img.ravel(), minlength=256).argmax())])
+    top = int(np.bincount(_bins(img).ravel(), minlength=1 << 15).argmax())
+    return (np.array([top >> 10, top >> 5 & 31, top & 31]) << QUANT_SHIFT) + (1 << (QUANT_SHIFT - 1)) + 0.0
+
+
+def _means(centers, weights, label, k):
+    total = np.bincount(label, weights, minlength=k)
+    sums = np.stack([np.bincount(label, weights * centers[:, c], minlength=k) for c in range(3)], axis=1)
+    return sums / np.maximum(total, 1)[:, None]
+
+
+def _pack(img):
+    """
+    BGR pixels as one int32 each: 0xRRGGBB.
+    """
+    return img[..., 0].astype(np.int32) | img[..., 1].astype(np.int32) << 8 | img[..., 2].astype(np.int32) << 16
+
 
-        with open(svg_path, 'w') as f:
-            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}">')
-            for cnt in contours:
-                if cv2.contourArea(cnt) < 5:
-                    continue
-                pts = cnt.reshape(-1, 2)
-                d = 'M ' + ' L '.join(f'{x},{y}' for x, y in pts) + ' Z'
-                f.write(f'<path d="{d}" stroke="black" fill="none"/>')
-            f.write('</svg>')
\ No newline at end of file
+def palette_of(packed):
+    """
+    Distinct colours of a packed quantized image, darkest first. One pass per
+    colour, which beats sorting every pixel when there are only a handful.
+    """
+    colors, rest = [], packed.ravel()
+    while len(rest):
+        colors.append(rest[0])
+        rest = rest[rest != rest[0]]
+    colors = np.array(colors, dtype=np.int32)
+    r, g, b = colors >> 16, colors >> 8 & 255, colors & 255
+    return colors[np.argsort(0.299 * r + 0.587 * g + 0.114 * b, kind="stable")]
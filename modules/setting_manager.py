@@ -1,15 +1,54 @@
 import yaml
 import os
 
+# YAML 1.1 reads on/off/yes/no as booleans; these settings take them as words
+SWITCH_WORDS = {"tiled_mode": {True: "on", False: "off"}}
+
+# config files are stamped with settings_version; older files are migrated on load
+SETTINGS_VERSION = 2
+# version -> placeholder defaults of settings that did nothing before that version; a file
+# still holding one gets today's default, any value a user chose is kept
+MIGRATIONS = {
+    2: {"max_artifact_size": 0.02, "background_tolerance": 1, "color_tolerance": 1},
+}
+
+
+def normalise(settings: dict) -> dict:
+    """
+    settings with booleans in word-valued settings turned back into words.
+    """
+    for key, words in SWITCH_WORDS.items():
+        value = settings.get(key)
+        if isinstance(value, bool):
+            settings[key] = words[value]
+    return settings
+
+
 class SettingsManager:
-    def __init__(self, config_path="config.yaml"):
+    def __init__(self, config_path="config.yaml", persist=True):
+        """
+        With persist=False the config file is only read, never written, so
+        several headless workers can share one config safely.
+        """
         self.config_path = config_path
+        self.persist = persist
         self.defaults = {
-            "color_tolerance": 1,
+            "settings_version": SETTINGS_VERSION,
+            "color_tolerance": 32,
+            "max_colors": 8,
+            "layer_tool_cmds": [],
             "remove_background": False,
-            "background_tolerance": 1.0,
-            "max_artifact_size": 0.02,
+            "background_tolerance": 16,
+            "max_artifact_size": 0.0001,
             "group_by_color": True,
+            "hatch_spacing": 1.0,
+            "hatch_angle": 0.0,
+            "hatch_merge_gap": 2,
+            "raster_min_power": 0,
+            "raster_max_power": 1000,
+            "raster_levels": 32,
+            "raster_white_cutoff": 250,
+            "raster_bidirectional": True,
             "tool_off_cmd": "G0 Z1;",
             "tool_on_cmd": "G0 Z0;",
             "output_filename": "output",
@@ -18,8 +57,34 @@ class SettingsManager:
             "blur_ksize": 3,
             "canny_low": 50,
             "canny_high": 150,
+            "edge_dedup": True,
+            "centerline": False,
             "potrace_turdsize": 2,
-            "potrace_alphamax": 1.0
+            "potrace_alphamax": 1.0,
+            "gcode_backend": "native",
+            "gcode_optimize": True,
+            "gcode_precision": 3,
+            "estimate_time": True,
+            "machine_profile": "default",
+            "machine_profiles": {
+                "default": {"max_feed": 6000, "rapid_feed": 6000, "acceleration": 500, "junction_deviation": 0.01},
+            },
+            "feedrate": 300,
+            "dpi": 96,
+            "optimize_order": True,
+            "two_opt_time": 1.0,
+            "simplify_method": "douglas-peucker",
+            "simplify_tolerance": 0.5,
+            "simplify_units": "px",
+            "arc_fitting": False,
+            "arc_tolerance": 0.5,
+            "cache_enabled": True,
+            "cache_dir": ".cache",
+            "cache_max_mb": 1024,
+            "svg_compact": False,
+            "tiled_mode": "auto",
+            "tile_memory_mb": 512,
+            "tile_workers": 0
         }
         self.settings = {}
         self.load_settings()
@@ -31,11 +96,27 @@ class SettingsManager:
         else:
             with open(self.config_path, 'r') as f:
                 data = yaml.safe_load(f) or {}
+            self.migrate(data)
             for k,v in self.defaults.items():
                 self.settings[k] = data.get(k, v)
+            normalise(self.settings)
             self.save_settings()
 
+    def migrate(self, data: dict) -> dict:
+        """
+        Bring settings read from an older config file up to SETTINGS_VERSION, in place.
+        """
+        version = data.get("settings_version", 1)
+        for target in sorted(v for v in MIGRATIONS if v > version):
+            for key, placeholder in MIGRATIONS[target].items():
+                if key in data and data[key] == placeholder:
+                    data[key] = self.defaults[key]
+        data["settings_version"] = max(version, SETTINGS_VERSION)
+        return data
+
     def save_settings(self):
+        if not self.persist:
+            return
         with open(self.config_path, 'w') as f:
             yaml.dump(self.settings, f)
 
@@ -44,4 +125,13 @@ class SettingsManager:
 
     def set(self, key, value):
         self.settings[key] = value
-        self.save_settings()
\ No newline at end of file
+        normalise(self.settings)
+        self.save_settings()
+
+    def update(self, overrides: dict):
+        """
+        Apply several settings at once with a single save.
+        """
+        self.settings.update(overrides)
+        normalise(self.settings)
+        self.save_settings()
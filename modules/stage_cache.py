@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+
+import numpy as np
+
+from .toolpath import Toolpath
+
+# Pipeline stages in order, each keyed by its parent's key plus the settings it reads.
+STAGES = ("decode", "blur", "mask", "toolpath", "svg", "gcode")
+
+# the only files the cache owns: <first 2 hex digits>/<64 hex digit key>.<ext>; anything
+# else in cache_dir is never counted or evicted
+ENTRY_DIR = re.compile(r"[0-9a-f]{2}")
+ENTRY_NAME = re.compile(r"([0-9a-f]{64})\.(?:npy|npz|json|svg|gcode)")
+
+
+def stage_params(stage: str, settings, tiled: bool = False) -> dict:
+    """
+    Settings a stage's output depends on. Anything not listed here can change
+    without invalidating that stage. tiled is whether the image is traced by
+    TiledTracer, as ImageConverter.use_tiles decided.
+    """
+    get = settings.get
+    color = get("svg_mode") == "color"
+    if stage == "blur":
+        return {"blur_ksize": get("blur_ksize"), "color": True} if color else {"blur_ksize": get("blur_ksize")}
+    if stage == "mask":
+        if color:
+            params = {"svg_mode": "color", "color_tolerance": get("color_tolerance"), "max_colors": get("max_colors")}
+        elif get("svg_mode") == "raster":
+            return {"svg_mode": "raster", **{k: get(k) for k in ("raster_min_power", "raster_max_power",
+                                                                 "raster_levels", "raster_white_cutoff")}}
+        elif get("svg_mode") == "canny":
+            params = {"svg_mode": "canny", "canny_low": get("canny_low"), "canny_high": get("canny_high")}
+        else:
+            params = {"svg_mode": get("svg_mode"), "threshold": get("threshold")}
+        if get("remove_background"):
+            params.update(remove_background=True, background_tolerance=get("background_tolerance"))
+        return params
+    if stage == "toolpath":
+        # dpi always: the cached report holds lengths in mm (travel_*_mm, cut_length_mm)
+        params = {k: get(k) for k in ("max_artifact_size", "simplify_method", "simplify_tolerance", "simplify_units",
+                                      "arc_fitting", "arc_tolerance", "optimize_order", "two_opt_time", "dpi")}
+        # tiled traces skip edge dedup and centrelines, so they must never stand in for full-frame ones
+        params["tiled"] = tiled
+        if get("svg_mode") == "fill":
+            params.update({k: get(k) for k in ("hatch_spacing", "hatch_angle", "hatch_merge_gap")})
+        elif get("svg_mode") == "canny":
+            params["edge_dedup"] = get("edge_dedup")
+        elif get("svg_mode") in ("contour", "threshold"):
+            params["centerline"] = get("centerline")
+        return params
+    if stage == "svg":
+        params = {"svg_compact": get("svg_compact")}
+        if color:
+            params["group_by_color"] = get("group_by_color")
+        return params
+    if stage == "gcode":
+        params = {k: get(k) for k in ("gcode_backend", "tool_on_cmd", "tool_off_cmd", "feedrate", "dpi")}
+        if color:
+            params["layer_tool_cmds"] = get("layer_tool_cmds")
+        elif get("svg_mode") == "raster":
+            params["raster_bidirectional"] = get("raster_bidirectional")
+        if get("svg_mode") != "raster" and get("gcode_optimize"):
+            params.update(gcode_optimize=True, gcode_precision=get("gcode_precision"))
+        if get("estimate_time"):  # the estimate is kept in the cached report
+            profile = get("machine_profile")
+            params.update(machine_profile=profile, machine=(get("machine_profiles") or {}).get(profile))
+        return params
+    return {}
+
+
+class StageCache:
+    """
+    On-disk, content-addressed cache of pipeline intermediates.
+
+    Keys chain the SHA-256 of the image bytes through every stage's settings,
+    so changing e.g. tool_on_cmd only invalidates the G-code entry. Entries are
+    written atomically, touched on every hit and evicted least-recently-used
+    first once the directory grows past max_bytes.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self._image_keys = {}
+        self._size = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.get("cache_enabled"):
+            return None
+        return cls(settings.get("cache_dir"), int(settings.get("cache_max_mb") * 1024 * 1024))
+
+    # ── keys ──
+    def image_key(self, image_path: str) -> str:
+        st = os.stat(image_path)
+        memo = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+        if memo not in self._image_keys:
+            digest = hashlib.sha256()
+            with open(image_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self._image_keys[memo] = digest.hexdigest()
+        return self._image_keys[memo]
+
+    def stage_keys(self, image_path: str, settings, tiled: bool = False) -> dict:
+        keys, parent = {}, self.image_key(image_path)
+        for stage in STAGES:
+            payload = json.dumps([parent, stage, stage_params(stage, settings, tiled)], sort_keys=True)
+            parent = keys[stage] = hashlib.sha256(payload.encode()).hexdigest()
+        return keys
+
+    # ── entries ──
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{ext}")
+
+    def _lookup(self, stage, key: str, ext: str):
+        """
+        Path of an entry, touched for LRU, or None. Counted as a hit or miss
+        of stage unless stage is None.
+        """
+        path = self._path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if stage is not None:
+                self.misses[stage] = self.misses.get(stage, 0) + 1
+            return None
+        if stage is not None:
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+        return path
+
+    def _store(self, key: str, ext: str, write):
+        path = self._path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self._size is not None:
+            self._size += os.path.getsize(path)
+        self.evict()
+
+    def get_array(self, stage: str, key: str):
+        path = self._lookup(stage, key, "npy")
+        try:
+            return np.load(path) if path else None
+        except (OSError, ValueError):
+            return None
+
+    def put_array(self, key: str, array):
+        self._store(key, "npy", lambda f: np.save(f, array))
+
+    def get_toolpath(self, key: str):
+        """
+        Return (Toolpath, report) or None.
+        """
+        path = self._lookup("toolpath", key, "npz")
+        if not path:
+            return None
+        try:
+            with np.load(path) as data:
+                arrays = {k: data[k] for k in data.files}
+        except (OSError, ValueError):
+            return None
+        report = json.loads(str(arrays.pop("report")))
+        return Toolpath.from_arrays(arrays), report
+
+    def put_toolpath(self, key: str, toolpath: Toolpath, report: dict):
+        arrays = toolpath.to_arrays()
+        arrays["report"] = np.array(json.dumps(report))
+        self._store(key, "npz", lambda f: np.savez(f, **arrays))
+
+    def get_report(self, key: str):
+        path = self._lookup(None, key, "json")  # kept beside the G-code entry, not a stage of its own
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (TypeError, OSError, ValueError):
+            return None
+
+    def put_report(self, key: str, report: dict):
+        self._store(key, "json", lambda f: f.write(json.dumps(report).encode()))
+
+    def get_file(self, stage: str, key: str, dest: str) -> bool:
+        path = self._lookup(stage, key, stage)
+        if not path:
+            return False
+        try:
+            shutil.copyfile(path, dest)
+        except FileNotFoundError:  # evicted by another process in between
+            return False
+        return True
+
+    def put_file(self, stage: str, key: str, src: str):
+        def copy(f):
+            with open(src, "rb") as source:
+                shutil.copyfileobj(source, f, 1 << 20)
+        self._store(key, stage, copy)
+
+    # ── housekeeping ──
+    def _entries(self):
+        """
+        (mtime, size, path) of every entry in this cache's own layout.
+        """
+        try:
+            subdirs = [d for d in os.listdir(self.cache_dir) if ENTRY_DIR.fullmatch(d)]
+        except FileNotFoundError:
+            return
+        for subdir in subdirs:
+            root = os.path.join(self.cache_dir, subdir)
+            try:
+                names = os.listdir(root)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for name in names:
+                match = ENTRY_NAME.fullmatch(name)
+                if not match or not match.group(1).startswith(subdir):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    yield st.st_mtime, st.st_size, path
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits max_bytes.
+        """
+        if self.size() <= self.max_bytes:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def stats(self) -> dict:
+        return {
+            "cache_hits": sum(self.hits.values()),
+            "cache_misses": sum(self.misses.values()),
+            "cache_mb": round(self.size() / (1024 * 1024), 1),
+        }
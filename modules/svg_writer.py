@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+
+class SvgWriter:
+    """
+    Serializes a Toolpath to SVG. Coordinates are formatted in bulk, one C-level
+    %-format per batch of paths, and streamed through a large write buffer.
+
+    The default output is one <path> per polyline with absolute M/L commands.
+    Compact output uses relative coordinates with implicit lineto commands and
+    hoists the shared stroke attributes onto a single <g>. Numbers are rounded
+    to 3 decimals and printed without trailing zeros, so output is
+    byte-for-byte deterministic for a given toolpath.
+
+    Colour layers are written as one <g> per layer carrying its stroke colour,
+    or, with grouping off, as a flat list of paths each with its own stroke.
+    """
+    BUFFER_SIZE = 1 << 20
+    BATCH_PATHS = 4096
+
+    def __init__(self, compact: bool = False, group_by_color: bool = True):
+        self.compact = compact
+        self.group_by_color = group_by_color
+
+    def write(self, toolpath, svg_path: str):
+        out_dir = os.path.dirname(svg_path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+
+        with open(svg_path, 'w', buffering=self.BUFFER_SIZE) as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{toolpath.width}" height="{toolpath.height}">')
+            if not toolpath.layer_colors:
+                self._write_paths(f, toolpath, "black", self.compact)
+            else:
+                for layer, (part, color) in enumerate(zip(toolpath.split_layers(), toolpath.layer_colors)):
+                    self._write_paths(f, part, color, self.group_by_color, f' id="layer-{layer + 1}"')
+            f.write('</svg>')
+
+    def _write_paths(self, f, toolpath, color: str, group: bool, group_attrs: str = ''):
+        if group:
+            f.write(f'<g{group_attrs} stroke="{color}" fill="none">')
+        style = '' if group else f' stroke="{color}" fill="none"'
+        for start in range(0, len(toolpath), self.BATCH_PATHS):
+            end = start + self.BATCH_PATHS
+            batch = zip(toolpath.paths[start:end], toolpath.closed[start:end])
+            f.write(self.format_compact(batch, style) if self.compact else self.format_absolute(batch, style))
+        if group:
+            f.write('</g>')
+
+    @staticmethod
+    def _gather(paths):
+        """
+        Concatenate a batch of paths into one rounded (N, 2) array.
+        """
+        kept = [(pts, closed) for pts, closed in paths if len(pts)]
+        if not kept:
+            return None, None, None
+        lengths = np.array([len(pts) for pts, _ in kept])
+        xy = np.round(np.concatenate([pts for pts, _ in kept]).astype(np.float64), 3)
+        return xy, lengths, [closed for _, closed in kept]
+
+    @staticmethod
+    def _numbers(values):
+        """
+        Pick the cheapest exact format for the batch: %d when every value is
+        integral, otherwise %.10g.
+        """
+        values = values.ravel() + 0.0  # + 0.0 turns -0.0 into 0.0
+        if np.array_equal(values, np.trunc(values)):
+            return '%d', values.astype(np.int64).tolist()
+        return '%.10g', values.tolist()
+
+    @classmethod
+    def format_absolute(cls, paths, style: str = ' stroke="black" fill="none"') -> str:
+        xy, lengths, closed_flags = cls._gather(paths)
+        if xy is None:
+            return ''
+        fmt, values = cls._numbers(xy)
+        first, rest = f'<path d="M {fmt},{fmt}', f' L {fmt},{fmt}'
+        template = ''.join(
+            first + rest * (n - 1) + (' Z' if closed else '') + '"' + style + '/>'
+            for n, closed in zip(lengths.tolist(), closed_flags)
+        )
+        return template % tuple(values)
+
+    @classmethod
+    def format_compact(cls, paths, style: str = '') -> str:
+        xy, lengths, closed_flags = cls._gather(paths)
+        if xy is None:
+            return ''
+        # relative steps from the rounded absolute points, so error never accumulates;
+        # the first point of every path stays absolute
+        steps = np.round(np.diff(xy, axis=0, prepend=xy[:1]), 3)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        steps[starts] = xy[starts]
+        fmt, values = cls._numbers(steps)
+        pair = f'{fmt},{fmt}'
+        template = ''.join(
+            f'<path d="M{pair}' + ('l' + ' '.join([pair] * (n - 1)) if n > 1 else '')
+            + ('z' if closed else '') + '"' + style + '/>'
+            for n, closed in zip(lengths.tolist(), closed_flags)
+        )
+        # a minus sign already separates numbers
+        return (template % tuple(values)).replace(' -', '-').replace(',-', '-')
@@ -0,0 +1,395 @@
+import os
+import tempfile
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .toolpath import Toolpath
+
+# Pillow raw modes we can read in place, with their channel count and grey conversion
+RAW_MODES = {
+    "L": (1, None),
+    "RGB": (3, cv2.COLOR_RGB2GRAY),
+    "BGR": (3, cv2.COLOR_BGR2GRAY),
+    "RGBA": (4, cv2.COLOR_RGBA2GRAY),
+    "RGBX": (4, cv2.COLOR_RGBA2GRAY),
+    "BGRA": (4, cv2.COLOR_BGRA2GRAY),
+    "BGRX": (4, cv2.COLOR_BGRA2GRAY),
+}
+
+# rough bytes of working memory per tile pixel: read, blur, mask, findContours copy, dense contour points
+BYTES_PER_TILE_PIXEL = 16
+
+
+class GraySource:
+    """
+    Row/column window reads of an image as 8-bit grey without holding it in memory.
+
+    Uncompressed files whose pixel data Pillow describes as raw strips
+    (uncompressed TIFF, BMP, PGM/PPM) are memory-mapped straight from disk.
+    Anything else is decoded once, as grey, into a temporary memory-mapped
+    spill file; that single decode is the only full-frame allocation.
+    """
+    def __init__(self, image_path: str):
+        self.image_path = image_path
+        self._spill = None
+        with Image.open(image_path) as img:
+            self.width, self.height = img.size
+            self.strips = self._map_strips(img)
+        if self.strips is None:
+            self.strips = [self._decode_to_spill()]
+
+    def _map_strips(self, img):
+        if img.mode not in ("L", "RGB", "RGBA") or not img.tile:
+            return None
+        strips = []
+        for tile in img.tile:
+            codec, extents, offset, args = tile[0], tile[1], tile[2], tile[3]
+            if codec != "raw":
+                return None
+            args = args if isinstance(args, tuple) else (args,)
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+            if rawmode not in RAW_MODES:
+                return None
+            x0, y0, x1, y1 = extents
+            if x0 != 0 or x1 != self.width:
+                return None
+            channels, _ = RAW_MODES[rawmode]
+            stride = stride or self.width * channels
+            rows = y1 - y0
+            data = np.memmap(self.image_path, dtype=np.uint8, mode="r", offset=offset, shape=(rows, stride))
+            data = data[:, :self.width * channels].reshape(rows, self.width, channels)
+            if orientation < 0:
+                data = data[::-1]
+            strips.append((y0, y1, data, rawmode))
+        return strips
+
+    def _decode_to_spill(self):
+        gray = cv2.imread(self.image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Failed to decode image: {self.image_path}")
+        self._spill = tempfile.NamedTemporaryFile(prefix="image2gcode_", suffix=".gray")
+        spill = np.memmap(self._spill.name, dtype=np.uint8, mode="w+", shape=gray.shape)
+        spill[:] = gray
+        spill.flush()
+        del gray, spill
+        data = np.memmap(self._spill.name, dtype=np.uint8, mode="r", shape=(self.height, self.width))
+        return (0, self.height, data[:, :, None], "L")
+
+    def read(self, y0: int, y1: int, x0: int, x1: int):
+        out = np.empty((y1 - y0, x1 - x0), dtype=np.uint8)
+        for s0, s1, data, rawmode in self.strips:
+            a, b = max(y0, s0), min(y1, s1)
+            if a >= b:
+                continue
+            region = np.ascontiguousarray(data[a - s0:b - s0, x0:x1])
+            code = RAW_MODES[rawmode][1]
+            out[a - y0:b - y0] = cv2.cvtColor(region, code) if code is not None else region[:, :, 0]
+        return out
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+class TiledTracer:
+    """
+    Traces an image tile by tile so peak memory is bounded by tile_memory_mb
+    instead of the image size.
+
+    Each tile is read with enough overlap that blur and edge detection inside
+    its core match a full-frame run, and its core's mask is written to a
+    memory-mapped spill file. The speck filter runs on that mask across
+    tiles (filter_artifacts). Tiles are then traced from the mask with
+    CHAIN_APPROX_NONE and cut into the runs of border pixels that fall
+    inside their core. Runs from neighbouring tiles are joined where they
+    cross the seam, so contours come out as if the whole image had been
+    traced at once.
+    """
+    # Canny's hysteresis can follow weak edges arbitrarily far; 32 px makes seam differences rare
+    CANNY_MARGIN = 32
+
+    def __init__(self, settings_manager, converter):
+        self.converter = converter
+        self.memory_mb = settings_manager.get("tile_memory_mb")
+        self.workers = settings_manager.get("tile_workers") or os.cpu_count() or 1
+        ksize = settings_manager.get("blur_ksize")
+        self.overlap = ksize // 2 + 3 + (self.CANNY_MARGIN if settings_manager.get("svg_mode") == "canny" else 0)
+
+    @staticmethod
+    def image_size(image_path: str):
+        """
+        (width, height) from the file header, without decoding pixels.
+        """
+        with Image.open(image_path) as img:
+            return img.size
+
+    @staticmethod
+    def fits_in_memory(image_path: str, memory_mb: float) -> bool:
+        w, h = TiledTracer.image_size(image_path)
+        return w * h * BYTES_PER_TILE_PIXEL <= memory_mb * 1024 * 1024
+
+    def tile_size(self) -> int:
+        per_tile = self.memory_mb * 1024 * 1024 / self.workers / BYTES_PER_TILE_PIXEL
+        return max(64, int(np.sqrt(per_tile)) - 2 * self.overlap)
+
+    def trace(self, image_path: str, on_progress=None) -> Toolpath:
+        """
+        Mask every tile, filter specks, trace every tile and stitch the
+        seams. on_progress(fraction) is called as tiles finish.
+        """
+        source = GraySource(image_path)
+        spill = tempfile.NamedTemporaryFile(prefix="image2gcode_", suffix=".mask")
+        try:
+            if self.converter.remove_background and self.converter.background is None:
+                # one level for the whole image, or tiles would each find their own
+                w, h = source.width, source.height
+                border = np.concatenate([source.read(0, 1, 0, w).ravel(), source.read(h - 1, h, 0, w).ravel(),
+                                         source.read(0, h, 0, 1).ravel(), source.read(0, h, w - 1, w).ravel()])
+                self.converter.background = self.converter.estimate_background(None, border)
+            size = self.tile_size()
+            cores = [(y, min(y + size, source.height), x, min(x + size, source.width))
+                     for y in range(0, source.height, size) for x in range(0, source.width, size)]
+            mask = np.memmap(spill.name, dtype=np.uint8, mode="w+", shape=(source.height, source.width))
+            steps = 2 * len(cores)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # map() keeps at most `workers` tiles' buffers alive at a time
+                for done, _ in enumerate(pool.map(partial(self._mask_tile, source, mask), cores), 1):
+                    if on_progress:
+                        on_progress(done / steps)
+                self.converter.artifacts_removed += self.filter_artifacts(mask, cores, pool)
+                fragments, closed_paths = [], []
+                for done, (frags, loops) in enumerate(pool.map(partial(self._trace_tile, mask), cores), len(cores) + 1):
+                    fragments.extend(frags)
+                    closed_paths.extend(loops)
+                    if on_progress:
+                        on_progress(done / steps)
+            del mask  # unmap before the spill file is closed
+            toolpath = Toolpath(source.width, source.height)
+            for pts, closed in _stitch(fragments):
+                closed_paths.append(pts) if closed else toolpath.add(_compress(pts, False), False)
+            for pts in closed_paths:
+                pts = _compress(pts, True)
+                if _area(pts) >= 5:
+                    toolpath.add(pts)
+            return toolpath
+        finally:
+            spill.close()
+            source.close()
+
+    def _mask_tile(self, source, mask, core):
+        cy0, cy1, cx0, cx1 = core
+        ov = self.overlap
+        y0, y1 = max(0, cy0 - ov), min(source.height, cy1 + ov)
+        x0, x1 = max(0, cx0 - ov), min(source.width, cx1 + ov)
+        gray = source.read(y0, y1, x0, x1)
+        blur = cv2.GaussianBlur(gray, (self.converter.blur_ksize, self.converter.blur_ksize), 0)
+        del gray
+        mask[cy0:cy1, cx0:cx1] = self.converter.mask(blur)[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+
+    def filter_artifacts(self, mask, cores, pool) -> int:
+        """
+        RasterSVGConverter.filter_artifacts on the spilled mask, with the
+        same answer as a full-frame run: components are labelled per tile
+        core, joined across seams by a union-find over the pixel pairs
+        that touch there, and judged by the bounding box of the whole
+        component. Returns the number removed.
+        """
+        min_pixels = self.converter.min_artifact_pixels(mask.shape[0] * mask.shape[1])
+        if min_pixels < 1:
+            return 0
+        removed = 0
+        for holes in self.converter.artifact_passes():
+            def label(core):
+                cy0, cy1, cx0, cx1 = core
+                target = mask[cy0:cy1, cx0:cx1]
+                target = cv2.bitwise_not(target) if holes else np.ascontiguousarray(target)
+                return cv2.connectedComponentsWithStats(target, connectivity=8)[1:3]
+
+            # global component ids: tile offset + label, 0 for pixels outside the target
+            offsets, boxes, edges, count = [], [], {}, 0
+            for (cy0, cy1, cx0, cx1), (labels, stats) in zip(cores, pool.map(label, cores)):
+                ids = np.where(labels > 0, labels + count, 0)
+                edges[cy0, cx0] = (ids[0], ids[-1], ids[:, 0], ids[:, -1])  # top, bottom, left, right
+                x, y = stats[1:, cv2.CC_STAT_LEFT] + cx0, stats[1:, cv2.CC_STAT_TOP] + cy0
+                boxes.append(np.stack([x, y, x + stats[1:, cv2.CC_STAT_WIDTH], y + stats[1:, cv2.CC_STAT_HEIGHT]], 1))
+                offsets.append(count)
+                count += len(stats) - 1
+            if not count:
+                continue
+            root = _union(count + 1, _seam_pairs(edges))
+            box = np.concatenate([np.zeros((1, 4), dtype=np.int64)] + [b.astype(np.int64) for b in boxes])
+            whole = np.empty_like(box)
+            whole[:, :2] = np.iinfo(np.int64).max
+            whole[:, 2:] = np.iinfo(np.int64).min
+            np.minimum.at(whole[:, 0], root, box[:, 0])
+            np.minimum.at(whole[:, 1], root, box[:, 1])
+            np.maximum.at(whole[:, 2], root, box[:, 2])
+            np.maximum.at(whole[:, 3], root, box[:, 3])
+            area = (whole[:, 2] - whole[:, 0]) * (whole[:, 3] - whole[:, 1])
+            small = np.zeros(count + 1, dtype=bool)
+            small[1:] = area[root[1:]] < min_pixels
+            removed += int((small & (root == np.arange(count + 1))).sum())
+            if not small.any():
+                continue
+
+            def clear(job):
+                (cy0, cy1, cx0, cx1), offset = job
+                labels, _ = label((cy0, cy1, cx0, cx1))
+                drop = small[np.where(labels > 0, labels + offset, 0)]
+                if drop.any():
+                    mask[cy0:cy1, cx0:cx1][drop] = 255 if holes else 0
+            list(pool.map(clear, zip(cores, offsets)))
+        return removed
+
+    def _trace_tile(self, mask, core):
+        cy0, cy1, cx0, cx1 = core
+        ov = self.overlap
+        y0, y1 = max(0, cy0 - ov), min(mask.shape[0], cy1 + ov)
+        x0, x1 = max(0, cx0 - ov), min(mask.shape[1], cx1 + ov)
+        contours, _ = cv2.findContours(np.ascontiguousarray(mask[y0:y1, x0:x1]), cv2.RETR_LIST,
+                                       cv2.CHAIN_APPROX_NONE)
+
+        fragments, loops = [], []
+        offset = np.array([x0, y0], dtype=np.int32)
+        for cnt in contours:
+            pts = cnt.reshape(-1, 2) + offset
+            inside = (pts[:, 0] >= cx0) & (pts[:, 0] < cx1) & (pts[:, 1] >= cy0) & (pts[:, 1] < cy1)
+            if inside.all():
+                loops.append(pts)
+            elif inside.any():
+                fragments.extend(_split_runs(pts, inside))
+        return fragments, loops
+
+
+def _seam_pairs(edges):
+    """
+    (n, 2) global id pairs of 8-neighbouring target pixels on either side
+    of every seam, from each tile's edge labels keyed by its core's
+    top-left corner.
+    """
+    ys = sorted({y for y, _ in edges})
+    xs = sorted({x for _, x in edges})
+    pairs = []
+    for i in range(1, len(ys)):  # full-width rows either side of each horizontal seam
+        above = np.concatenate([edges[ys[i - 1], x][1] for x in xs])
+        below = np.concatenate([edges[ys[i], x][0] for x in xs])
+        pairs += _line_pairs(above, below)
+    for i in range(1, len(xs)):  # full-height columns either side of each vertical seam
+        left = np.concatenate([edges[y, xs[i - 1]][3] for y in ys])
+        right = np.concatenate([edges[y, xs[i]][2] for y in ys])
+        pairs += _line_pairs(left, right)
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.concatenate(pairs)
+    return np.unique(pairs[(pairs > 0).all(axis=1)], axis=0)
+
+
+def _line_pairs(a, b):
+    # straight across and both diagonals
+    n = len(a)
+    return [np.stack([a[:n - 1], b[1:]], 1), np.stack([a, b], 1), np.stack([a[1:], b[:n - 1]], 1)]
+
+
+def _union(count, pairs):
+    """
+    Root (smallest id) of every id after joining each pair, by min-label
+    propagation with pointer jumping.
+    """
+    parent = np.arange(count, dtype=np.int64)
+    u, v = pairs[:, 0], pairs[:, 1]
+    while True:
+        ru, rv = parent[u], parent[v]
+        if (ru == rv).all():
+            return parent
+        low = np.minimum(ru, rv)
+        np.minimum.at(parent, ru, low)
+        np.minimum.at(parent, rv, low)
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+
+
+def _split_runs(pts, inside):
+    """
+    Cut a closed contour into maximal runs of inside points. Each run carries
+    the seam crossings at its ends as (outside, inside) / (inside, outside) pairs.
+    """
+    first_out = int(np.argmin(inside))
+    pts, inside = np.roll(pts, -first_out, axis=0), np.roll(inside, -first_out)
+    edges = np.diff(inside.astype(np.int8))
+    starts = np.flatnonzero(edges == 1) + 1
+    ends = np.flatnonzero(edges == -1) + 1
+    if len(ends) < len(starts):  # run reaches the end of the rolled array
+        ends = np.append(ends, len(pts))
+    runs = []
+    for s, e in zip(starts, ends):
+        head = (tuple(pts[s - 1]), tuple(pts[s]))
+        tail = (tuple(pts[e - 1]), tuple(pts[e % len(pts)]))
+        runs.append((pts[s:e], head, tail))
+    return runs
+
+
+def _stitch(fragments):
+    """
+    Join fragments whose seam crossings coincide. A tail crossing (a, b) of one
+    fragment continues at the head crossing (a, b) of another.
+    """
+    by_head = {}
+    for i, (_, head, _) in enumerate(fragments):
+        by_head.setdefault(head, []).append(i)
+    used = [False] * len(fragments)
+    has_pred = set()
+    for _, _, tail in fragments:
+        for j in by_head.get(tail, ()):
+            has_pred.add(j)
+
+    def walk(start):
+        i, chain = start, []
+        closed = False
+        while True:
+            used[i] = True
+            pts, _, tail = fragments[i]
+            chain.append(pts)
+            nxt = [j for j in by_head.get(tail, ()) if not used[j] or j == start]
+            if not nxt:
+                break
+            if nxt[0] == start:
+                closed = True
+                break
+            i = nxt[0]
+        return np.concatenate(chain), closed
+
+    # open chains first, from fragments nothing leads into, then the remaining loops
+    order = [i for i in range(len(fragments)) if i not in has_pred] + list(range(len(fragments)))
+    for i in order:
+        if not used[i]:
+            yield walk(i)
+
+
+def _compress(pts, closed):
+    """
+    Drop vertices in the middle of straight runs, like CHAIN_APPROX_SIMPLE.
+    """
+    if len(pts) < 3:
+        return pts
+    if closed:
+        prev, nxt = np.roll(pts, 1, axis=0), np.roll(pts, -1, axis=0)
+        keep = np.any((pts - prev) != (nxt - pts), axis=1)
+    else:
+        keep = np.ones(len(pts), dtype=bool)
+        keep[1:-1] = np.any((pts[1:-1] - pts[:-2]) != (pts[2:] - pts[1:-1]), axis=1)
+    return pts[keep] if keep.any() else pts[:1]
+
+
+def _area(pts):
+    x, y = pts[:, 0].astype(np.float64), pts[:, 1].astype(np.float64)
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
@@ -0,0 +1,194 @@
+import re
+
+import numpy as np
+
+from .gcode_parser import MOTION_CCW, MOTION_CW, MOTION_RAPID, parse_gcode
+from .gcode_writer import MM_PER_INCH
+
+# machine limits filled in for anything a profile leaves out: feeds in mm/min,
+# acceleration in mm/s^2, junction deviation in mm (GRBL's $11)
+DEFAULT_PROFILE = {"max_feed": 6000.0, "rapid_feed": 6000.0, "acceleration": 500.0, "junction_deviation": 0.01}
+
+# "; layer N #rrggbb" comments opening each colour block (see NativeGcodeWriter)
+_LAYER = re.compile(rb";[ \t]*layer[ \t]+(\d+)")
+
+# moves shorter than this take no time and have no direction
+MIN_MOVE = 1e-9
+
+
+class TimeEstimator:
+    """
+    How long a program takes on the machine, from a kinematic simulation of
+    a GRBL-style planner: every move accelerates and decelerates at the
+    profile's acceleration up to its feed (capped by max_feed; G0 runs at
+    rapid_feed), corners are taken at the junction-deviation speed, and
+    the machine starts and ends at rest. Arcs are capped at the speed their
+    radius allows. Dwells and controller overhead are not counted.
+
+    The planner's backward and forward passes are the recurrences
+    v[i]^2 = min(limit[i], v[i+1]^2 + 2 a d[i]), which unroll to running
+    minimums over cumulative sums, so the whole program is simulated with
+    array operations and no per-move Python loop.
+    """
+    def __init__(self, settings_manager):
+        name = settings_manager.get("machine_profile")
+        profiles = settings_manager.get("machine_profiles") or {}
+        if name not in profiles:
+            raise ValueError(f"Unknown machine profile: {name}")
+        profile = {**DEFAULT_PROFILE, **profiles[name]}
+        self.max_feed = float(profile["max_feed"])
+        self.rapid_feed = float(profile["rapid_feed"])
+        self.acceleration = float(profile["acceleration"])
+        self.junction_deviation = float(profile["junction_deviation"])
+        if min(self.max_feed, self.rapid_feed, self.acceleration) <= 0 or self.junction_deviation < 0:
+            raise ValueError(f"Machine profile {name} needs positive feeds and acceleration")
+        self.feedrate = settings_manager.get("feedrate")
+        # feed of cuts with no F word in force yet (GRBL would refuse them): the configured one
+        feedrate = float(self.feedrate or 0)
+        self.default_feed = min(feedrate, self.max_feed) if feedrate > 0 else self.max_feed
+        self.dpi = settings_manager.get("dpi")
+        self.report = {}
+
+    def estimate_gcode(self, source) -> dict:
+        """
+        Estimate a G-code file (path or bytes). Blocks opened by "; layer"
+        comments are timed separately.
+        """
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            with open(source, "rb") as f:
+                source = f.read()
+        program = parse_gcode(source)
+        start, end = program.start, program.end
+        chord = end - start
+        length = np.sqrt((chord ** 2).sum(axis=1))
+        entry = exit_ = chord
+
+        arc = program.motion >= MOTION_CW
+        radius = None
+        if arc.any():
+            # arcs: swept length and the tangents at both ends instead of the chord
+            ccw = np.where(program.motion[arc] == MOTION_CCW, 1.0, -1.0)
+            r0 = start[arc, :2] - program.center[arc]
+            r1 = end[arc, :2] - program.center[arc]
+            sweep = (np.arctan2(r1[:, 1], r1[:, 0]) - np.arctan2(r0[:, 1], r0[:, 0])) * ccw
+            sweep = np.where(sweep <= 1e-12, sweep + 2 * np.pi, sweep)  # same end point: a full turn
+            radius = np.full(len(length), np.inf)
+            radius[arc] = np.hypot(r0[:, 0], r0[:, 1])
+            length = length.copy()
+            length[arc] = np.hypot(radius[arc] * sweep, chord[arc, 2])
+            entry, exit_ = chord.copy(), chord.copy()
+            entry[arc, :2] = np.stack([-r0[:, 1], r0[:, 0]], axis=1) * ccw[:, None]
+            exit_[arc, :2] = np.stack([-r1[:, 1], r1[:, 0]], axis=1) * ccw[:, None]
+
+        layer = None
+        markers = [(m.start(), int(m.group(1))) for m in _LAYER.finditer(source)]
+        if markers:
+            newlines = np.flatnonzero(np.frombuffer(source, dtype=np.uint8) == ord("\n"))
+            marker_lines = np.searchsorted(newlines, [pos for pos, _ in markers])
+            numbers = np.array([0] + [n for _, n in markers])
+            layer = numbers[np.searchsorted(marker_lines, program.line, side="right")]
+
+        feed = np.where(program.feed > 0, np.minimum(program.feed, self.max_feed), self.default_feed)
+        feed = np.where(program.motion == MOTION_RAPID, self.rapid_feed, feed)
+        return self.simulate(length, entry, exit_, feed, program.motion == MOTION_RAPID, radius, layer)
+
+    def estimate_toolpath(self, toolpath) -> dict:
+        """
+        Estimate a Toolpath as NativeGcodeWriter would cut it: straight moves
+        at feedrate, a rapid from the origin (bottom-left) to each path, arcs
+        left as their vertices. Tool commands are not simulated, so Z moves
+        in tool_on_cmd/tool_off_cmd only show up in estimate_gcode.
+        """
+        scale = MM_PER_INCH / self.dpi
+        parts, layers = [], []
+        for (pts, closed), layer in zip(toolpath, toolpath.layers):
+            if len(pts) < 2:
+                continue
+            xy = np.asarray(pts, dtype=np.float64) * (scale, -scale) + (0.0, toolpath.height * scale)
+            parts.append(np.vstack([xy, xy[:1]]) if closed else xy)
+            layers.append(layer)
+        if not parts:
+            return self.simulate(np.zeros(0), np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0), np.zeros(0, dtype=bool))
+        counts = np.array([len(p) for p in parts])
+        points = np.concatenate(parts)
+        firsts = np.cumsum(counts) - counts
+        exits = np.vstack([[0.0, 0.0], points[firsts[1:] - 1]])
+
+        # each path becomes its rapid followed by its cuts: a leading rapid row per path
+        rows = len(points)
+        start = np.empty((rows, 2))
+        end = np.empty((rows, 2))
+        is_rapid = np.zeros(rows, dtype=bool)
+        is_rapid[firsts] = True
+        start[firsts], end[firsts] = exits, points[firsts]
+        cuts = ~is_rapid
+        start[cuts] = np.delete(points, firsts + counts - 1, axis=0)
+        end[cuts] = np.delete(points, firsts, axis=0)
+        chord = end - start
+        feed = np.where(is_rapid, self.rapid_feed, self.default_feed)
+        layer = np.repeat(layers, counts) if toolpath.layer_colors else None
+        if layer is not None:
+            layer = layer + 1  # numbered from 1 as in the G-code
+        return self.simulate(np.hypot(chord[:, 0], chord[:, 1]), chord, chord, feed, is_rapid, None, layer)
+
+    def simulate(self, length, entry, exit_, feed, rapid, radius=None, layer=None) -> dict:
+        """
+        Time every move of lengths length (mm) with entry and exit
+        directions, feeds (mm/min) and rapid flags, and return the report:
+        total, cutting and rapid seconds, plus seconds per layer number when
+        layer is given (0 is whatever comes before the first layer).
+        """
+        keep = length > MIN_MOVE
+        length, feed, rapid = length[keep], feed[keep], rapid[keep]
+        entry, exit_ = _unit(entry[keep]), _unit(exit_[keep])
+        a = self.acceleration
+        nominal = (feed / 60.0) ** 2  # squared speeds in (mm/s)^2 from here on
+        if radius is not None:
+            nominal = np.minimum(nominal, a * radius[keep])  # centripetal limit on arcs
+
+        # fastest squared speed through each corner (GRBL junction deviation), then
+        # never above either move's own speed; the machine starts and stops at rest
+        cos = -(exit_[:-1] * entry[1:]).sum(axis=1)
+        sin_half = np.sqrt(np.clip((1.0 - cos) / 2.0, 0.0, 1.0))
+        with np.errstate(divide="ignore"):
+            corner = np.where(sin_half < 1.0 - 1e-9, a * self.junction_deviation * sin_half / (1.0 - sin_half), np.inf)
+        corner = np.minimum(corner, np.minimum(nominal[:-1], nominal[1:]))
+        limit = np.concatenate([[0.0], corner, [0.0]])
+
+        # backward pass: entry[i] = min(limit[i], entry[i+1] + 2 a d[i]), then forward the same way
+        reach = 2.0 * a * length
+        after = np.concatenate([np.cumsum(reach[::-1])[::-1], [0.0]])  # reach from node i to the end
+        backward = np.minimum.accumulate((limit - after)[::-1])[::-1] + after
+        before = np.concatenate([[0.0], np.cumsum(reach)])  # reach from the start to node i
+        speed = np.minimum.accumulate(backward - before) + before
+
+        time = _trapezoid_times(length, np.maximum(speed[:-1], 0.0), np.maximum(speed[1:], 0.0), nominal, a)
+        cutting = float(time[~rapid].sum())
+        self.report = {
+            "machine_time_s": round(float(time.sum()), 1),
+            "machine_cut_time_s": round(cutting, 1),
+            "machine_rapid_time_s": round(float(time.sum()) - cutting, 1),
+        }
+        if layer is not None and len(time):
+            per_layer = np.bincount(layer[keep], weights=time)
+            self.report["machine_layer_times_s"] = {str(n): round(float(t), 1) for n, t in enumerate(per_layer) if t}
+        return self.report
+
+
+def _unit(v):
+    norm = np.sqrt((v ** 2).sum(axis=1))
+    return v / np.maximum(norm, MIN_MOVE)[:, None]
+
+
+def _trapezoid_times(length, v0, v1, nominal, a):
+    """
+    Seconds per move from squared entry, exit and cruise speeds: accelerate,
+    cruise, decelerate, or just accelerate and decelerate when the move is
+    too short to reach cruise speed.
+    """
+    cruise = np.maximum(nominal, np.maximum(v0, v1))
+    ramps = (2 * cruise - v0 - v1) / (2 * a)
+    peak = np.where(ramps <= length, cruise, (2 * a * length + v0 + v1) / 2)
+    flat = np.maximum(length - (2 * peak - v0 - v1) / (2 * a), 0.0)
+    vp = np.sqrt(peak)  # positive for any move longer than MIN_MOVE
+    return (2 * vp - np.sqrt(v0) - np.sqrt(v1)) / a + flat / vp
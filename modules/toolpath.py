@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class Toolpath:
+    """
+    Ordered polylines in image pixel coordinates (origin top-left, y down).
+    Each path is an (N, 2) NumPy array; closed paths return to their first point.
+    `arcs` is either None or a list aligned with `paths` holding fitted arc
+    spans (see path_simplifier.find_arcs) for writers that support G2/G3.
+
+    Colour jobs split the paths into layers: `layer_colors` names each layer
+    ("#rrggbb", darkest first) and `layers` holds each path's layer index.
+    Single-colour toolpaths leave `layer_colors` empty.
+    """
+    def __init__(self, width: int, height: int, paths=None, closed=None):
+        self.width = width
+        self.height = height
+        self.paths = list(paths) if paths is not None else []
+        self.closed = list(closed) if closed is not None else [True] * len(self.paths)
+        self.layers = [0] * len(self.paths)
+        self.layer_colors = []
+        self.arcs = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return zip(self.paths, self.closed)
+
+    def add(self, pts, closed: bool = True, layer: int = 0):
+        self.paths.append(pts)
+        self.closed.append(closed)
+        self.layers.append(layer)
+
+    def split_layers(self):
+        """
+        One Toolpath per layer, in layer order, with arcs carried along.
+        """
+        parts = [Toolpath(self.width, self.height) for _ in range(max(len(self.layer_colors), 1))]
+        for i, (pts, closed) in enumerate(self):
+            parts[self.layers[i]].add(pts, closed)
+        if self.arcs is not None:
+            for part in parts:
+                part.arcs = []
+            for layer, arcs in zip(self.layers, self.arcs):
+                parts[layer].arcs.append(arcs)
+        return parts
+
+    @classmethod
+    def merge_layers(cls, parts, layer_colors) -> "Toolpath":
+        """
+        Inverse of split_layers: concatenate per-layer toolpaths in order.
+        """
+        merged = cls(parts[0].width, parts[0].height)
+        merged.layer_colors = list(layer_colors)
+        for layer, part in enumerate(parts):
+            for pts, closed in part:
+                merged.add(pts, closed, layer)
+        if any(part.arcs is not None for part in parts):
+            merged.arcs = [a for part in parts for a in (part.arcs or [None] * len(part))]
+        return merged
+
+    def segment_count(self) -> int:
+        """
+        Number of straight cutting segments, counting the closing segment of closed paths.
+        """
+        return sum(len(p) - 1 + int(c) for p, c in self)
+
+    def cut_length(self) -> float:
+        """
+        Total cutting length in pixels.
+        """
+        total = 0.0
+        for pts, closed in self:
+            p = pts.astype(np.float64)
+            if closed:
+                p = np.vstack([p, p[:1]])
+            total += float(np.hypot(*np.diff(p, axis=0).T).sum())
+        return total
+
+    def to_arrays(self) -> dict:
+        """
+        Flatten into plain NumPy arrays, e.g. for np.savez or pickling across processes.
+        """
+        lengths = np.array([len(p) for p in self.paths], dtype=np.int64)
+        points = np.concatenate(self.paths).astype(np.float64) if self.paths else np.empty((0, 2))
+        arrays = {
+            "size": np.array([self.width, self.height], dtype=np.int64),
+            "points": points,
+            "lengths": lengths,
+            "closed": np.array(self.closed, dtype=bool),
+        }
+        if self.layer_colors:
+            arrays["layers"] = np.array(self.layers, dtype=np.int64)
+            arrays["layer_colors"] = np.array(self.layer_colors)
+        if self.arcs is not None:
+            rows = [a if a is not None else np.empty((0, 5)) for a in self.arcs]
+            arrays["arc_counts"] = np.array([len(r) for r in rows], dtype=np.int64)
+            arrays["arcs"] = np.concatenate(rows) if rows else np.empty((0, 5))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "Toolpath":
+        width, height = (int(v) for v in arrays["size"])
+        splits = np.cumsum(arrays["lengths"])[:-1]
+        paths = np.split(arrays["points"], splits) if len(arrays["lengths"]) else []
+        toolpath = cls(width, height, paths, arrays["closed"].tolist())
+        if "layer_colors" in arrays:
+            toolpath.layers = arrays["layers"].tolist()
+            toolpath.layer_colors = [str(c) for c in arrays["layer_colors"]]
+        if "arcs" in arrays:
+            rows = np.split(arrays["arcs"], np.cumsum(arrays["arc_counts"])[:-1])
+            toolpath.arcs = [r if len(r) else None for r in rows]
+        return toolpath
@@ -0,0 +1,250 @@
+import cv2
+import numpy as np
+
+from .gcode_parser import MOTION_CW, MOTION_RAPID
+
+# colours are RGB; the canvas hands the buffer to QImage.Format_RGB888 as is
+CUT_COLOR = (74, 20, 140)
+RAPID_COLOR = (239, 83, 80)
+
+# anti-aliasing costs ~3x; only worth it when few segments are on screen
+AA_SEGMENT_LIMIT = 200_000
+
+
+class ToolpathGeometry:
+    """
+    Cut polylines and rapid moves in one world frame (x right, y down), with
+    level-of-detail copies for drawing.
+
+    Level 0 is the exact polylines. Level k > 0 snaps segment ends to a grid
+    of cell_size(k) and keeps each distinct snapped segment once, so a
+    zoomed-out view draws at most a few segments per screen pixel however many
+    the program has. Levels are built on first use and kept.
+    """
+    LEVEL_BASE = 1 << 14   # level 1 grid: extent / LEVEL_BASE; each level doubles the cell
+
+    def __init__(self, points, lengths, rapids):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.rapids = np.asarray(rapids, dtype=np.float64).reshape(-1, 2, 2)
+        ends = np.vstack([self.points, self.rapids.reshape(-1, 2)])
+        if len(ends):
+            self.bounds = (*ends.min(axis=0), *ends.max(axis=0))
+        else:
+            self.bounds = (0.0, 0.0, 1.0, 1.0)
+        self.extent = max(self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1], 1e-9)
+        self._levels = {0: (self.points, self.lengths, _bboxes(self.points, self.lengths), self.rapids)}
+
+    @property
+    def segment_count(self) -> int:
+        return int(np.maximum(self.lengths - 1, 0).sum()) + len(self.rapids)
+
+    @classmethod
+    def from_toolpath(cls, toolpath, origin=None):
+        """
+        Pixel-space geometry from a Toolpath. Rapids join each path's exit
+        point to the next path's start, beginning at origin (default the
+        bottom-left corner, where the machine starts).
+        """
+        parts = [np.vstack([p, p[:1]]) if closed else np.asarray(p) for p, closed in toolpath if len(p)]
+        if not parts:
+            return cls(np.zeros((0, 2)), [], np.zeros((0, 2, 2)))
+        points = np.concatenate(parts).astype(np.float64)
+        lengths = np.array([len(p) for p in parts])
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        exits = points[starts + lengths - 1]
+        origin = np.array([0.0, toolpath.height]) if origin is None else np.asarray(origin, dtype=np.float64)
+        rapids = np.stack([np.vstack([origin, exits[:-1]]), points[starts]], axis=1)
+        return cls(points, lengths, rapids)
+
+    @classmethod
+    def from_program(cls, program, arc_step_deg: float = 10.0):
+        """
+        Machine-space geometry from a parsed GcodeProgram, with arcs flattened
+        to chords of at most arc_step_deg and y flipped to point down.
+        """
+        flip = np.array([1.0, -1.0])
+        moved = np.any(program.start[:, :2] != program.end[:, :2], axis=1)
+        rapid = moved & (program.motion == MOTION_RAPID)
+        rapids = np.stack([program.start[rapid, :2], program.end[rapid, :2]], axis=1) * flip
+
+        cut = np.flatnonzero(moved & program.cutting)
+        if not len(cut):
+            return cls(np.zeros((0, 2)), [], rapids)
+        # a chain breaks wherever anything else (a rapid, a Z move) came between two cuts
+        head = np.ones(len(cut), dtype=bool)
+        head[1:] = np.diff(cut) != 1
+        head[1:] |= np.any(program.start[cut[1:], :2] != program.end[cut[:-1], :2], axis=1)
+
+        pieces = _arc_points(program, cut, np.radians(arc_step_deg))
+        counts = np.bincount(pieces[1], minlength=len(cut))
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        heads = np.flatnonzero(head)
+        points = np.insert(pieces[0], offsets[heads], program.start[cut[heads], :2], axis=0)
+        lengths = np.add.reduceat(counts, heads) + 1
+        return cls(points * flip, lengths, rapids)
+
+    def cell_size(self, level: int) -> float:
+        return self.extent / self.LEVEL_BASE * (1 << (level - 1)) if level else 0.0
+
+    def level_for(self, scale: float) -> int:
+        """
+        Coarsest level whose grid is at most two screen pixels: with 1 px
+        strokes, the snapping error stays within the line's own blur.
+        """
+        pixel = 2.0 / scale
+        level = 0
+        while self.cell_size(level + 1) <= pixel and level < 24:
+            level += 1
+        return level
+
+    def level(self, level: int):
+        if level not in self._levels:
+            self._levels[level] = self._decimate(level)
+        return self._levels[level]
+
+    def prepare(self, max_level: int = 16):
+        """
+        Build the coarse levels ahead of time, e.g. on a worker thread.
+        """
+        for level in range(1, max_level + 1):
+            self.level(level)
+
+    def _decimate(self, level: int):
+        """
+        Snap segment ends to the level's grid and keep each distinct
+        (cell, cell) pair once. However many segments cross a region, only a
+        handful per occupied cell survive, so drawing cost is bounded by what
+        is on screen rather than by program size. Each level is derived from
+        the previous one, whose grid cells nest two by two into its own.
+        """
+        cell = self.cell_size(level)
+        if level == 1:
+            if not len(self.points):
+                return (*self._levels[0], np.zeros((0, 2), dtype=np.int64))
+            cells = np.floor((self.points - self.bounds[:2]) / cell).astype(np.int64)
+            inner = np.ones(len(cells), dtype=bool)  # segment i runs from vertex i to i + 1
+            inner[np.cumsum(self.lengths) - 1] = False
+            a, b = cells[:-1][inner[:-1]], cells[1:][inner[:-1]]
+        else:
+            cells = self.level(level - 1)[4] // 2
+            a, b = cells[0::2], cells[1::2]
+
+        columns = int(max(a[:, 1].max(initial=0), b[:, 1].max(initial=0))) + 1
+        ida, idb = a[:, 0] * columns + a[:, 1], b[:, 0] * columns + b[:, 1]
+        total = int(max(ida.max(initial=0), idb.max(initial=0))) + 1
+        pairs = np.sort(np.minimum(ida, idb) * total + np.maximum(ida, idb))
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]  # sort-based unique, far faster than np.unique's hash
+        ends = np.stack([pairs // total, pairs % total], axis=1).ravel()
+        cells = np.stack([ends // columns, ends % columns], axis=1)
+        points = (cells + 0.5) * cell + self.bounds[:2]
+        lengths = np.full(len(pairs), 2)
+
+        rapid_len = np.hypot(*(self.rapids[:, 1] - self.rapids[:, 0]).T)
+        rapids = self.rapids[rapid_len >= cell]
+        return points, lengths, _bboxes(points, lengths), rapids, cells
+
+    def render(self, scale: float, origin, size, show_rapids: bool = True):
+        """
+        Draw the view whose top-left world point is origin at scale screen
+        pixels per world unit into a white (h, w, 3) RGB array. Returns the
+        array and the number of segments drawn.
+        """
+        w, h = size
+        canvas = np.full((h, w, 3), 255, dtype=np.uint8)
+        level = self.level_for(scale)
+        points, lengths, bboxes, rapids = self.level(level)[:4]
+        origin = np.asarray(origin, dtype=np.float64)
+        view = (*origin, origin[0] + w / scale, origin[1] + h / scale)
+
+        visible = ((bboxes[:, 0] <= view[2]) & (bboxes[:, 2] >= view[0])
+                   & (bboxes[:, 1] <= view[3]) & (bboxes[:, 3] >= view[1]))
+        drawn = 0
+        if visible.any():
+            sel_lengths = lengths[visible]
+            starts = (np.cumsum(lengths) - lengths)[visible]
+            first = np.cumsum(sel_lengths) - sel_lengths
+            idx = np.arange(sel_lengths.sum()) + np.repeat(starts - first, sel_lengths)
+            screen = _to_screen(points[idx], origin, scale)
+            drawn = len(idx) - len(sel_lengths)
+            if level:
+                screen = _plot_short(canvas, screen.reshape(-1, 2, 2), CUT_COLOR).reshape(-1, 2)
+                sel_lengths = np.full(len(screen) // 2, 2)
+            if len(screen):
+                polys = np.split(screen, np.cumsum(sel_lengths)[:-1])
+                line_type = cv2.LINE_AA if drawn < AA_SEGMENT_LIMIT else cv2.LINE_8
+                cv2.polylines(canvas, polys, False, CUT_COLOR, 1, line_type, 4)
+
+        if show_rapids and len(rapids):
+            lo, hi = rapids.min(axis=1), rapids.max(axis=1)
+            on_screen = (lo[:, 0] <= view[2]) & (hi[:, 0] >= view[0]) & (lo[:, 1] <= view[3]) & (hi[:, 1] >= view[1])
+            segs = _to_screen(rapids[on_screen].reshape(-1, 2), origin, scale).reshape(-1, 2, 2)
+            cv2.polylines(canvas, list(segs), False, RAPID_COLOR, 1, cv2.LINE_8, 4)
+            drawn += len(segs)
+        return canvas, drawn
+
+
+def _plot_short(canvas, segs, color):
+    """
+    Set the pixels of segments at most two pixels long directly, which is
+    what the rasterizer would draw for them, and return the longer ones.
+    """
+    px = segs >> 4
+    short = np.abs(px[:, 0] - px[:, 1]).max(axis=1) <= 2
+    dots = np.concatenate([px[short, 0], px[short, 1], (px[short, 0] + px[short, 1]) // 2])
+    h, w = canvas.shape[:2]
+    inside = (dots[:, 0] >= 0) & (dots[:, 0] < w) & (dots[:, 1] >= 0) & (dots[:, 1] < h)
+    mask = np.zeros((h, w), dtype=bool)
+    mask[dots[inside, 1], dots[inside, 0]] = True
+    canvas[mask] = color
+    return segs[~short]
+
+
+def _to_screen(points, origin, scale):
+    # 4 fractional bits for cv2's shift argument; clipped so far-off vertices cannot overflow int32
+    return np.clip(np.round((points - origin) * (scale * 16)), -(1 << 28), 1 << 28).astype(np.int32)
+
+
+def _bboxes(points, lengths):
+    """
+    (xmin, ymin, xmax, ymax) per polyline.
+    """
+    if not len(lengths):
+        return np.zeros((0, 4))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.hstack([np.minimum.reduceat(points, starts), np.maximum.reduceat(points, starts)])
+
+
+def _arc_points(program, moves, step):
+    """
+    Points each cutting move contributes after its start: its end for a line,
+    chord ends at most step radians apart for an arc. Returns (points, owner)
+    with owner indexing into moves.
+    """
+    motion = program.motion[moves]
+    start, end = program.start[moves, :2], program.end[moves, :2]
+    arc = motion >= MOTION_CW
+    center = np.where(arc[:, None], program.center[moves], 0.0)
+
+    a0 = np.arctan2(start[:, 1] - center[:, 1], start[:, 0] - center[:, 0])
+    a1 = np.arctan2(end[:, 1] - center[:, 1], end[:, 0] - center[:, 0])
+    full = np.all(np.isclose(start, end), axis=1)
+    ccw_sweep = np.where(full, 2 * np.pi, np.mod(a1 - a0, 2 * np.pi))
+    cw_sweep = np.where(full, -2 * np.pi, -np.mod(a0 - a1, 2 * np.pi))
+    sweep = np.where(motion == MOTION_CW, cw_sweep, ccw_sweep)
+    counts = np.where(arc, np.maximum(1, np.ceil(np.abs(sweep) / step)), 1).astype(np.int64)
+
+    owner = np.repeat(np.arange(len(moves)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    t = k / counts[owner]
+    radius = np.hypot(start[:, 0] - center[:, 0], start[:, 1] - center[:, 1])
+    angle = a0[owner] + sweep[owner] * t
+    points = np.where(
+        arc[owner][:, None],
+        center[owner] + radius[owner][:, None] * np.stack([np.cos(angle), np.sin(angle)], axis=1),
+        end[owner],
+    )
+    # land exactly on the programmed end point
+    last = np.cumsum(counts) - 1
+    points[last] = end
+    return points, owner
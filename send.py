@@ -0,0 +1,82 @@
+"""
+Stream a G-code file to a controller.
+
+    python -m send output/logo.gcode /dev/ttyUSB0 --baud 115200
+    python -m send output/logo.gcode 192.168.1.50:23
+    python -m send output/logo.gcode --simulate
+
+While streaming, type p <Enter> to pause (feed hold), r to resume, a to
+abort; Ctrl+C aborts too.
+"""
+import argparse
+import sys
+import threading
+
+from modules.gcode_sender import GRBL_RX_BUFFER, GcodeSender, SimulatedGrbl, open_transport
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m send", description="Stream G-code to a GRBL-style controller.")
+    parser.add_argument("gcode", help="G-code file")
+    parser.add_argument("target", nargs="?", help="serial port, or host:port for TCP")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--rx-buffer", type=int, default=GRBL_RX_BUFFER, help="controller receive buffer in bytes")
+    parser.add_argument("--stop-on-error", action="store_true", help="abort at the first error reply")
+    parser.add_argument("--simulate", action="store_true", help="stream to a simulated controller on a local pty")
+    parser.add_argument("--block-time", type=float, default=0.001, help="simulated seconds per motion block")
+    return parser
+
+
+def _read_commands(sender):
+    for command in sys.stdin:
+        command = command.strip().lower()
+        if command == "p":
+            sender.pause()
+            print("paused", file=sys.stderr)
+        elif command == "r":
+            sender.resume()
+            print("resumed", file=sys.stderr)
+        elif command == "a":
+            sender.abort()
+            return
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.target and not args.simulate:
+        print("error: give a serial port or host:port, or --simulate", file=sys.stderr)
+        return 2
+
+    simulator = SimulatedGrbl(args.rx_buffer, block_time=args.block_time).start() if args.simulate else None
+    transport = open_transport(simulator.port if simulator else args.target, args.baud)
+    sender = GcodeSender(transport, args.rx_buffer, args.stop_on_error)
+    sender.wait_ready()
+    if sys.stdin.isatty():
+        threading.Thread(target=_read_commands, args=(sender,), daemon=True).start()
+
+    def on_progress(stats):
+        print(f"\r{stats['lines_acked']:>9,} lines  {stats['lines_per_second']:>8.1f} lines/s  "
+              f"buffer {stats['buffer_used']:>3}/{args.rx_buffer}", end="", file=sys.stderr)
+
+    try:
+        with open(args.gcode) as f:
+            sender.stream(f, on_progress)
+    except KeyboardInterrupt:
+        sender.abort()
+    finally:
+        transport.close()
+        if simulator:
+            simulator.stop()
+    print(file=sys.stderr)
+
+    for n, line, message in sender.errors:
+        print(f"line {n}: {line} -> {message}" if n else message, file=sys.stderr)
+    if simulator:
+        print(f"simulator: {simulator.stats}", file=sys.stderr)
+    if sender.aborted:
+        print("aborted", file=sys.stderr)
+    return 1 if sender.errors or sender.aborted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
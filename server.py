@@ -0,0 +1,50 @@
+"""
+Local conversion job server.
+
+    python -m server --port 8765 -j 4 --max-queue 32
+    curl --data-binary @logo.png "http://127.0.0.1:8765/jobs?name=logo.png&svg_mode=canny"
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from modules.job_server import JobServer
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m server", description="Serve image to G-code jobs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--max-queue", type=int, default=16, help="jobs waiting before new ones get 503")
+    parser.add_argument("--max-connections", type=int, default=64, help="HTTP requests handled at once")
+    parser.add_argument("--max-upload-mb", type=float, default=64)
+    parser.add_argument("--keep-jobs", type=int, default=100, help="finished jobs kept with their files")
+    parser.add_argument("--work-dir", default="jobs", help="uploads and outputs, one directory per job")
+    parser.add_argument("-c", "--config", default="config.yaml", help="settings file (read only)")
+    return parser
+
+
+async def serve(args):
+    server = JobServer(args.work_dir, args.config, args.workers, args.max_queue, args.max_connections,
+                       args.max_upload_mb, args.keep_jobs)
+    host, port = await server.start(args.host, args.port)
+    print(f"serving on http://{host}:{port} with {server.workers} workers", file=sys.stderr)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Trace an image with ranges of settings and draw the results on a contact sheet.
+
+    python -m sweep photo.png --threshold 96:160:32 --blur 3:7:2 -o sweep.png
+"""
+import argparse
+import json
+import os
+import sys
+
+import cv2
+
+from cli import parse_overrides
+from modules.parameter_sweep import SWEEP_KEYS, ParameterSweep, caption, contact_sheet, parse_range
+from modules.setting_manager import SettingsManager
+
+# command-line options and the settings they sweep
+RANGE_OPTIONS = {"threshold": "threshold", "blur": "blur_ksize", "canny_low": "canny_low", "canny_high": "canny_high"}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m sweep", description="Compare settings on a contact sheet.")
+    parser.add_argument("image", help="image file")
+    parser.add_argument("-o", "--output", default="sweep.png", help="contact sheet image")
+    parser.add_argument("-c", "--config", default="config.yaml", help="settings file (only written by --apply)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a setting for the sweep, value parsed as YAML")
+    for option in RANGE_OPTIONS:
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, metavar="RANGE",
+                            help="values as a,b,c or start:stop:step (stop included)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--columns", type=int, default=0, help="thumbnails per row (default: about square)")
+    parser.add_argument("--thumb-size", type=int, default=240, help="thumbnail side in pixels")
+    parser.add_argument("--json", action="store_true", help="print one JSON line per combination")
+    parser.add_argument("--apply", type=int, metavar="N", help="write combination #N's settings to the config file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        overrides = parse_overrides(args.overrides)
+        ranges = {key: parse_range(getattr(args, option)) for option, key in RANGE_OPTIONS.items()
+                  if getattr(args, option)}
+        settings = SettingsManager(args.config, persist=False)
+        settings.update(overrides)
+        sweep = ParameterSweep(settings, args.workers, args.thumb_size)
+        total = len(sweep.combinations(ranges))
+        if args.apply is not None and not 1 <= args.apply <= total:
+            raise ValueError(f"--apply takes a combination number from 1 to {total}")
+    except (argparse.ArgumentTypeError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    for key in ranges:
+        if sweep.mode not in SWEEP_KEYS[key]:
+            print(f"note: {key} does not change {sweep.mode} output, its range is ignored", file=sys.stderr)
+
+    def on_result(result, done, total):
+        print(f"[{done}/{total}] {caption(result)[0]}", file=sys.stderr)
+
+    try:
+        results = sweep.run(args.image, ranges, on_result)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    for result in results:
+        if args.json:
+            print(json.dumps({k: v for k, v in result.items() if k != "thumbnail"}))
+        else:
+            print("  ".join(caption(result)))
+    cv2.imwrite(args.output, cv2.cvtColor(contact_sheet(results, args.columns), cv2.COLOR_RGB2BGR))
+    print(f"contact sheet in {args.output}", file=sys.stderr)
+
+    if args.apply is not None:
+        params = results[args.apply - 1]["params"]
+        SettingsManager(args.config).update(params)
+        print(f"applied #{args.apply} to {args.config}: {params}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """
+    A config file with the repo's defaults and the stage cache off, so tests write nothing outside tmp_path.
+    """
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump({"cache_enabled": False}))
+    return str(path)
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    """
+    A small black-on-white drawing: a few filled shapes and a line.
+    """
+    import cv2
+    import numpy as np
+    img = np.full((120, 160, 3), 255, dtype=np.uint8)
+    cv2.rectangle(img, (10, 10), (60, 50), (0, 0, 0), -1)
+    cv2.circle(img, (110, 40), 25, (0, 0, 0), -1)
+    cv2.line(img, (10, 100), (150, 80), (0, 0, 0), 3)
+    path = tmp_path / "drawing.png"
+    cv2.imwrite(str(path), img)
+    return str(path)
@@ -0,0 +1,26 @@
+from modules.gcode_optimizer import GcodeOptimizer
+from modules.setting_manager import SettingsManager
+
+
+def optimize(tmp_path, config_path, source: str) -> str:
+    path = tmp_path / "program.gcode"
+    path.write_text(source)
+    GcodeOptimizer(SettingsManager(config_path, persist=False)).optimize(str(path))
+    return path.read_text()
+
+
+def test_dropped_motion_word_still_changes_the_mode(tmp_path, config_path):
+    # the zero-length G0 is dropped, but the bare move after it is still a rapid
+    out = optimize(tmp_path, config_path, "G1 X1 Y1 F300\nG0 X1 Y1\nX5 Y5\n")
+    assert out == "G1 X1 Y1 F300\nG0 X5 Y5\n"
+
+
+def test_removed_tool_toggle_keeps_its_motion_mode(tmp_path, config_path):
+    # default tool commands are "G0 Z1;" / "G0 Z0;": dropping the pair must not leave the next move cutting
+    out = optimize(tmp_path, config_path, "G0 Z0;\nG1 X1 Y1 F300\nG0 Z1;\nG0 Z0;\nX2 Y2\n")
+    assert out == "G0 Z0;\nG1 X1 Y1 F300\nG0 X2 Y2\n"
+
+
+def test_unchanged_words_are_left_out(tmp_path, config_path):
+    out = optimize(tmp_path, config_path, "G1 X1.00004 Y2 F300\nG1 X1 Y2 F300\nG1 X3.5000 Y2 F300\n")
+    assert out == "G1 X1 Y2 F300\nX3.5\n"
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import cv2
+import numpy as np
+
+from modules.job_server import JobServer
+
+
+async def request(port, method, path, body=b""):
+    """
+    One HTTP/1.1 request to the local server; returns (status, headers, decoded JSON or raw body).
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+    payload = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    if headers.get("content-type") == "application/json":
+        payload = json.loads(payload)
+    return int(lines[0].split()[1]), headers, payload
+
+
+def serve(tmp_path, config_path, scenario, **options):
+    """
+    Run scenario(server, port) against a JobServer on a free localhost port.
+    """
+    async def main():
+        server = JobServer(str(tmp_path / "jobs"), config_path, **options)
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            return await scenario(server, port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_submit_wait_and_result(tmp_path, config_path, image_path):
+    body = open(image_path, "rb").read()
+
+    async def scenario(server, port):
+        status, headers, job = await request(port, "POST", "/jobs?name=drawing.png&feedrate=600", body)
+        assert status == 202
+        assert headers["location"] == f"/jobs/{job['id']}"
+        assert job["overrides"] == {"feedrate": 600}
+        # long poll: returns as soon as the job finishes, well before the wait runs out
+        status, _, job = await request(port, "GET", f"/jobs/{job['id']}?wait=60")
+        assert status == 200
+        assert job["status"] == "done", job
+        status, headers, gcode = await request(port, "GET", f"/jobs/{job['id']}/result")
+        assert status == 200
+        assert headers["content-type"] == "text/x-gcode"
+        assert b"F600" in gcode
+
+    serve(tmp_path, config_path, scenario, workers=1)
+
+
+def test_full_queue_answers_503_with_retry_after(tmp_path, config_path):
+    # a noisy image that keeps the only worker busy while the queue fills
+    noise = (np.random.default_rng(0).random((1500, 1500)) > 0.5).astype(np.uint8) * 255
+    body = cv2.imencode(".png", noise)[1].tobytes()
+
+    async def scenario(server, port):
+        first = await request(port, "POST", "/jobs?name=a.png", body)
+        second = await request(port, "POST", "/jobs?name=b.png", body)
+        third = await request(port, "POST", "/jobs?name=c.png", body)
+        assert first[0] == 202 and second[0] == 202
+        assert third[0] == 503
+        assert third[1]["retry-after"] == str(server.retry_after)
+        # a short wait on an unfinished job comes back unfinished
+        status, _, job = await request(port, "GET", f"/jobs/{second[2]['id']}?wait=0.01")
+        assert status == 200 and job["status"] == "queued"
+        await request(port, "DELETE", f"/jobs/{second[2]['id']}")
+
+    serve(tmp_path, config_path, scenario, workers=1, max_queue=1)
+
+
+def test_rejects_overrides_touching_the_filesystem(tmp_path, config_path, image_path):
+    victim = tmp_path / "victim"
+    victim.mkdir()
+    (victim / "notes.txt").write_text("keep me")
+    body = open(image_path, "rb").read()
+
+    async def scenario(server, port):
+        for query in (f"cache_dir={victim}&cache_max_mb=0", "cache_enabled=true", "output_filename=x",
+                      "tile_workers=64"):
+            status, _, payload = await request(port, "POST", f"/jobs?name=d.png&{query}", body)
+            assert status == 400, query
+            assert "not allowed" in payload["error"]
+        status, _, payload = await request(port, "POST", "/jobs?name=d.png&no_such_setting=1", body)
+        assert status == 400 and "unknown" in payload["error"]
+        status, _, _ = await request(port, "GET", "/jobs/nope?wait=soon")
+        assert status == 404
+        assert server.jobs == {}
+
+    serve(tmp_path, config_path, scenario, workers=1)
+    assert (victim / "notes.txt").read_text() == "keep me"
+
+
+def test_bad_wait_is_a_client_error(tmp_path, config_path, image_path):
+    body = open(image_path, "rb").read()
+
+    async def scenario(server, port):
+        _, _, job = await request(port, "POST", "/jobs?name=e.png", body)
+        status, _, payload = await request(port, "GET", f"/jobs/{job['id']}?wait=soon")
+        assert status == 400, payload
+        await request(port, "GET", f"/jobs/{job['id']}?wait=60")
+
+    serve(tmp_path, config_path, scenario, workers=1)
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from modules.gcode_sender import GcodeSender, SimulatedGrbl, open_transport, termios
+from send import main
+
+needs_pty = pytest.mark.skipif(termios is None, reason="the simulated controller needs a POSIX pty")
+
+# a short job: header, a few hundred tiny moves with comments, footer
+PROGRAM = (["G21 ; mm", "G90", "G0 Z5"]
+           + [f"G1 X{i * 0.1:.3f} Y{(i % 7) * 0.25:.3f} F1200 (seg {i})" for i in range(400)]
+           + ["G0 Z5", "M2"])
+
+
+@needs_pty
+def test_streams_through_simulator_without_overflows():
+    with SimulatedGrbl(rx_size=64, block_time=0.0002) as simulator:
+        transport = open_transport(simulator.port)
+        try:
+            sender = GcodeSender(transport, rx_buffer=64)
+            assert sender.wait_ready()
+            stats = sender.stream(PROGRAM)
+        finally:
+            transport.close()
+    assert sender.errors == []
+    assert not stats["aborted"]
+    assert stats["lines_acked"] == stats["lines_sent"] == len(PROGRAM)
+    assert simulator.stats["overflows"] == 0
+    assert simulator.stats["errors"] == 0
+    assert simulator.stats["max_rx_used"] <= 64
+    assert simulator.lines_received == len(PROGRAM)
+
+
+@needs_pty
+def test_send_reports_controller_errors(tmp_path, capsys):
+    path = tmp_path / "job.gcode"
+    path.write_text("\n".join(PROGRAM[:20] + ["G1 X1 Y"] + PROGRAM[20:40]) + "\n")
+    assert main([str(path), "--simulate", "--block-time", "0.0002"]) == 1
+    err = capsys.readouterr().err
+    assert "line 21: G1X1Y -> error:1" in err
+    assert "'overflows': 0" in err
+
+
+def test_imports_without_termios():
+    # as on Windows: only the pyserial and TCP transports are left
+    script = ("import sys; sys.modules['termios'] = sys.modules['tty'] = None\n"
+              "import modules.gcode_sender as g; assert g.termios is None and g.tty is None")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
@@ -0,0 +1,43 @@
+import yaml
+
+from modules.image_converter import ImageConverter
+from modules.setting_manager import SettingsManager
+
+
+def test_tiled_mode_on_and_off_survive_yaml(tmp_path, image_path):
+    # unquoted on/off are YAML booleans, both in config.yaml and in --set KEY=VALUE
+    path = tmp_path / "config.yaml"
+    path.write_text("cache_enabled: false\ntiled_mode: on\n")
+    settings = SettingsManager(str(path))
+    assert settings.get("tiled_mode") == "on"
+    assert ImageConverter(settings).use_tiles(image_path)
+    assert yaml.safe_load(path.read_text())["tiled_mode"] == "on"
+
+    settings.update({"tiled_mode": yaml.safe_load("off")})
+    assert settings.get("tiled_mode") == "off"
+    assert not ImageConverter(settings).use_tiles(image_path)
+
+
+def test_old_config_placeholders_are_migrated(tmp_path):
+    # written before the speck filter and colour mode: every default was stored, unused ones included
+    path = tmp_path / "config.yaml"
+    path.write_text("max_artifact_size: 0.02\nbackground_tolerance: 1.0\ncolor_tolerance: 1\nthreshold: 100\n")
+    settings = SettingsManager(str(path))
+    assert settings.get("max_artifact_size") == 0.0001
+    assert settings.get("background_tolerance") == 16
+    assert settings.get("color_tolerance") == 32
+    assert settings.get("threshold") == 100
+    saved = yaml.safe_load(path.read_text())
+    assert saved["settings_version"] == 2 and saved["max_artifact_size"] == 0.0001
+
+
+def test_chosen_values_survive_migration(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("max_artifact_size: 0.001\nbackground_tolerance: 8\n")
+    settings = SettingsManager(str(path), persist=False)
+    assert settings.get("max_artifact_size") == 0.001
+    assert settings.get("background_tolerance") == 8
+
+    # once a file is current, even a value equal to an old placeholder is the user's choice
+    path.write_text("settings_version: 2\nmax_artifact_size: 0.02\n")
+    assert SettingsManager(str(path), persist=False).get("max_artifact_size") == 0.02
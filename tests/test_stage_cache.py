@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+from modules.stage_cache import StageCache, stage_params
+
+
+def test_eviction_leaves_foreign_files_alone(tmp_path):
+    victim = tmp_path / "victim"
+    (victim / "ab").mkdir(parents=True)
+    # unrelated files, including ones in a two-letter folder and one named like a key in the wrong folder
+    foreign = [victim / "notes.txt", victim / "other.dat", victim / "ab" / "photo.npy",
+               victim / "ab" / ("cd" * 32 + ".npy")]
+    for path in foreign:
+        path.write_bytes(b"x" * 4096)
+
+    cache = StageCache(str(victim), max_bytes=0)
+    cache.put_array("ab" * 32, np.zeros(1000, dtype=np.uint8))
+
+    assert all(path.read_bytes() == b"x" * 4096 for path in foreign)
+    assert not os.path.exists(cache._path("ab" * 32, "npy"))  # its own entry went over max_bytes
+    assert cache.size() == 0
+
+
+def test_toolpath_key_follows_dpi_in_pixel_units():
+    settings = {"svg_mode": "contour", "simplify_units": "px", "dpi": 96}
+    assert stage_params("toolpath", settings) != stage_params("toolpath", {**settings, "dpi": 300})
+
+
+def test_report_lookups_are_not_counted(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+    assert cache.get_report("ef" * 32) is None
+    cache.put_report("ef" * 32, {"gcode_bytes": 1})
+    assert cache.get_report("ef" * 32) == {"gcode_bytes": 1}
+    assert cache.stats()["cache_hits"] == 0 and cache.stats()["cache_misses"] == 0
+
+
+def test_tiled_and_full_frame_toolpaths_are_cached_apart(tmp_path, config_path, image_path):
+    from modules.pipeline import ConversionPipeline
+    from modules.setting_manager import SettingsManager
+
+    settings = SettingsManager(config_path, persist=False)
+    settings.update({"svg_mode": "canny", "edge_dedup": True, "estimate_time": False, "tiled_mode": "on"})
+    cache = StageCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+    ConversionPipeline(settings, cache).run(image_path, str(tmp_path / "out"), "tiled")
+    assert cache.hits == {}
+
+    # same image and settings traced full frame: the tiled toolpath (no edge dedup) must not be reused
+    settings.update({"tiled_mode": "off"})
+    pipeline = ConversionPipeline(settings, cache)
+    pipeline.run(image_path, str(tmp_path / "out"), "full")
+    assert "toolpath" not in cache.hits
+    assert "tiled" not in pipeline.report
@@ -0,0 +1,23 @@
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# reuse the benchmark's targets, budgets and `python -X importtime` parsing
+_spec = importlib.util.spec_from_file_location("bench_startup", os.path.join(ROOT, "benchmarks", "bench_startup.py"))
+bench_startup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_startup)
+
+
+@pytest.mark.parametrize("target", list(bench_startup.TARGETS))
+def test_import_time_within_budget(target):
+    if target == "ui.main_activity":
+        pytest.importorskip("PyQt5")
+    budget_ms, forbidden = bench_startup.TARGETS[target]
+    # best of three fresh interpreters, as the benchmark counts it
+    runs = [bench_startup.import_time(target) for _ in range(3)]
+    ms = min(t for t, _ in runs)
+    assert not set(forbidden) & runs[0][1], f"{target} imports {sorted(set(forbidden) & runs[0][1])} at start-up"
+    assert ms <= budget_ms, f"{target} took {ms:.1f} ms, budget {budget_ms} ms"
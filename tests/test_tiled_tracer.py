@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+import pytest
+
+from modules.raster_svg_converter import RasterSVGConverter
+from modules.setting_manager import SettingsManager
+from modules.tiled_tracer import TiledTracer
+
+
+def shapes(toolpath):
+    """
+    The paths as sorted point sets, independent of start point and order.
+    """
+    return sorted(tuple(sorted(map(tuple, np.asarray(p).reshape(-1, 2).tolist()))) for p in toolpath.paths)
+
+
+@pytest.mark.parametrize("mode", ["contour", "threshold", "canny"])
+def test_tiled_matches_full_frame(tmp_path, config_path, mode):
+    # blotchy noise: specks and holes of every size, straddling the seams
+    noise = (np.random.default_rng(1).random((600, 600)) * 255).astype(np.uint8)
+    noise = cv2.normalize(cv2.GaussianBlur(noise, (0, 0), 2), None, 0, 255, cv2.NORM_MINMAX)
+    image = str(tmp_path / "noise.png")
+    cv2.imwrite(image, noise)
+    settings = SettingsManager(config_path, persist=False)
+    settings.update({"svg_mode": mode, "edge_dedup": False, "centerline": False, "max_artifact_size": 0.0001,
+                     "tile_memory_mb": 2, "tile_workers": 2})
+
+    full = RasterSVGConverter(settings)
+    expected = full.trace(image)
+    tiled = RasterSVGConverter(settings)
+    tracer = TiledTracer(settings, tiled)
+    assert tracer.tile_size() < 300  # several seams cross the image
+    toolpath = tracer.trace(image)
+
+    assert full.artifacts_removed > 0
+    assert tiled.artifacts_removed == full.artifacts_removed
+    assert shapes(toolpath) == shapes(expected)
@@ -0,0 +1,16 @@
+import math
+
+from modules.setting_manager import SettingsManager
+from modules.time_estimator import TimeEstimator
+
+
+def test_cuts_before_any_f_word_run_at_the_configured_feed(config_path):
+    settings = SettingsManager(config_path, persist=False)
+    settings.update({"feedrate": 600})
+    estimator = TimeEstimator(settings)
+    report = estimator.estimate_gcode(b"G21\nG90\nG0 X0 Y0\nG1 X10 Y0\nG1 X10 Y10\nG2 X20 Y10 I5 J0\n")
+    assert all(math.isfinite(v) for v in report.values())
+    assert report["machine_cut_time_s"] > 0
+
+    # the same program with F600 up front takes the same time
+    assert estimator.estimate_gcode(b"G21\nG90\nF600\nG0 X0 Y0\nG1 X10 Y0\nG1 X10 Y10\nG2 X20 Y10 I5 J0\n") == report
@@ -0,0 +1,187 @@
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter
+from PyQt5.QtWidgets import (
+    QAbstractScrollArea, QHBoxLayout, QLabel, QLineEdit, QPushButton,
+    QSpinBox, QVBoxLayout, QWidget
+)
+
+from modules.line_index import LineIndex
+
+
+class IndexThread(QThread):
+    progress = pyqtSignal(float)
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def run(self):
+        self.index.build(self.progress.emit)
+
+
+class GcodeView(QAbstractScrollArea):
+    """
+    Paints only the visible lines of a LineIndex, so scrolling cost does not
+    depend on file size. The scroll range grows while the index is built.
+    """
+    def __init__(self):
+        super().__init__()
+        self.index = None
+        self.current_line = -1
+        self.setFont(QFont("Courier New", 10))
+        self.verticalScrollBar().setSingleStep(3)
+        self.setFocusPolicy(Qt.StrongFocus)
+
+    def set_index(self, index):
+        self.index = index
+        self.current_line = -1
+        self.verticalScrollBar().setValue(0)
+        self.update_range()
+
+    def line_height(self) -> int:
+        return QFontMetrics(self.font()).lineSpacing()
+
+    def visible_lines(self) -> int:
+        return max(1, self.viewport().height() // self.line_height())
+
+    def update_range(self):
+        count = self.index.line_count if self.index else 0
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, count - self.visible_lines()))
+        bar.setPageStep(self.visible_lines())
+        self.viewport().update()
+
+    def go_to_line(self, line: int):
+        """
+        Highlight a 0-based line and scroll it to the middle of the view.
+        """
+        if not self.index or not self.index.line_count:
+            return
+        self.current_line = max(0, min(line, self.index.line_count - 1))
+        self.verticalScrollBar().setValue(self.current_line - self.visible_lines() // 2)
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_range()
+
+    def keyPressEvent(self, event):
+        bar = self.verticalScrollBar()
+        steps = {
+            Qt.Key_Up: -bar.singleStep(), Qt.Key_Down: bar.singleStep(),
+            Qt.Key_PageUp: -bar.pageStep(), Qt.Key_PageDown: bar.pageStep(),
+        }
+        if event.key() in steps:
+            bar.setValue(bar.value() + steps[event.key()])
+        elif event.key() == Qt.Key_Home:
+            bar.setValue(0)
+        elif event.key() == Qt.Key_End:
+            bar.setValue(bar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor("#FFFFFF"))
+        if not self.index:
+            return
+        first = self.verticalScrollBar().value()
+        lines = self.index.lines(first, self.visible_lines() + 1)
+
+        metrics = QFontMetrics(self.font())
+        height, ascent = metrics.lineSpacing(), metrics.ascent()
+        gutter = metrics.horizontalAdvance("9" * len(str(max(self.index.line_count, 1)))) + 12
+        painter.fillRect(0, 0, gutter - 4, self.viewport().height(), QColor("#F3E5F5"))
+        for i, text in enumerate(lines):
+            y = i * height
+            if first + i == self.current_line:
+                painter.fillRect(gutter - 4, y, self.viewport().width(), height, QColor("#E1BEE7"))
+            painter.setPen(QColor("#9575CD"))
+            painter.drawText(0, y, gutter - 8, height, Qt.AlignRight | Qt.AlignVCenter, str(first + i + 1))
+            painter.setPen(QColor("#212121"))
+            painter.drawText(gutter, y + ascent, text)
+
+
+class GcodeViewer(QWidget):
+    """
+    G-code tab: a memory-mapped GcodeView with jump-to-line and search.
+    Memory stays flat regardless of file size.
+    """
+    def __init__(self):
+        super().__init__()
+        self.index = None
+        self.thread = None
+
+        self.view = GcodeView()
+
+        self.line_spin = QSpinBox()
+        self.line_spin.setRange(1, 1)
+        self.line_spin.setPrefix("Line ")
+        go_button = QPushButton("Go")
+        go_button.clicked.connect(lambda: self.view.go_to_line(self.line_spin.value() - 1))
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search")
+        self.search_edit.returnPressed.connect(lambda: self.find(True))
+        prev_button = QPushButton("▲")
+        prev_button.clicked.connect(lambda: self.find(False))
+        next_button = QPushButton("▼")
+        next_button.clicked.connect(lambda: self.find(True))
+
+        self.status_label = QLabel()
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(0, 0, 0, 0)
+        toolbar.addWidget(self.line_spin)
+        toolbar.addWidget(go_button)
+        toolbar.addWidget(self.search_edit, 1)
+        toolbar.addWidget(prev_button)
+        toolbar.addWidget(next_button)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.view, 1)
+        layout.addWidget(self.status_label)
+
+    def open(self, path: str):
+        self.clear()
+        self.index = LineIndex(path)
+        self.view.set_index(self.index)
+        self.thread = IndexThread(self.index)
+        self.thread.progress.connect(self.on_progress)
+        self.thread.finished.connect(lambda: self.on_progress(1.0))
+        self.thread.start()
+
+    def clear(self):
+        """
+        Stop indexing and unmap the file. Must be called before the file is
+        rewritten, since truncating a mapped file faults on the next read.
+        """
+        if self.thread:
+            self.index.cancel()
+            self.thread.wait()
+            self.thread = None
+        if self.index:
+            self.view.set_index(None)
+            self.index.close()
+            self.index = None
+        self.status_label.clear()
+
+    def on_progress(self, fraction: float):
+        if not self.index:
+            return
+        self.view.update_range()
+        self.line_spin.setRange(1, max(1, self.index.line_count))
+        state = "" if self.index.complete else f" (indexing {fraction:.0%})"
+        self.status_label.setText(f"{self.index.line_count:,} lines, {self.index.size / 1e6:.1f} MB{state}")
+
+    def find(self, forward: bool):
+        if not self.index:
+            return
+        text = self.search_edit.text()
+        line = self.index.search(text, self.view.current_line, forward)
+        if line is None:
+            self.status_label.setText(f"'{text}' not found")
+        else:
+            self.view.go_to_line(line)
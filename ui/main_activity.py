@@ -1,49 +1,215 @@
+import importlib
 import os
 import sys
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton,
     QVBoxLayout, QHBoxLayout, QFileDialog, QMessageBox,
     QGroupBox, QFormLayout, QSpinBox, QDoubleSpinBox,
-    QLineEdit, QComboBox, QPlainTextEdit, QProgressBar,
-    QToolButton, QStyle, QStackedLayout, QButtonGroup, QScrollArea
+    QLineEdit, QComboBox, QProgressBar,
+    QToolButton, QStyle, QStackedLayout, QButtonGroup,
+    QCheckBox, QScrollArea, QGridLayout
 )
-from PyQt5.QtGui import QPixmap, QFont
-from PyQt5.QtSvg import QSvgWidget
+from PyQt5.QtGui import QPixmap, QFont, QImage, QIcon
 
 from modules.image_loader import ImageLoader
-from modules.image_converter import ImageConverter
-from modules.svg_path_converter import SVGPathConverter
 from modules.gcode_generator import GcodeGenerator
+from modules.instrumentation import Instrumentation, ProgressTracker, PIPELINE_STAGES, format_duration
+from modules.stage_cache import StageCache
 from modules.setting_manager import SettingsManager
+from modules.path_simplifier import PathSimplifier
+from modules.gcode_parser import parse_gcode
+from ui.gcode_viewer import GcodeViewer
+from ui.toolpath_canvas import ToolpathView
+
+# quiet period after the last settings change before the live preview recomputes
+PREVIEW_DEBOUNCE_MS = 150
+
+# OpenCV and the modules built on it are imported where first used, so the window
+# shows without them; warm_up() loads them in the background meanwhile
+HEAVY_MODULES = ("cv2", "PIL.Image", "modules.pipeline", "modules.live_preview", "modules.toolpath_geometry",
+                 "modules.parameter_sweep")
+
+# thumbnails per row in the SWEEP tab
+SWEEP_COLUMNS = 3
+
+
+REPORT_LABELS = {
+    "travel_before_mm": "Travel before ordering (mm)",
+    "travel_after_mm": "Travel after ordering (mm)",
+    "segments_before": "Segments before simplification",
+    "segments_after": "Segments after simplification",
+    "gcode_bytes_unsimplified": "G-code bytes unsimplified (est.)",
+    "svg_bytes": "SVG bytes",
+    "gcode_bytes": "G-code bytes",
+    "gcode_lines": "G-code lines",
+    "gcode_bytes_raw": "G-code bytes before optimizing",
+    "gcode_lines_raw": "G-code lines before optimizing",
+    "gcode_bytes_naive": "G-code bytes one line per pixel (est.)",
+    "gcode_lines_naive": "G-code lines one line per pixel",
+    "raster_rows": "Raster rows engraved",
+    "layers": "Colour layers",
+    "artifacts_removed": "Artifacts removed",
+    "cut_length_outlines_mm": "Cut length tracing outlines (mm)",
+    "cut_length_mm": "Cut length each line once (mm)",
+    "machine_time_s": "Machine time",
+    "machine_cut_time_s": "Cutting time",
+    "machine_rapid_time_s": "Rapid time",
+    "machine_layer_times_s": "Time per layer",
+}
+DURATION_KEYS = ("machine_time_s", "machine_cut_time_s", "machine_rapid_time_s")
+
+
+# drawing geometry is built after the pipeline, on the same worker thread
+GUI_STAGES = PIPELINE_STAGES + (("geometry", 10),)
+
+
+def format_report(report: dict) -> str:
+    return "\n".join(f"{REPORT_LABELS.get(k, k)}: {format_value(k, v)}" for k, v in report.items())
+
+
+def format_value(key: str, value) -> str:
+    if key in DURATION_KEYS:
+        return format_duration(value)
+    if key == "machine_layer_times_s":
+        return ", ".join(f"{layer}: {format_duration(seconds)}" for layer, seconds in value.items())
+    return str(value)
+
+
+def format_timings(timings: dict) -> str:
+    return "  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+
+
+def sweep_range(value: int, step: int, low: int, high: int) -> str:
+    """
+    A start:stop:step sweep range one step either side of a setting, kept within low..high.
+    """
+    return f"{max(low, value - step)}:{min(high, value + step)}:{step}"
+
+
+def qimage_view(pixels):
+    """
+    A QImage over a BGR (or greyscale) uint8 array without copying. The
+    array must outlive the image; QPixmap.fromImage copies, so converting
+    straight away is safe.
+    """
+    h, w = pixels.shape[:2]
+    fmt = QImage.Format_Grayscale8 if pixels.ndim == 2 else QImage.Format_BGR888
+    return QImage(pixels.data, w, h, pixels.strides[0], fmt)
+
+
+def warm_up():
+    """
+    Import HEAVY_MODULES; meant for a background thread started once the
+    window is up, so the first conversion or preview does not pay for them.
+    """
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            return  # the first real use reports it
 
 
 class ConversionThread(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
+    progress = pyqtSignal(int, str)
+    stage_timed = pyqtSignal(str, float)
 
-    def __init__(self, image_path, output_name, settings_manager):
+    def __init__(self, image, output_name, settings_manager, cache=None):
         super().__init__()
-        self.image_path = image_path
+        self.image = image
         self.output_name = output_name
         self.settings_manager = settings_manager
+        self.cache = cache
+        self.report = {}
+        self.timings = {}
+        self.geometry = None
+        self.tracker = ProgressTracker(GUI_STAGES)
+        self.percent = -1
+
+    def on_event(self, event: dict):
+        if event["type"] == "end":
+            self.stage_timed.emit(event["stage"], event["seconds"])
+        percent = int(self.tracker.update(event) * 100)
+        # progress events can come thousands of times a stage; only whole percents reach the GUI
+        if percent != self.percent or event["type"] == "start":
+            self.percent = percent
+            self.progress.emit(percent, event.get("stage", ""))
 
     def run(self):
+        from modules.pipeline import ConversionPipeline
+        from modules.toolpath_geometry import ToolpathGeometry
         try:
-            image_converter = ImageConverter(self.settings_manager)
-            svg_converter = SVGPathConverter()
-            gcode_generator = GcodeGenerator(self.settings_manager)
+            instrumentation = Instrumentation(listener=self.on_event)
+            pipeline = ConversionPipeline(self.settings_manager, self.cache, instrumentation)
+            gcode_path = pipeline.run(self.image.path, "output", self.output_name, self.image)
+            self.report.update(pipeline.report)
+
+            # contours in memory when traced now, otherwise read back from the cached G-code
+            with instrumentation.stage("geometry"):
+                if pipeline.toolpath is not None:
+                    self.geometry = ToolpathGeometry.from_toolpath(pipeline.toolpath)
+                else:
+                    self.geometry = ToolpathGeometry.from_program(parse_gcode(gcode_path))
+                self.geometry.prepare()
+            self.timings = dict(instrumentation.timings)
+
+            self.progress.emit(100, "")
+            self.finished.emit(gcode_path)
+        except Exception as exc:
+            self.error.emit(str(exc))
 
-            svg_path = os.path.join("output", f"{self.output_name}.svg")
-            gcode_path = os.path.join("output", f"{self.output_name}.gcode")
 
-            os.makedirs("output", exist_ok=True)
+class PreviewThread(QThread):
+    rendered = pyqtSignal(int, object, dict)
+    failed = pyqtSignal(int, str)
 
-            image_converter.convert_to_svg(self.image_path, svg_path)
-            svg_path = svg_converter.process_svg(svg_path)
-            gcode_generator.convert_to_gcode(svg_path, gcode_path)
+    def __init__(self, session, converter, simplifier, full, size, generation):
+        super().__init__()
+        self.session = session
+        self.converter = converter
+        self.simplifier = simplifier
+        self.full = full
+        self.size = size
+        self.generation = generation
+        self.cancelled = False
 
-            self.finished.emit(gcode_path)
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        from modules.live_preview import PreviewCancelled
+        try:
+            rgb, info = self.session.render(
+                self.converter, self.simplifier, self.full, self.size, lambda: self.cancelled
+            )
+            self.rendered.emit(self.generation, rgb, info)
+        except PreviewCancelled:
+            pass
+        except Exception as exc:
+            self.failed.emit(self.generation, str(exc))
+
+
+class SweepThread(QThread):
+    result = pyqtSignal(object, int, int)
+    finished = pyqtSignal(list)
+    error = pyqtSignal(str)
+
+    def __init__(self, sweep, image, ranges):
+        super().__init__()
+        self.sweep = sweep
+        self.image = image
+        self.ranges = ranges
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            results = self.sweep.run(self.image, self.ranges, self.result.emit, lambda: self.cancelled)
+            self.finished.emit(results)
         except Exception as exc:
             self.error.emit(str(exc))
 
@@ -55,8 +221,21 @@ class MainWindow(QMainWindow):
         self.setFont(QFont("Arial", 10))
         self.settings_manager = SettingsManager()
         self.current_image_path = None
+        self.current_image = None
         self.last_svg_path = None
         self.last_gcode_path = None
+        self.cache = StageCache.from_settings(self.settings_manager)
+        self.stage_times = {}
+        self.preview_session = None
+        self.preview_generation = 0
+        self.preview_threads = []
+        self.preview_key = None
+        self.sweep_thread = None
+
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.start_preview)
 
         self.build_ui()
 
@@ -81,9 +260,16 @@ class MainWindow(QMainWindow):
         load_button.clicked.connect(self.browse_image)
 
         self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setRange(0, 100)
         self.progress_bar.hide()
 
+        self.timing_label = QLabel()
+        self.timing_label.setWordWrap(True)
+        self.timing_label.setStyleSheet("color: #666;")
+
+        self.cache_label = QLabel()
+        self.update_cache_label()
+
         self.convert_button = QPushButton("Convert to G-code")
         self.convert_button.setEnabled(False)
         self.convert_button.clicked.connect(self.convert_image)
@@ -91,6 +277,8 @@ class MainWindow(QMainWindow):
         left_panel_layout.addWidget(self.image_label)
         left_panel_layout.addWidget(load_button)
         left_panel_layout.addWidget(self.progress_bar)
+        left_panel_layout.addWidget(self.timing_label)
+        left_panel_layout.addWidget(self.cache_label)
         left_panel_layout.addWidget(self.convert_button)
 
         # ── right panel ──
@@ -109,7 +297,7 @@ class MainWindow(QMainWindow):
 
         # SVG mode
         self.svg_mode_combo = QComboBox()
-        self.svg_mode_combo.addItems(["contour", "threshold", "canny"])
+        self.svg_mode_combo.addItems(["contour", "threshold", "canny", "color", "fill", "raster"])
         self.svg_mode_combo.setCurrentText(self.settings_manager.get("svg_mode"))
         self.svg_mode_combo.currentTextChanged.connect(self.save_settings)
 
@@ -117,7 +305,8 @@ class MainWindow(QMainWindow):
         svg_mode_row_layout = QHBoxLayout(svg_mode_row)
         svg_mode_row_layout.setContentsMargins(0, 0, 0, 0)
         svg_mode_row_layout.addWidget(self.svg_mode_combo)
-        svg_mode_row_layout.addWidget(info_icon("Select contour tracing, binary threshold, or Canny edge detection mode."))
+        svg_mode_row_layout.addWidget(info_icon("Select contour tracing, binary threshold, Canny edge detection, colour layers, hatch fill, "
+                                               "or greyscale raster engraving."))
         form_layout.addRow("SVG Mode:", svg_mode_row)
 
         # Threshold
@@ -127,6 +316,11 @@ class MainWindow(QMainWindow):
         self.threshold_spin.valueChanged.connect(self.save_settings)
         form_layout.addRow("Threshold:", self.threshold_spin)
 
+        self.centerline_check = QCheckBox("Trace the centreline of strokes (contour/threshold)")
+        self.centerline_check.setChecked(self.settings_manager.get("centerline"))
+        self.centerline_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Centerline:", self.centerline_check)
+
         # Blur kernel
         self.blur_spin = QSpinBox()
         self.blur_spin.setRange(1, 21)
@@ -148,6 +342,95 @@ class MainWindow(QMainWindow):
         self.canny_high_spin.valueChanged.connect(self.save_settings)
         form_layout.addRow("Canny High:", self.canny_high_spin)
 
+        self.edge_dedup_check = QCheckBox("Cut each edge once")
+        self.edge_dedup_check.setChecked(self.settings_manager.get("edge_dedup"))
+        self.edge_dedup_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Canny Dedup:", self.edge_dedup_check)
+
+        # Colour layers
+        self.color_tol_spin = QSpinBox()
+        self.color_tol_spin.setRange(0, 442)
+        self.color_tol_spin.setValue(self.settings_manager.get("color_tolerance"))
+        self.color_tol_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Color Tolerance:", self.color_tol_spin)
+
+        self.max_colors_spin = QSpinBox()
+        self.max_colors_spin.setRange(2, 64)
+        self.max_colors_spin.setValue(self.settings_manager.get("max_colors"))
+        self.max_colors_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Max Colors:", self.max_colors_spin)
+
+        self.group_color_check = QCheckBox("One SVG group per layer")
+        self.group_color_check.setChecked(self.settings_manager.get("group_by_color"))
+        self.group_color_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Group by Color:", self.group_color_check)
+
+        # Hatch fill
+        self.hatch_spacing_spin = QDoubleSpinBox()
+        self.hatch_spacing_spin.setRange(0.1, 100.0)
+        self.hatch_spacing_spin.setSingleStep(0.5)
+        self.hatch_spacing_spin.setValue(self.settings_manager.get("hatch_spacing"))
+        self.hatch_spacing_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Hatch Spacing (px):", self.hatch_spacing_spin)
+
+        self.hatch_angle_spin = QDoubleSpinBox()
+        self.hatch_angle_spin.setRange(0.0, 179.9)
+        self.hatch_angle_spin.setSingleStep(15.0)
+        self.hatch_angle_spin.setValue(self.settings_manager.get("hatch_angle"))
+        self.hatch_angle_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Hatch Angle (deg):", self.hatch_angle_spin)
+
+        self.hatch_gap_spin = QSpinBox()
+        self.hatch_gap_spin.setRange(0, 100)
+        self.hatch_gap_spin.setValue(int(self.settings_manager.get("hatch_merge_gap")))
+        self.hatch_gap_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Hatch Merge Gap (px):", self.hatch_gap_spin)
+
+        # Raster engraving
+        self.raster_min_spin = QSpinBox()
+        self.raster_min_spin.setRange(0, 100000)
+        self.raster_min_spin.setValue(int(self.settings_manager.get("raster_min_power")))
+        self.raster_min_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Raster Min Power (S):", self.raster_min_spin)
+
+        self.raster_max_spin = QSpinBox()
+        self.raster_max_spin.setRange(1, 100000)
+        self.raster_max_spin.setValue(int(self.settings_manager.get("raster_max_power")))
+        self.raster_max_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Raster Max Power (S):", self.raster_max_spin)
+
+        self.raster_levels_spin = QSpinBox()
+        self.raster_levels_spin.setRange(2, 256)
+        self.raster_levels_spin.setValue(int(self.settings_manager.get("raster_levels")))
+        self.raster_levels_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Raster Power Levels:", self.raster_levels_spin)
+
+        self.raster_cutoff_spin = QSpinBox()
+        self.raster_cutoff_spin.setRange(1, 255)
+        self.raster_cutoff_spin.setValue(int(self.settings_manager.get("raster_white_cutoff")))
+        self.raster_cutoff_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Raster White Cutoff:", self.raster_cutoff_spin)
+
+        # Background and specks
+        self.remove_bg_check = QCheckBox("Remove background")
+        self.remove_bg_check.setChecked(self.settings_manager.get("remove_background"))
+        self.remove_bg_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Background:", self.remove_bg_check)
+
+        self.bg_tol_spin = QSpinBox()
+        self.bg_tol_spin.setRange(0, 255)
+        self.bg_tol_spin.setValue(int(self.settings_manager.get("background_tolerance")))
+        self.bg_tol_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Background Tolerance:", self.bg_tol_spin)
+
+        self.artifact_spin = QDoubleSpinBox()
+        self.artifact_spin.setDecimals(5)
+        self.artifact_spin.setRange(0.0, 0.1)
+        self.artifact_spin.setSingleStep(0.0001)
+        self.artifact_spin.setValue(self.settings_manager.get("max_artifact_size"))
+        self.artifact_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Max Artifact (of area):", self.artifact_spin)
+
         # Potrace
         self.turdsize_spin = QSpinBox()
         self.turdsize_spin.setRange(0, 100)
@@ -171,6 +454,102 @@ class MainWindow(QMainWindow):
         self.tool_off_edit.textChanged.connect(self.save_settings)
         form_layout.addRow("Tool OFF Command:", self.tool_off_edit)
 
+        self.svg_compact_check = QCheckBox("Compact path syntax")
+        self.svg_compact_check.setChecked(self.settings_manager.get("svg_compact"))
+        self.svg_compact_check.toggled.connect(self.save_settings)
+        form_layout.addRow("SVG Output:", self.svg_compact_check)
+
+        # G-code backend
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(list(GcodeGenerator.BACKENDS))
+        self.backend_combo.setCurrentText(self.settings_manager.get("gcode_backend"))
+        self.backend_combo.currentTextChanged.connect(self.save_settings)
+
+        backend_row = QWidget()
+        backend_row_layout = QHBoxLayout(backend_row)
+        backend_row_layout.setContentsMargins(0, 0, 0, 0)
+        backend_row_layout.addWidget(self.backend_combo)
+        backend_row_layout.addWidget(info_icon("native writes G-code directly from the traced contours; svg2gcode uses the external CLI."))
+        form_layout.addRow("G-code Backend:", backend_row)
+
+        self.feedrate_spin = QSpinBox()
+        self.feedrate_spin.setRange(1, 100000)
+        self.feedrate_spin.setValue(self.settings_manager.get("feedrate"))
+        self.feedrate_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("Feedrate (mm/min):", self.feedrate_spin)
+
+        self.gcode_optimize_check = QCheckBox("Optimize G-code")
+        self.gcode_optimize_check.setChecked(self.settings_manager.get("gcode_optimize"))
+        self.gcode_optimize_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Post-process:", self.gcode_optimize_check)
+
+        self.gcode_precision_spin = QSpinBox()
+        self.gcode_precision_spin.setRange(0, 6)
+        self.gcode_precision_spin.setValue(int(self.settings_manager.get("gcode_precision")))
+        self.gcode_precision_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("G-code Decimals:", self.gcode_precision_spin)
+
+        # Machine time estimate
+        self.estimate_time_check = QCheckBox("Estimate machine time")
+        self.estimate_time_check.setChecked(self.settings_manager.get("estimate_time"))
+        self.estimate_time_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Estimate:", self.estimate_time_check)
+
+        self.machine_profile_combo = QComboBox()
+        self.machine_profile_combo.addItems(list(self.settings_manager.get("machine_profiles") or {}))
+        self.machine_profile_combo.setCurrentText(self.settings_manager.get("machine_profile"))
+        self.machine_profile_combo.currentTextChanged.connect(self.save_settings)
+        machine_row = QWidget()
+        machine_row_layout = QHBoxLayout(machine_row)
+        machine_row_layout.setContentsMargins(0, 0, 0, 0)
+        machine_row_layout.addWidget(self.machine_profile_combo)
+        machine_row_layout.addWidget(info_icon("Feed, acceleration and junction deviation limits used for the "
+                                               "estimate; profiles are edited under machine_profiles in config.yaml."))
+        form_layout.addRow("Machine Profile:", machine_row)
+
+        # Simplification
+        self.simplify_combo = QComboBox()
+        self.simplify_combo.addItems(list(PathSimplifier.METHODS))
+        self.simplify_combo.setCurrentText(self.settings_manager.get("simplify_method"))
+        self.simplify_combo.currentTextChanged.connect(self.save_settings)
+        form_layout.addRow("Simplify:", self.simplify_combo)
+
+        self.simplify_tol_spin = QDoubleSpinBox()
+        self.simplify_tol_spin.setRange(0.0, 50.0)
+        self.simplify_tol_spin.setSingleStep(0.1)
+        self.simplify_tol_spin.setValue(self.settings_manager.get("simplify_tolerance"))
+        self.simplify_tol_spin.valueChanged.connect(self.save_settings)
+
+        self.simplify_units_combo = QComboBox()
+        self.simplify_units_combo.addItems(list(PathSimplifier.UNITS))
+        self.simplify_units_combo.setCurrentText(self.settings_manager.get("simplify_units"))
+        self.simplify_units_combo.currentTextChanged.connect(self.save_settings)
+
+        tolerance_row = QWidget()
+        tolerance_row_layout = QHBoxLayout(tolerance_row)
+        tolerance_row_layout.setContentsMargins(0, 0, 0, 0)
+        tolerance_row_layout.addWidget(self.simplify_tol_spin)
+        tolerance_row_layout.addWidget(self.simplify_units_combo)
+        form_layout.addRow("Tolerance:", tolerance_row)
+
+        self.arc_fitting_check = QCheckBox("Fit G2/G3 arcs (native backend)")
+        self.arc_fitting_check.setChecked(self.settings_manager.get("arc_fitting"))
+        self.arc_fitting_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Arcs:", self.arc_fitting_check)
+
+        # Path ordering
+        self.optimize_order_check = QCheckBox("Minimise travel")
+        self.optimize_order_check.setChecked(self.settings_manager.get("optimize_order"))
+        self.optimize_order_check.toggled.connect(self.save_settings)
+        form_layout.addRow("Path Order:", self.optimize_order_check)
+
+        self.two_opt_spin = QDoubleSpinBox()
+        self.two_opt_spin.setRange(0.0, 60.0)
+        self.two_opt_spin.setSingleStep(0.5)
+        self.two_opt_spin.setValue(self.settings_manager.get("two_opt_time"))
+        self.two_opt_spin.valueChanged.connect(self.save_settings)
+        form_layout.addRow("2-opt Budget (s):", self.two_opt_spin)
+
         # Output name
         self.output_name_edit = QLineEdit(self.settings_manager.get("output_filename"))
         self.output_name_edit.textChanged.connect(self.save_settings)
@@ -184,10 +563,12 @@ class MainWindow(QMainWindow):
         selector_layout = QHBoxLayout(selector_bar)
         selector_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.svg_button = QPushButton("SVG")
+        self.live_button = QPushButton("LIVE")
+        self.svg_button = QPushButton("TOOLPATH")
         self.code_button = QPushButton("CODE")
+        self.sweep_tab_button = QPushButton("SWEEP")
 
-        for toggle in (self.svg_button, self.code_button):
+        for toggle in (self.live_button, self.svg_button, self.code_button, self.sweep_tab_button):
             toggle.setCheckable(True)
             toggle.setObjectName("toggleButton")
             toggle.setMinimumWidth(80)
@@ -196,29 +577,78 @@ class MainWindow(QMainWindow):
 
         self.toggle_group = QButtonGroup()
         self.toggle_group.setExclusive(True)
+        self.toggle_group.addButton(self.live_button)
         self.toggle_group.addButton(self.svg_button)
         self.toggle_group.addButton(self.code_button)
+        self.toggle_group.addButton(self.sweep_tab_button)
         self.toggle_group.buttonClicked.connect(self.update_preview)
 
+        selector_layout.addWidget(self.live_button)
         selector_layout.addWidget(self.svg_button)
         selector_layout.addWidget(self.code_button)
+        selector_layout.addWidget(self.sweep_tab_button)
         selector_layout.addStretch()
         right_panel_layout.addWidget(selector_bar)
 
         # ── preview stack ──
-        self.svg_widget = QSvgWidget()
+        self.toolpath_view = ToolpathView()
+
+        self.code_viewer = GcodeViewer()
+
+        self.live_label = QLabel("Load an image to preview the toolpath")
+        self.live_label.setAlignment(Qt.AlignCenter)
+        self.live_label.setMinimumSize(200, 200)
+        self.live_info_label = QLabel()
 
-        svg_scroll_area = QScrollArea()
-        svg_scroll_area.setWidgetResizable(True)
-        svg_scroll_area.setWidget(self.svg_widget)
+        live_page = QWidget()
+        live_layout = QVBoxLayout(live_page)
+        live_layout.setContentsMargins(0, 0, 0, 0)
+        live_layout.addWidget(self.live_label, 1)
+        live_layout.addWidget(self.live_info_label)
 
-        self.code_preview = QPlainTextEdit()
-        self.code_preview.setReadOnly(True)
-        self.code_preview.setFont(QFont("Courier New"))
+        # parameter sweep: ranges, then a grid of thumbnails that apply their settings when clicked
+        sm = self.settings_manager
+        self.sweep_edits = {
+            "threshold": QLineEdit(sweep_range(sm.get("threshold"), 32, 0, 255)),
+            "blur_ksize": QLineEdit(sweep_range(sm.get("blur_ksize"), 2, 1, 21)),
+            "canny_low": QLineEdit(sweep_range(sm.get("canny_low"), 25, 0, 500)),
+            "canny_high": QLineEdit(sweep_range(sm.get("canny_high"), 50, 0, 500)),
+        }
+        for edit in self.sweep_edits.values():
+            edit.setToolTip("Values as a,b,c or start:stop:step (stop included); empty keeps the current setting.")
+        sweep_form = QHBoxLayout()
+        for label, key in (("Threshold:", "threshold"), ("Blur:", "blur_ksize"),
+                           ("Canny Low:", "canny_low"), ("Canny High:", "canny_high")):
+            sweep_form.addWidget(QLabel(label))
+            sweep_form.addWidget(self.sweep_edits[key])
+        self.sweep_button = QPushButton("Run Sweep")
+        self.sweep_button.setEnabled(False)
+        self.sweep_button.clicked.connect(self.run_sweep)
+        sweep_form.addWidget(self.sweep_button)
+
+        self.sweep_info_label = QLabel("Load an image, set ranges and run a sweep; click a result to apply it")
+        self.sweep_info_label.setWordWrap(True)
+        self.sweep_grid = QGridLayout()
+        self.sweep_group = QButtonGroup(self)
+        self.sweep_group.setExclusive(True)
+        sweep_results = QWidget()
+        sweep_results.setLayout(self.sweep_grid)
+        sweep_scroll = QScrollArea()
+        sweep_scroll.setWidgetResizable(True)
+        sweep_scroll.setWidget(sweep_results)
+
+        sweep_page = QWidget()
+        sweep_layout = QVBoxLayout(sweep_page)
+        sweep_layout.setContentsMargins(0, 0, 0, 0)
+        sweep_layout.addLayout(sweep_form)
+        sweep_layout.addWidget(self.sweep_info_label)
+        sweep_layout.addWidget(sweep_scroll, 1)
 
         self.preview_stack = QStackedLayout()
-        self.preview_stack.addWidget(svg_scroll_area)   # index 0
-        self.preview_stack.addWidget(self.code_preview) # index 1
+        self.preview_stack.addWidget(self.toolpath_view)  # index 0
+        self.preview_stack.addWidget(self.code_viewer)    # index 1
+        self.preview_stack.addWidget(live_page)           # index 2
+        self.preview_stack.addWidget(sweep_page)          # index 3
 
         preview_container = QWidget()
         preview_container.setLayout(self.preview_stack)
@@ -290,7 +720,7 @@ class MainWindow(QMainWindow):
               background:qlineargradient(x1:0,y1:0,x2:1,y2:0,stop:0 #CE93D8, stop:1 #BA68C8);
               border-radius:10px;
             }
-            QPlainTextEdit {
+            GcodeView {
               background:#FFFFFF;
               border:1px solid #B39DDB;
               border-radius:4px;
@@ -322,13 +752,17 @@ class MainWindow(QMainWindow):
 
     def load_image(self, file_path: str):
         try:
-            ImageLoader.load_image(file_path)
+            from modules.live_preview import PREVIEW_MAX_SIDE, PreviewSession
+            image = ImageLoader.load_image(file_path)
+            # the preview's quick pass starts from this same reduced decode
+            thumbnail = image.thumbnail(PREVIEW_MAX_SIDE)
             self.current_image_path = file_path
+            self.current_image = image
 
             base_name = os.path.splitext(os.path.basename(file_path))[0]
             self.output_name_edit.setText(base_name)
 
-            pixmap = QPixmap(file_path)
+            pixmap = QPixmap.fromImage(qimage_view(thumbnail))
             pixmap = pixmap.scaled(
                 self.image_label.size(),
                 Qt.KeepAspectRatio,
@@ -336,21 +770,210 @@ class MainWindow(QMainWindow):
             )
             self.image_label.setPixmap(pixmap)
             self.convert_button.setEnabled(True)
+            if self.sweep_thread is not None:
+                self.sweep_thread.cancel()  # results for the previous image; the button returns when it stops
+            else:
+                self.sweep_button.setEnabled(True)
+            self.clear_sweep()
+            self.sweep_info_label.setText("Set ranges and run a sweep; click a result to apply it")
+
+            self.preview_session = PreviewSession(image, self.settings_manager)
+            self.preview_key = None
+            self.live_button.setChecked(True)
+            self.update_preview()
+            self.schedule_preview()
         except Exception as exc:
             QMessageBox.critical(self, "Error", str(exc))
 
     def save_settings(self):
+        # one write of the config file, not one per widget
+        self.settings_manager.update({
+            "svg_mode": self.svg_mode_combo.currentText(),
+            "threshold": self.threshold_spin.value(),
+            "centerline": self.centerline_check.isChecked(),
+            "blur_ksize": self.blur_spin.value(),
+            "canny_low": self.canny_low_spin.value(),
+            "canny_high": self.canny_high_spin.value(),
+            "edge_dedup": self.edge_dedup_check.isChecked(),
+            "color_tolerance": self.color_tol_spin.value(),
+            "max_colors": self.max_colors_spin.value(),
+            "group_by_color": self.group_color_check.isChecked(),
+            "hatch_spacing": self.hatch_spacing_spin.value(),
+            "hatch_angle": self.hatch_angle_spin.value(),
+            "hatch_merge_gap": self.hatch_gap_spin.value(),
+            "raster_min_power": self.raster_min_spin.value(),
+            "raster_max_power": self.raster_max_spin.value(),
+            "raster_levels": self.raster_levels_spin.value(),
+            "raster_white_cutoff": self.raster_cutoff_spin.value(),
+            "remove_background": self.remove_bg_check.isChecked(),
+            "background_tolerance": self.bg_tol_spin.value(),
+            "max_artifact_size": self.artifact_spin.value(),
+            "potrace_turdsize": self.turdsize_spin.value(),
+            "potrace_alphamax": self.alphamax_spin.value(),
+            "tool_on_cmd": self.tool_on_edit.text(),
+            "tool_off_cmd": self.tool_off_edit.text(),
+            "svg_compact": self.svg_compact_check.isChecked(),
+            "gcode_backend": self.backend_combo.currentText(),
+            "feedrate": self.feedrate_spin.value(),
+            "gcode_optimize": self.gcode_optimize_check.isChecked(),
+            "gcode_precision": self.gcode_precision_spin.value(),
+            "estimate_time": self.estimate_time_check.isChecked(),
+            "machine_profile": self.machine_profile_combo.currentText(),
+            "simplify_method": self.simplify_combo.currentText(),
+            "simplify_tolerance": self.simplify_tol_spin.value(),
+            "simplify_units": self.simplify_units_combo.currentText(),
+            "arc_fitting": self.arc_fitting_check.isChecked(),
+            "optimize_order": self.optimize_order_check.isChecked(),
+            "two_opt_time": self.two_opt_spin.value(),
+            "output_filename": self.output_name_edit.text(),
+        })
+        self.schedule_preview()
+
+    def schedule_preview(self):
+        """
+        Restart the debounce timer if anything the preview depends on changed.
+        """
+        if self.preview_session is None:
+            return
         sm = self.settings_manager
-        sm.set("svg_mode", self.svg_mode_combo.currentText())
-        sm.set("threshold", self.threshold_spin.value())
-        sm.set("blur_ksize", self.blur_spin.value())
-        sm.set("canny_low", self.canny_low_spin.value())
-        sm.set("canny_high", self.canny_high_spin.value())
-        sm.set("potrace_turdsize", self.turdsize_spin.value())
-        sm.set("potrace_alphamax", self.alphamax_spin.value())
-        sm.set("tool_on_cmd", self.tool_on_edit.text())
-        sm.set("tool_off_cmd", self.tool_off_edit.text())
-        sm.set("output_filename", self.output_name_edit.text())
+        key = tuple(sm.get(k) for k in ("svg_mode", "threshold", "centerline", "blur_ksize", "canny_low",
+                                        "canny_high", "edge_dedup", "color_tolerance", "max_colors",
+                                        "hatch_spacing", "hatch_angle",
+                                        "hatch_merge_gap", "raster_white_cutoff", "remove_background",
+                                        "background_tolerance", "max_artifact_size",
+                                        "simplify_method", "simplify_tolerance", "simplify_units", "dpi"))
+        if key != self.preview_key:
+            self.preview_key = key
+            self.preview_timer.start()
+
+    def start_preview(self, full=False):
+        """
+        Cancel any preview still running and start a new one, at preview
+        resolution first; on_preview_rendered follows up at full resolution.
+        """
+        for thread in self.preview_threads:
+            thread.cancel()
+        self.preview_threads = [t for t in self.preview_threads if not t.isFinished()]
+        self.preview_generation += 1
+
+        from modules.raster_svg_converter import RasterSVGConverter
+        size = self.live_label.size()
+        size = (max(size.width(), 400), max(size.height(), 400))
+        thread = PreviewThread(
+            self.preview_session, RasterSVGConverter(self.settings_manager),
+            PathSimplifier(self.settings_manager), full, size, self.preview_generation
+        )
+        thread.rendered.connect(self.on_preview_rendered)
+        thread.failed.connect(self.on_preview_failed)
+        self.preview_threads.append(thread)
+        thread.start()
+
+    def on_preview_rendered(self, generation: int, rgb, info: dict):
+        if generation != self.preview_generation:
+            return
+        h, w = rgb.shape[:2]
+        image = QImage(rgb.data, w, h, rgb.strides[0], QImage.Format_RGB888)
+        self.live_label.setPixmap(QPixmap.fromImage(image))
+        resolution = "full resolution" if info["full"] else f"{info['scale']:.0%} preview"
+        self.live_info_label.setText(
+            f"{resolution}: {info['paths']} paths, {info['segments']} segments, {info['ms']} ms"
+        )
+        if not info["full"] and self.preview_session.full_allowed:
+            self.start_preview(full=True)
+
+    def on_preview_failed(self, generation: int, error_message: str):
+        if generation == self.preview_generation:
+            self.live_info_label.setText(f"Preview Error: {error_message}")
+
+    def run_sweep(self):
+        """
+        Trace the current image with every combination of the sweep ranges,
+        adding each result to the grid as it arrives.
+        """
+        from modules.parameter_sweep import ParameterSweep, parse_range
+        from modules.tiled_tracer import TiledTracer
+        if self.current_image is None:
+            QMessageBox.warning(self, "No Image", "Please load an image first.")
+            return
+        if not TiledTracer.fits_in_memory(self.current_image.path, self.settings_manager.get("tile_memory_mb")):
+            QMessageBox.warning(self, "Image Too Large", "This image is traced in tiles; sweeps need it whole in memory.")
+            return
+        try:
+            ranges = {key: parse_range(edit.text()) for key, edit in self.sweep_edits.items() if edit.text().strip()}
+            sweep = ParameterSweep(self.settings_manager)
+            total = len(sweep.combinations(ranges))
+        except ValueError as exc:
+            QMessageBox.warning(self, "Sweep", str(exc))
+            return
+
+        self.clear_sweep()
+        self.sweep_info_label.setText(f"Tracing {total} combinations...")
+        self.sweep_button.setEnabled(False)
+        self.sweep_thread = SweepThread(sweep, self.current_image, ranges)
+        self.sweep_thread.result.connect(self.on_sweep_result)
+        self.sweep_thread.finished.connect(self.on_sweep_finished)
+        self.sweep_thread.error.connect(self.on_sweep_error)
+        self.sweep_thread.start()
+
+    def on_sweep_result(self, result: dict, done: int, total: int):
+        from modules.parameter_sweep import caption
+        if self.sweep_thread is None or self.sweep_thread.cancelled:
+            return  # a new image was loaded meanwhile
+        rgb = result["thumbnail"]
+        h, w = rgb.shape[:2]
+        pixmap = QPixmap.fromImage(QImage(rgb.data, w, h, rgb.strides[0], QImage.Format_RGB888))
+        button = QToolButton()
+        button.setIcon(QIcon(pixmap))
+        button.setIconSize(pixmap.size())
+        button.setText("\n".join(caption(result)))
+        button.setToolButtonStyle(Qt.ToolButtonTextUnderIcon)
+        button.setCheckable(True)
+        button.clicked.connect(lambda checked, params=result["params"]: self.apply_sweep(params))
+        self.sweep_group.addButton(button)
+        index = result["index"]
+        self.sweep_grid.addWidget(button, index // SWEEP_COLUMNS, index % SWEEP_COLUMNS)
+        self.sweep_info_label.setText(f"Traced {done} of {total} combinations...")
+
+    def on_sweep_finished(self, results: list):
+        cancelled = self.sweep_thread.cancelled
+        self.sweep_thread = None
+        self.sweep_button.setEnabled(self.current_image is not None)
+        if not cancelled:
+            self.sweep_info_label.setText(f"{len(results)} combinations; click one to apply its settings")
+
+    def on_sweep_error(self, error_message: str):
+        self.sweep_thread = None
+        self.sweep_button.setEnabled(self.current_image is not None)
+        self.sweep_info_label.setText(f"Sweep Error: {error_message}")
+
+    def apply_sweep(self, params: dict):
+        """
+        Copy a sweep result's settings into the settings widgets, and so into the settings.
+        """
+        widgets = {"threshold": self.threshold_spin, "blur_ksize": self.blur_spin,
+                   "canny_low": self.canny_low_spin, "canny_high": self.canny_high_spin}
+        for key, value in params.items():
+            widgets[key].setValue(value)
+        self.save_settings()
+        self.sweep_info_label.setText("Applied " + ", ".join(f"{k} = {v}" for k, v in params.items()))
+
+    def clear_sweep(self):
+        for button in self.sweep_group.buttons():
+            self.sweep_group.removeButton(button)
+            self.sweep_grid.removeWidget(button)
+            button.deleteLater()
+
+    def closeEvent(self, event):
+        self.preview_timer.stop()
+        if self.sweep_thread is not None:
+            self.sweep_thread.cancel()
+            self.sweep_thread.wait()
+        for thread in self.preview_threads:
+            thread.cancel()
+            thread.wait()
+        self.code_viewer.clear()
+        self.toolpath_view.canvas.stop()
+        super().closeEvent(event)
 
     def convert_image(self):
         if not self.current_image_path:
@@ -362,47 +985,78 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "No Output Name", "Please specify an output filename.")
             return
 
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
         self.progress_bar.show()
+        self.timing_label.clear()
+        self.stage_times = {}
         self.convert_button.setEnabled(False)
+        # the output file is about to be rewritten under the viewer's memory map
+        self.code_viewer.clear()
+        self.last_gcode_path = None
 
-        self.worker = ConversionThread(self.current_image_path, output_name, self.settings_manager)
+        self.worker = ConversionThread(self.current_image, output_name, self.settings_manager, self.cache)
         self.worker.finished.connect(self.on_conversion_finished)
         self.worker.error.connect(self.on_conversion_error)
+        self.worker.progress.connect(self.on_conversion_progress)
+        self.worker.stage_timed.connect(self.on_stage_timed)
         self.worker.start()
 
+    def on_conversion_progress(self, percent: int, stage: str):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"%p%  {stage}" if stage else "%p%")
+
+    def on_stage_timed(self, stage: str, seconds: float):
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+        self.timing_label.setText(format_timings(self.stage_times))
+
     def on_conversion_finished(self, gcode_path: str):
         self.progress_bar.hide()
 
-        QMessageBox.information(self, "Success", f"G-code saved to:\n{gcode_path}")
+        summary = format_report(self.worker.report)
+        if self.worker.timings:
+            summary += "\n\nStage times: " + format_timings(self.worker.timings)
+        QMessageBox.information(self, "Success", f"G-code saved to:\n{gcode_path}" + (f"\n\n{summary}" if summary else ""))
 
         self.last_gcode_path = gcode_path
+        self.update_cache_label()
         self.last_svg_path = os.path.join("output", f"{self.output_name_edit.text().strip()}.svg")
+        self.toolpath_view.set_geometry(self.worker.geometry)
 
         self.update_preview()
         self.convert_button.setEnabled(True)
 
+    def update_cache_label(self):
+        if self.cache is None:
+            self.cache_label.setText("Cache: off")
+            return
+        stats = self.cache.stats()
+        self.cache_label.setText(
+            f"Cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses, {stats['cache_mb']} MB"
+        )
+
     def on_conversion_error(self, error_message: str):
         self.progress_bar.hide()
         QMessageBox.critical(self, "Conversion Error", error_message)
         self.convert_button.setEnabled(True)
 
     def update_preview(self):
-        if self.svg_button.isChecked():
+        if self.live_button.isChecked():
+            self.preview_stack.setCurrentIndex(2)
+        elif self.sweep_tab_button.isChecked():
+            self.preview_stack.setCurrentIndex(3)
+        elif self.svg_button.isChecked():
             self.preview_stack.setCurrentIndex(0)
-            if self.last_svg_path and os.path.exists(self.last_svg_path):
-                self.svg_widget.load(self.last_svg_path)
-                original_size = self.svg_widget.renderer().defaultSize()
-                self.svg_widget.setFixedSize(original_size)
         else:
             self.preview_stack.setCurrentIndex(1)
-            if self.last_gcode_path and os.path.exists(self.last_gcode_path):
+            viewer = self.code_viewer
+            if not self.last_gcode_path or not os.path.exists(self.last_gcode_path):
+                viewer.clear()
+            elif viewer.index is None or viewer.index.path != self.last_gcode_path:
                 try:
-                    with open(self.last_gcode_path, encoding="utf-8", errors="ignore") as file:
-                        self.code_preview.setPlainText("".join(file.readlines()[:100]))
+                    viewer.open(self.last_gcode_path)
                 except Exception as exc:
-                    self.code_preview.setPlainText(f"Preview Error: {exc}")
-            else:
-                self.code_preview.clear()
+                    viewer.status_label.setText(f"Preview Error: {exc}")
 
 
 if __name__ == "__main__":
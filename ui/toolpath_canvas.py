@@ -0,0 +1,184 @@
+import numpy as np
+from PyQt5.QtCore import QPointF, Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter
+from PyQt5.QtWidgets import QCheckBox, QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+
+# quiet period after a pan/zoom step before the view is re-rendered at full quality
+RENDER_DELAY_MS = 40
+ZOOM_STEP = 1.25
+
+
+class RenderThread(QThread):
+    rendered = pyqtSignal(int, object)
+
+    def __init__(self, geometry, scale, origin, size, show_rapids, generation):
+        super().__init__()
+        self.geometry = geometry
+        self.view = (scale, origin, size, show_rapids)
+        self.generation = generation
+
+    def run(self):
+        scale, origin, size, show_rapids = self.view
+        rgb, drawn = self.geometry.render(scale, origin, size, show_rapids)
+        image = QImage(rgb.data, size[0], size[1], 3 * size[0], QImage.Format_RGB888).copy()
+        self.rendered.emit(self.generation, (image, scale, origin, drawn))
+
+
+class ToolpathCanvas(QWidget):
+    """
+    Pan/zoom view of a ToolpathGeometry. Frames are rendered off the GUI
+    thread at the geometry's level of detail for the current zoom; while the
+    user drags or scrolls, the last frame is redrawn shifted and scaled until
+    a fresh one arrives.
+    """
+    view_changed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.geometry = None
+        self.scale = 1.0
+        self.origin = np.zeros(2)
+        self.show_rapids = True
+        self.frame = None          # (QImage, scale, origin, drawn) of the last render
+        self.generation = 0
+        self.threads = []
+        self.drag_from = None
+        self.fitted = True         # follow resizes until the user pans or zooms
+        self.setMinimumSize(200, 200)
+        self.setMouseTracking(False)
+
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(RENDER_DELAY_MS)
+        self.render_timer.timeout.connect(self.start_render)
+
+    def set_geometry(self, geometry):
+        self.geometry = geometry
+        self.frame = None
+        self.fit()
+
+    def set_show_rapids(self, show: bool):
+        self.show_rapids = show
+        self.request_render()
+
+    def fit(self):
+        if self.geometry is None:
+            self.update()
+            return
+        x0, y0, x1, y1 = self.geometry.bounds
+        w, h = max(self.width(), 1), max(self.height(), 1)
+        self.scale = float(0.95 * min(w / max(x1 - x0, 1e-9), h / max(y1 - y0, 1e-9)))
+        center = np.array([(x0 + x1) / 2, (y0 + y1) / 2])
+        self.origin = center - np.array([w, h]) / (2 * self.scale)
+        self.fitted = True
+        self.request_render()
+
+    def request_render(self):
+        self.update()
+        if self.geometry is not None:
+            self.render_timer.start()
+
+    def start_render(self):
+        self.threads = [t for t in self.threads if not t.isFinished()]
+        self.generation += 1
+        size = (max(self.width(), 1), max(self.height(), 1))
+        thread = RenderThread(self.geometry, self.scale, self.origin.copy(), size, self.show_rapids, self.generation)
+        thread.rendered.connect(self.on_rendered)
+        self.threads.append(thread)
+        thread.start()
+
+    def on_rendered(self, generation: int, frame):
+        if generation != self.generation:
+            return
+        self.frame = frame
+        level = self.geometry.level_for(frame[1])
+        self.view_changed.emit(
+            f"{self.geometry.segment_count:,} segments, {frame[3]:,} drawn (detail level {level}), zoom {frame[1]:.3g}"
+        )
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#FFFFFF"))
+        if self.frame is None:
+            return
+        image, scale, origin, _ = self.frame
+        # map the old frame into the current view until the new one is ready
+        shift = (origin - self.origin) * self.scale
+        painter.translate(QPointF(float(shift[0]), float(shift[1])))
+        painter.scale(self.scale / scale, self.scale / scale)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, scale != self.scale)
+        painter.drawImage(0, 0, image)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.fitted:
+            self.fit()
+        else:
+            self.request_render()
+
+    def wheelEvent(self, event):
+        if self.geometry is None:
+            return
+        pos = np.array([event.pos().x(), event.pos().y()], dtype=np.float64)
+        anchor = self.origin + pos / self.scale  # world point under the cursor stays put
+        self.scale *= ZOOM_STEP ** (event.angleDelta().y() / 120)
+        self.origin = anchor - pos / self.scale
+        self.fitted = False
+        self.request_render()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_from = np.array([event.pos().x(), event.pos().y()], dtype=np.float64)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_from is None:
+            return
+        pos = np.array([event.pos().x(), event.pos().y()], dtype=np.float64)
+        self.origin = self.origin - (pos - self.drag_from) / self.scale
+        self.drag_from = pos
+        self.fitted = False
+        self.request_render()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_from = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit()
+
+    def stop(self):
+        self.render_timer.stop()
+        for thread in self.threads:
+            thread.wait()
+
+
+class ToolpathView(QWidget):
+    """
+    Toolpath tab: the canvas with a rapids toggle, fit button and status line.
+    """
+    def __init__(self):
+        super().__init__()
+        self.canvas = ToolpathCanvas()
+
+        self.rapids_check = QCheckBox("Show rapids")
+        self.rapids_check.setChecked(True)
+        self.rapids_check.toggled.connect(self.canvas.set_show_rapids)
+        fit_button = QPushButton("Fit")
+        fit_button.clicked.connect(self.canvas.fit)
+        self.status_label = QLabel("Convert an image to view its toolpath")
+        self.canvas.view_changed.connect(self.status_label.setText)
+
+        toolbar = QHBoxLayout()
+        toolbar.setContentsMargins(0, 0, 0, 0)
+        toolbar.addWidget(self.rapids_check)
+        toolbar.addStretch()
+        toolbar.addWidget(fit_button)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.canvas, 1)
+        layout.addWidget(self.status_label)
+
+    def set_geometry(self, geometry):
+        self.canvas.set_geometry(geometry)